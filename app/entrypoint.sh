@@ -6,7 +6,10 @@ import os
 with open('/app/logger.template.yaml') as f:
     template = f.read()
 
-output = template.replace('\${LOG_LEVEL}', os.getenv('LOG_LEVEL', 'INFO'))
+defaults = {'LOG_LEVEL': 'INFO', 'LOG_FILE_FORMAT': 'complex'}
+output = template
+for name, default in defaults.items():
+    output = output.replace('\${' + name + '}', os.getenv(name, default))
 
 with open('/app/logger.yaml', 'w') as f:
     f.write(output)
@@ -1,18 +1,46 @@
 #!/usr/bin/env python3
 # Import built-in modules
+import os
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 # Import third-party modules
 import uvicorn
 from fastapi import FastAPI
 # Import local modules
-from src import loggerConfig
-from src.routers import admin, user, parts, locations, images, datasheets
-from src.dependencies import VERSION
+from src import configureLogging
+import src.database as db
+import src.dependencies as dependencies
+from src.routers import admin, user, parts, locations, images, datasheets, metrics, movements, stock, inventory, codes, bom, attributes
+from src.dependencies import VERSION, config
+from src.metrics import MetricsMiddleware
+from src.queryInspector import instrumentEngine
+from src.snapshots import snapshotLoop
+from src.datasheetIndex import datasheetIndexLoop
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup work runs here instead of on import, every worker process runs it once
+    dependencies.initialize()
+    db.initialize()
+    instrumentEngine(db.engine)
+    snapshotTask = asyncio.create_task(snapshotLoop())
+    indexTask = asyncio.create_task(datasheetIndexLoop())
+    yield
+    snapshotTask.cancel()
+    indexTask.cancel()
+    dependencies.HASHEXECUTOR.shutdown(wait=False)
+    dependencies.IMAGEEXECUTOR.shutdown(wait=False)
+    # Waits for the running jobs, so the worker processes exit with the server
+    dependencies.DATASHEETEXECUTOR.shutdown(cancel_futures=True)
+
+
 # Define the FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="Circuit Stash API",
     description="API for Circuit Stash",
     version=VERSION,
@@ -20,6 +48,8 @@ app = FastAPI(
         "syntaxHighlight.theme": "monokai"
     }
 )
+# Record timings and database statements of every request
+app.add_middleware(MetricsMiddleware)
 # Include the routers
 app.include_router(
     admin.router,
@@ -51,17 +81,58 @@ app.include_router(
     prefix="/datasheets",
     tags=["datasheets"]
 )
+app.include_router(
+    movements.router,
+    prefix="/movements",
+    tags=["movements"]
+)
+app.include_router(
+    inventory.router,
+    prefix="/inventory",
+    tags=["inventory"]
+)
+app.include_router(
+    stock.router,
+    prefix="/stock",
+    tags=["stock"]
+)
+app.include_router(
+    codes.router,
+    prefix="/codes",
+    tags=["codes"]
+)
+app.include_router(
+    bom.router,
+    prefix="/bom",
+    tags=["bom"]
+)
+app.include_router(
+    attributes.router,
+    prefix="/attributes",
+    tags=["attributes"]
+)
+app.include_router(
+    metrics.router,
+    prefix="/metrics",
+    tags=["metrics"]
+)
 
 # Define the main function
 def main() -> None:
+    loggerConfig = configureLogging()
+    dependencies.loadConfig()
     logger.info(f"Starting the circuit stash backend {VERSION}")
     logger.info(f"Loaded {len(app.routes)} routes")
     for route in app.routes:
         logger.debug(f"Route: \"{route.path}\" - Methods: {route.methods}") # type: ignore
+    # Every worker process imports the app on its own, startup work is guarded by a file lock
+    workers = config.workers if config.workers > 0 else (os.cpu_count() or 1)
+    logger.info(f"Starting {workers} worker processes")
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=config.host,
+        port=config.port,
+        workers=workers,
         log_config=loggerConfig
     )
     logger.info("Server stopped")
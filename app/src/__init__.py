@@ -5,23 +5,24 @@ import logging.handlers
 import logging.config
 from pathlib import Path
 
-# Configer Logging
-with open("logger.yaml") as f:
+
+def loadLoggerConfig(path: str = "logger.yaml") -> dict:
+    """
+    Load the logging config, importing this package does not configure logging on its own.
+    """
+    with open(path) as f:
+        return yaml.safe_load(f.read())
+
+
+def configureLogging(path: str = "logger.yaml") -> dict:
+    """
+    Configure logging from the config file and return the config, so it can be passed on to uvicorn.
+    """
     # Load config
-    loggerConfig = yaml.safe_load(f.read())
+    loggerConfig = loadLoggerConfig(path)
     # Check folder path
-    logPath = Path.cwd() / Path(loggerConfig["handlers"].get("rotating")["filename"])
+    logPath = Path.cwd() / Path(loggerConfig["handlers"].get("file")["filename"])
     logPath.parent.mkdir(parents=True, exist_ok=True)
     # Configer logging
     logging.config.dictConfig(loggerConfig)
-    # Get config for color logging
-    logFormat = loggerConfig.get("formatters", {}).get("simple", {}).get("format", None)
-    logDatefmt = loggerConfig.get("formatters", {}).get("simple", {}).get("datefmt", None)
-    logLevel = loggerConfig.get("root", {}).get("level", 0)
-
-# Get logger
-logger = logging.getLogger(__name__)
-# Do rollover
-for handler in logger.handlers:
-    if isinstance(handler, logging.handlers.RotatingFileHandler):
-        handler.doRollover()
+    return loggerConfig
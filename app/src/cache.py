@@ -0,0 +1,183 @@
+import os
+import time
+import uuid
+from pathlib import Path
+from threading import Lock
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    A bounded least recently used cache where every entry carries its own expiry.
+    """
+
+    def __init__(self, maxSize: int):
+        self.maxSize = maxSize
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = Lock()
+
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Get an entry from the cache, expired entries are evicted and count as a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if time.time() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+
+    def set(self, key: Hashable, value: Any, expires: float) -> None:
+        """
+        Add an entry to the cache which is valid until the given timestamp.
+        """
+        if self.maxSize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Remove an entry from the cache.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+    def removeWhere(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Remove all entries whose value matches the predicate and return how many were removed.
+        """
+        with self._lock:
+            keys = [key for key, (value, _) in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    A folder of cached files bounded by their total size, the least recently used files are removed first.
+    Worker processes share the folder, every process enforces maxBytes on the files it knows about,
+    a file written by another process is adopted when it is asked for and a file removed by another process counts as a miss.
+    """
+
+    def __init__(self, path: Path, maxBytes: int):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.size = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._lock = Lock()
+
+
+    def load(self) -> None:
+        """
+        Create the folder and index the files of earlier runs, the modification time is the last use.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        files = sorted((entry.stat().st_mtime, entry.name, entry.stat().st_size) for entry in os.scandir(self.path) if entry.is_file() and not entry.name.startswith("."))
+        with self._lock:
+            self._entries = OrderedDict((name, size) for _, name, size in files)
+            self.size = sum(self._entries.values())
+        self._evict()
+
+
+    def get(self, key: str) -> Path | None:
+        path = self.path / key
+        with self._lock:
+            known = key in self._entries
+            if known:
+                self._entries.move_to_end(key)
+        if not known and not self._adopt(key):
+            return None
+        try:
+            # Keeps the order across restarts
+            os.utime(path)
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+        return path
+
+
+    def read(self, key: str) -> bytes | None:
+        """
+        Read a cached file, unlike a path the data stays valid when the file is evicted afterwards.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+
+
+    def _adopt(self, key: str) -> bool:
+        # The file may have been written by another process
+        try:
+            size = (self.path / key).stat().st_size
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            if key not in self._entries:
+                self.size += size
+                self._entries[key] = size
+        self._evict()
+        return True
+
+
+    def _forget(self, key: str) -> None:
+        # The file was removed by another process
+        with self._lock:
+            self.size -= self._entries.pop(key, 0)
+
+
+    def put(self, key: str, data: bytes) -> Path | None:
+        """
+        Store a file and return its path, files larger than the whole cache are not stored.
+        """
+        if len(data) > self.maxBytes:
+            return None
+        path = self.path / key
+        # Written under a temporary name first, so readers never see a partial file
+        temporary = self.path / f".{key}.{uuid.uuid4().hex}"
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+        with self._lock:
+            self.size += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+        self._evict()
+        return path
+
+
+    def _evict(self) -> None:
+        with self._lock:
+            while self.size > self.maxBytes and self._entries:
+                key, size = self._entries.popitem(last=False)
+                self.size -= size
+                (self.path / key).unlink(missing_ok=True)
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
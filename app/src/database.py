@@ -2,13 +2,18 @@ import os
 import uuid
 from logging import getLogger
 from typing import Optional, List
+from datetime import datetime, timezone
 from base64 import b64encode
 
 from fastapi import HTTPException, status
 from sqlmodel import SQLModel, Field, create_engine, Relationship
 from sqlmodel import Session, select
+from sqlalchemy import event, Index, UniqueConstraint, update, delete, or_
+from sqlalchemy.engine import Engine
 
 from src.dependencies import config, getPasswordHash
+from src.startup import startupLock
+from src.migrations import migrate
 from src.schemes import User
 
 
@@ -24,6 +29,16 @@ class Users(SQLModel, table=True):
     type: int
 
 
+class RefreshTokens(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    userId: uuid.UUID = Field(foreign_key="users.id", index=True)
+    tokenHash: str = Field(unique=True)
+    device: str = ""
+    created: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expires: datetime
+    revoked: bool = False
+
+
 class Locations(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     name: str = Field(unique=True)
@@ -40,7 +55,7 @@ class Categories(SQLModel, table=True):
 
 class PartTagLinks(SQLModel, table=True):
     partId: uuid.UUID = Field(foreign_key="parts.id", primary_key=True)
-    tagId: uuid.UUID = Field(foreign_key="tags.id", primary_key=True)
+    tagId: uuid.UUID = Field(foreign_key="tags.id", primary_key=True, index=True)
 
 
 class Tags(SQLModel, table=True):
@@ -64,11 +79,77 @@ class Parts(SQLModel, table=True):
 
 class Inventory(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    partId: uuid.UUID = Field(foreign_key="parts.id")
+    partId: uuid.UUID = Field(foreign_key="parts.id", index=True)
     part: Parts = Relationship()
-    locationId: uuid.UUID = Field(foreign_key="locations.id")
+    locationId: uuid.UUID = Field(foreign_key="locations.id", index=True)
     location: Locations = Relationship()
     stock: int = 0
+    # Incremented on every change, clients send the version they read to detect concurrent changes
+    version: int = 0
+
+
+class Movements(SQLModel, table=True):
+    # Append only, the integer key keeps the insertion order
+    id: Optional[int] = Field(default=None, primary_key=True)
+    partId: uuid.UUID = Field(foreign_key="parts.id", index=True)
+    fromLocation: Optional[uuid.UUID] = Field(default=None, foreign_key="locations.id")
+    toLocation: Optional[uuid.UUID] = Field(default=None, foreign_key="locations.id")
+    delta: int
+    username: str
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+
+
+class PartTrigrams(SQLModel, table=True):
+    # Trigrams of the normalised part names, to find near duplicates
+    trigram: str = Field(primary_key=True)
+    partId: uuid.UUID = Field(foreign_key="parts.id", primary_key=True, index=True)
+
+
+class AttributeDefinitions(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("categoryId", "name"),)
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    categoryId: uuid.UUID = Field(foreign_key="categories.id")
+    name: str = Field(index=True)
+    # Numeric values are stored in this SI base unit
+    unit: str = ""
+    numeric: bool = True
+
+
+class PartAttributes(SQLModel, table=True):
+    # Range and equality filters on a single attribute are one index range scan
+    __table_args__ = (
+        Index("ix_partattributes_attributeId_numericValue", "attributeId", "numericValue"),
+        Index("ix_partattributes_attributeId_textValue", "attributeId", "textValue"),
+    )
+    partId: uuid.UUID = Field(foreign_key="parts.id", primary_key=True)
+    attributeId: uuid.UUID = Field(foreign_key="attributedefinitions.id", primary_key=True)
+    numericValue: Optional[float] = None
+    textValue: Optional[str] = None
+
+
+class Codes(SQLModel, table=True):
+    # A barcode or QR payload pointing to either a part or a location
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    code: str = Field(unique=True)
+    kind: str = ""
+    partId: Optional[uuid.UUID] = Field(default=None, foreign_key="parts.id", index=True)
+    locationId: Optional[uuid.UUID] = Field(default=None, foreign_key="locations.id", index=True)
+
+
+class InventorySnapshots(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    taken: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+    # The snapshot includes all movements up to this id
+    movementId: int = 0
+
+
+class SnapshotStock(SQLModel, table=True):
+    # Only locations holding a part are stored
+    __table_args__ = (Index("ix_snapshotstock_snapshotId_locationId", "snapshotId", "locationId"),)
+    snapshotId: int = Field(foreign_key="inventorysnapshots.id", primary_key=True)
+    partId: uuid.UUID = Field(foreign_key="parts.id", primary_key=True)
+    locationId: uuid.UUID = Field(foreign_key="locations.id", primary_key=True)
+    stock: int
 
 
 class Images(SQLModel, table=True):
@@ -81,11 +162,23 @@ class Datasheets(SQLModel, table=True):
     path: str
 
 
+class DatasheetTexts(SQLModel, table=True):
+    # Extraction state of a datasheet, the text of its pages is stored in the datasheetpages full text index
+    datasheetId: uuid.UUID = Field(foreign_key="datasheets.id", primary_key=True)
+    # A file with a different size or modification time is extracted again
+    size: int
+    modified: float
+    pages: int = 0
+    error: Optional[str] = None
+    previewError: Optional[str] = None
+    extracted: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
 def getUser(username: str) -> tuple[User, str] | None:
     """
     Get a user from the database by username.
     """
-    with Session(engine) as session:
+    with Session(getEngine()) as session:
         stmt = select(Users).where(Users.username == username)
         result = session.exec(stmt)
         user = result.first()
@@ -106,40 +199,202 @@ def getUser(username: str) -> tuple[User, str] | None:
         return simpleUser, user.salt
 
 
+def updatePasswordHash(username: str, hashedPassword: str) -> None:
+    """
+    Replace the password hash of a user, used to rehash outdated hashes on login.
+    """
+    with Session(getEngine()) as session:
+        stmt = select(Users).where(Users.username == username)
+        user = session.exec(stmt).first()
+        if user is None:
+            return
+        user.password = hashedPassword
+        session.add(user)
+        session.commit()
+
+
+def addRefreshToken(username: str, tokenHash: str, device: str, expires: datetime) -> None:
+    """
+    Store the hash of a new refresh token for a user, expired and revoked tokens of the user are removed.
+    """
+    with Session(getEngine()) as session:
+        stmt = select(Users.id).where(Users.username == username)
+        userId = session.exec(stmt).first()
+        if userId is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Unable to authenticate user",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        # Every login adds a token, without this the table only grows
+        stmt = delete(RefreshTokens).where(
+            RefreshTokens.userId == userId,  # type: ignore
+            or_(RefreshTokens.revoked == True, RefreshTokens.expires <= datetime.now(timezone.utc))  # type: ignore  # noqa: E712
+        )
+        session.exec(stmt)  # type: ignore
+        refreshToken = RefreshTokens(
+            userId=userId,
+            tokenHash=tokenHash,
+            device=device,
+            expires=expires
+        )
+        session.add(refreshToken)
+        session.commit()
+
+
+def rotateRefreshToken(tokenHash: str, newTokenHash: str, expires: datetime) -> User | None:
+    """
+    Replace a valid refresh token with a new one and return its user, revoked and expired tokens return None.
+    """
+    with Session(getEngine()) as session:
+        # Revoking first with a condition lets only one of several concurrent refreshes with the same token succeed
+        stmt = (
+            update(RefreshTokens)
+            .where(RefreshTokens.tokenHash == tokenHash)  # type: ignore
+            .where(RefreshTokens.revoked == False)  # type: ignore  # noqa: E712
+            .where(RefreshTokens.expires > datetime.now(timezone.utc))  # type: ignore
+            .values(revoked=True)
+        )
+        if session.exec(stmt).rowcount != 1:  # type: ignore
+            return None
+        stmt = (
+            select(Users, RefreshTokens.device)
+            .join(RefreshTokens, RefreshTokens.userId == Users.id)  # type: ignore
+            .where(RefreshTokens.tokenHash == tokenHash)
+        )
+        user, device = session.exec(stmt).one()
+        if user.disabled:
+            session.commit()
+            return None
+        session.add(RefreshTokens(userId=user.id, tokenHash=newTokenHash, device=device, expires=expires))
+        session.commit()
+        return User(
+            username=user.username,
+            disabled=user.disabled,
+            type=user.type
+        )
+
+
+def revokeRefreshToken(tokenHash: str) -> None:
+    """
+    Revoke a single refresh token.
+    """
+    with Session(getEngine()) as session:
+        stmt = select(RefreshTokens).where(RefreshTokens.tokenHash == tokenHash)
+        refreshToken = session.exec(stmt).first()
+        if refreshToken is None:
+            return
+        refreshToken.revoked = True
+        session.add(refreshToken)
+        session.commit()
+
+
+def revokeRefreshTokens(username: str) -> int:
+    """
+    Revoke all refresh tokens of a user and return how many were revoked.
+    """
+    with Session(getEngine()) as session:
+        stmt = (
+            select(RefreshTokens)
+            .join(Users, RefreshTokens.userId == Users.id)  # type: ignore
+            .where(Users.username == username)
+            .where(RefreshTokens.revoked == False)  # noqa: E712
+        )
+        refreshTokens = session.exec(stmt).all()
+        for refreshToken in refreshTokens:
+            refreshToken.revoked = True
+            session.add(refreshToken)
+        session.commit()
+        return len(refreshTokens)
+
+
 # Solve forward references
 Categories.model_rebuild()
 Tags.model_rebuild()
 Parts.model_rebuild()
 
-engine = None
-match config.dbType:
-    case "sqlite":
-        engine = create_engine(f"sqlite:///data/{config.dbFile}")
+def lockForWrite(session: Session) -> None:
+    """
+    Start the session's transaction with the database write lock held.
+    Rows read afterwards can not be changed by another process before the commit.
+    """
+    # A write which matches no rows takes the lock, SQLite has no SELECT ... FOR UPDATE
+    session.connection().exec_driver_sql("UPDATE inventory SET version = version WHERE 0")
 
-    case _:
-        logger.warning(f"Unknown database type: {config.dbType}")
 
-if engine is not None:
-    SQLModel.metadata.create_all(engine)
-    logger.info("Database created")
-    with Session(engine) as session:
-        stmt = select(Users).where(Users.username == "admin")
-        result = session.exec(stmt)
-        user = result.all()
-        if len(user) == 0:
-            logger.warning("Admin user not found, creating default admin user")
-            salt = b64encode(os.urandom(16)).decode()
-            hashedPassword = getPasswordHash("admin", salt)
-            newUser = Users(
-                username="admin",
-                password=hashedPassword,
-                salt=salt,
-                disabled=False,
-                type=1
+def setSqlitePragmas(dbapiConnection, connectionRecord) -> None:
+    # WAL lets readers of other worker processes continue while one process writes
+    cursor = dbapiConnection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    # With WAL commits skip the fsync, a power loss may drop the latest commits but can not corrupt the database
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def createEngine() -> Engine:
+    """
+    Create the engine for the configured database.
+    """
+    match config.dbType:
+        case "sqlite":
+            newEngine = create_engine(
+                f"sqlite:///data/{config.dbFile}",
+                pool_size=config.dbPoolSize,
+                max_overflow=config.dbMaxOverflow
             )
-            session.add(newUser)
-            session.commit()
-            logger.info("Default admin user created")
-else:
-    logger.critical("No engine available, exiting")
-    exit(1)
+            event.listen(newEngine, "connect", setSqlitePragmas)
+            return newEngine
+
+        case _:
+            logger.critical(f"Unknown database type: {config.dbType}")
+            raise RuntimeError(f"Unknown database type: {config.dbType}")
+
+
+def getEngine() -> Engine:
+    """
+    Get the engine, it is created on first use.
+    """
+    global engine
+    if "engine" not in globals():
+        engine = createEngine()
+    return engine
+
+
+def __getattr__(name: str):
+    # Lets other modules use db.engine without creating it on import
+    if name == "engine":
+        return getEngine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def initialize(target: int | None = None) -> None:
+    """
+    Create missing tables, apply pending migrations up to the target version and create the default admin user.
+    Called once on startup.
+    """
+    # Only one worker process creates the tables, migrates and creates the default admin
+    with startupLock():
+        # Creates missing tables only, changes to existing tables need a migration
+        SQLModel.metadata.create_all(getEngine())
+        logger.info("Database created")
+        version = migrate(getEngine(), target)
+        logger.info(f"Database schema version {version}")
+        with Session(getEngine()) as session:
+            stmt = select(Users).where(Users.username == "admin")
+            result = session.exec(stmt)
+            user = result.all()
+            if len(user) == 0:
+                logger.warning("Admin user not found, creating default admin user")
+                salt = b64encode(os.urandom(16)).decode()
+                hashedPassword = getPasswordHash("admin", salt)
+                newUser = Users(
+                    username="admin",
+                    password=hashedPassword,
+                    salt=salt,
+                    disabled=False,
+                    type=1
+                )
+                session.add(newUser)
+                session.commit()
+                logger.info("Default admin user created")
@@ -0,0 +1,204 @@
+import os
+import re
+import uuid
+import asyncio
+from logging import getLogger
+from datetime import datetime, timezone
+from pathlib import Path
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlmodel import Session, select
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+
+import src.database as db
+import src.dependencies as dependencies
+from src.dependencies import config
+from src.startup import fileLock
+from src.datasheetPreviews import previewPath, renderPreview
+
+
+logger = getLogger(__name__)
+
+INDEXLOCKPATH = Path("data/datasheetIndex.lock")
+PAGESPERDATASHEET = 5
+# Seconds without uploads before the index loop runs, so the files of a bulk upload are indexed together
+INDEXDELAY = 0.5
+
+
+def extractPages(path: str) -> list[str]:
+    """
+    Extract the text of every page, runs in a worker process.
+    """
+    # Only the worker processes need the PDF parser
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def processDatasheet(path: str, previewSize: int) -> tuple[list[str] | None, str | None, str | None]:
+    """
+    Render the preview and extract the text of a datasheet, runs in a worker process.
+    Returns the pages, the extraction error and the preview error, one failing does not stop the other.
+    """
+    try:
+        renderPreview(path, previewSize)
+        previewError = None
+    except Exception as e:
+        previewError = str(e)
+    try:
+        return extractPages(path), None, previewError
+    except Exception as e:
+        return None, str(e), previewError
+
+
+def getChanged() -> tuple[list[tuple[db.Datasheets, int, float]], list[str]]:
+    """
+    Find datasheets which are new, whose file changed since the last extraction or which are missing a preview,
+    and remove the index entries of datasheets which no longer exist.
+    """
+    with Session(db.engine) as session:
+        datasheets = session.exec(select(db.Datasheets)).all()
+        states = {state.datasheetId: state for state in session.exec(select(db.DatasheetTexts))}
+        changed = []
+        removed = []
+        for datasheet in datasheets:
+            state = states.pop(datasheet.id, None)
+            try:
+                stat = os.stat(datasheet.path)
+            except OSError:
+                if state is not None:
+                    removed.append(datasheet.id.hex)
+                continue
+            if state is None or state.size != stat.st_size or state.modified != stat.st_mtime:
+                changed.append((datasheet, stat.st_size, stat.st_mtime))
+            # Datasheets indexed before previews existed, previews which failed are not retried until the file changes
+            elif state.previewError is None and not previewPath(datasheet.path).exists():
+                changed.append((datasheet, stat.st_size, stat.st_mtime))
+        removed.extend(datasheetId.hex for datasheetId in states)
+        if removed:
+            for datasheetId in removed:
+                session.connection().execute(text('DELETE FROM datasheetpages WHERE "datasheetId" = :id'), {"id": datasheetId})
+                session.connection().execute(text('DELETE FROM datasheettexts WHERE "datasheetId" = :id'), {"id": datasheetId})
+            session.commit()
+    return changed, removed
+
+
+def storePages(datasheet: db.Datasheets, size: int, modified: float, pages: list[str] | None, error: str | None, previewError: str | None) -> None:
+    """
+    Replace the indexed pages of a datasheet in one transaction.
+    """
+    with Session(db.engine) as session:
+        session.connection().execute(text('DELETE FROM datasheetpages WHERE "datasheetId" = :id'), {"id": datasheet.id.hex})
+        rows = [{"id": datasheet.id.hex, "page": number, "text": page} for number, page in enumerate(pages or [], start=1) if page.strip()]
+        if rows:
+            session.connection().execute(text('INSERT INTO datasheetpages ("datasheetId", page, text) VALUES (:id, :page, :text)'), rows)
+        state = {"size": size, "modified": modified, "pages": len(pages or []), "error": error, "previewError": previewError, "extracted": datetime.now(timezone.utc)}
+        # An upsert, the state of a datasheet may have been written since it was found to be changed
+        stmt = insert(db.DatasheetTexts).values(datasheetId=datasheet.id, **state)
+        session.connection().execute(stmt.on_conflict_do_update(index_elements=["datasheetId"], set_=state))
+        session.commit()
+
+
+def syncDatasheets() -> dict[str, int]:
+    """
+    Extract the text of new and changed datasheets in the datasheet process pool and store it in the full text index,
+    the previews are rendered by the same jobs.
+    """
+    # Every worker process indexes, the lock lets one of them at a time, the others then find nothing changed
+    with fileLock(INDEXLOCKPATH):
+        changed, removed = getChanged()
+        failed = 0
+        if changed:
+            executor = dependencies.DATASHEETEXECUTOR
+            jobs = [executor.submit(processDatasheet, datasheet.path, config.datasheetPreviewSize) for datasheet, _, _ in changed]
+            broken = False
+            for (datasheet, size, modified), job in zip(changed, jobs):
+                try:
+                    pages, error, previewError = job.result()
+                except Exception as e:
+                    # The worker process died
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                    pages, error, previewError = None, str(e), str(e)
+                if error is not None:
+                    logger.warning(f"Extracting the text of datasheet {datasheet.path} failed: {error}")
+                    failed += 1
+                if previewError is not None:
+                    logger.warning(f"Rendering the preview of datasheet {datasheet.path} failed: {previewError}")
+                storePages(datasheet, size, modified, pages, error, previewError)
+            if broken:
+                # A pool whose worker died accepts no more jobs
+                executor.shutdown(wait=False)
+                dependencies.DATASHEETEXECUTOR = dependencies.newDatasheetExecutor()
+            logger.info(f"Indexed {len(changed)} datasheets, {failed} failed")
+    return {"extracted": len(changed) - failed, "failed": failed, "removed": len(removed)}
+
+
+async def indexDatasheets() -> dict[str, int]:
+    """
+    Index new and changed datasheets without blocking the event loop, runs once at a time per worker process.
+    """
+    async with dependencies.EXTRACTIONLOCK:
+        return await asyncio.to_thread(syncDatasheets)
+
+
+async def datasheetIndexLoop() -> None:
+    """
+    Index new and changed datasheets in the background for as long as the app runs,
+    every datasheetIndexInterval seconds and whenever DATASHEETSCHANGED is set.
+    """
+    while True:
+        # Uploads during a run set the event again, so they are picked up by the next run
+        dependencies.DATASHEETSCHANGED.clear()
+        try:
+            await indexDatasheets()
+        except Exception:
+            logger.error("Indexing the datasheets failed", exc_info=True)
+        try:
+            await asyncio.wait_for(dependencies.DATASHEETSCHANGED.wait(), config.datasheetIndexInterval)
+        except asyncio.TimeoutError:
+            continue
+        while True:
+            dependencies.DATASHEETSCHANGED.clear()
+            try:
+                await asyncio.wait_for(dependencies.DATASHEETSCHANGED.wait(), INDEXDELAY)
+            except asyncio.TimeoutError:
+                break
+
+
+def toMatchQuery(query: str) -> str:
+    """
+    Turn free text into a query of the full text index, every word must appear.
+    Words are quoted, so characters like - or " can not change the query syntax and 3.3V matches 3.3V.
+    """
+    words = re.findall(r"\S+", query)
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def searchPages(session: Session, query: str, limit: int) -> list[dict]:
+    """
+    Rank the datasheets by their best matching page, every hit lists the best pages and the parts using the datasheet.
+    """
+    stmt = text(
+        'SELECT "datasheetId", page, bm25(datasheetpages) AS rank, snippet(datasheetpages, 2, \'[\', \']\', \'...\', 12) '
+        "FROM datasheetpages WHERE datasheetpages MATCH :query ORDER BY rank LIMIT :limit"
+    )
+    datasheets: dict[str, dict] = {}
+    # bm25 is lower for better matches
+    for datasheetId, page, rank, snippet in session.connection().execute(stmt, {"query": toMatchQuery(query), "limit": limit * PAGESPERDATASHEET * 4}):
+        hit = datasheets.setdefault(datasheetId, {"score": round(-rank, 3), "pages": []})
+        if len(hit["pages"]) < PAGESPERDATASHEET:
+            hit["pages"].append({"page": page, "snippet": snippet})
+    ranked = list(datasheets.items())[:limit]
+    if not ranked:
+        return []
+    ids = [uuid.UUID(datasheetId) for datasheetId, _ in ranked]
+    parts: dict[uuid.UUID, list] = {datasheetId: [] for datasheetId in ids}
+    for partId, name, datasheetId in session.exec(select(db.Parts.id, db.Parts.name, db.Parts.datasheet).where(db.Parts.datasheet.in_(ids))):  # type: ignore
+        parts[datasheetId].append((partId, name))
+    results = []
+    for datasheetId, hit in ranked:
+        # Datasheets which no part uses yet are still found
+        for partId, name in parts[uuid.UUID(datasheetId)] or [(None, None)]:
+            results.append({"id": partId, "name": name, "datasheetId": uuid.UUID(datasheetId), **hit})
+    return results[:limit]
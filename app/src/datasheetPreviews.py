@@ -0,0 +1,31 @@
+import uuid
+from pathlib import Path
+
+
+def previewPath(path: str | Path) -> Path:
+    """
+    The preview is stored next to the datasheet, data/datasheets/x.pdf has data/datasheets/x.preview.webp.
+    """
+    path = Path(path)
+    return path.with_name(f"{path.stem}.preview.webp")
+
+
+def renderPreview(path: str | Path, size: int) -> Path:
+    """
+    Render the first page to fit into a square of the given size, runs in a worker process.
+    """
+    # Only the worker processes need the PDF renderer
+    import pypdfium2
+    target = previewPath(path)
+    document = pypdfium2.PdfDocument(str(path))
+    try:
+        page = document[0]
+        width, height = page.get_size()
+        image = page.render(scale=size / max(width, height, 1)).to_pil()
+    finally:
+        document.close()
+    # Written under a temporary name first, so the preview endpoint never sends a partial file
+    temporary = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+    image.save(temporary, format="WEBP", quality=80)
+    temporary.replace(target)
+    return target
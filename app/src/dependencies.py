@@ -1,5 +1,9 @@
 import uuid
 import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from logging import getLogger
 from pathlib import Path
 from typing import Optional, Annotated
@@ -14,6 +18,11 @@ from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 
 from src.schemes import User, Part, Location
+from src.cache import LRUCache, DiskCache
+from src.rateLimiter import RateLimiter
+from src.startup import startupLock
+from src.revocations import RevocationLog
+from src.validators import INVALIDPATHCHAR, findInvalidChar, findInvalidStrings
 
 
 logger = getLogger(__name__)
@@ -26,15 +35,6 @@ FAILEDAUTHENTICATION = HTTPException(
     headers={"WWW-Authenticate": "Bearer"}
 )
 OAUTH2SCHEME = OAuth2PasswordBearer(tokenUrl="/user/login")
-PWDCONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
-ALLOWEDCHARS = [
-    "abcdefghijklmnopqrstuvwxyz",
-    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
-    "0123456789",
-    "!@#$%^()_+-=[]{}',.~°` ",
-    "&*;?/\\<>\"|:",
-    "\n\t\r"
-]
 
 
 class Config(BaseModel):
@@ -48,13 +48,81 @@ class Config(BaseModel):
     dbPort: Optional[int] = Field(default=None)
     dbUser: Optional[str] = Field(default=None)
     dbPassword: Optional[str] = Field(default=None)
+    dbPoolSize: int = Field(default=5)
+    dbMaxOverflow: int = Field(default=10)
+    # Rows per transaction of data migrations, smaller batches hold the write lock for a shorter time
+    migrationBatchSize: int = Field(default=500)
+    # Most ids a single batch get may request
+    batchGetSize: int = Field(default=1000)
+    # Inventory settings
+    movementBatchSize: int = Field(default=1000)
+    snapshotInterval: int = Field(default=86400)
+    # Most lines a BOM check accepts
+    bomMaxLines: int = Field(default=1000)
+    # Scanned codes are resolved from memory, other worker processes see a changed code after codeCacheTime seconds
+    codeCacheSize: int = Field(default=4096)
+    codeCacheTime: int = Field(default=300)
+    # Parts with names at least this similar are reported as possible duplicates
+    duplicateThreshold: float = Field(default=0.5)
+    duplicateBlockSize: int = Field(default=200)
+    # Image variants are rendered on first request and kept in a cache of imageCacheBytes on disk,
+    # shared by all worker processes, each of them evicts down to its share of imageCacheBytes
+    thumbnailSize: int = Field(default=50)
+    imageMaxSize: int = Field(default=2048)
+    imageWorkers: int = Field(default=2)
+    imageCacheBytes: int = Field(default=256 * 1024 * 1024)
+    # Datasheet text is extracted and previews are rendered in datasheetWorkers processes, new and changed files are picked up every datasheetIndexInterval seconds
+    datasheetWorkers: int = Field(default=2)
+    datasheetIndexInterval: int = Field(default=600)
+    datasheetPreviewSize: int = Field(default=300)
+    # Server settings, workers set to 0 starts one worker per CPU core
+    host: str = Field(default="0.0.0.0")
+    port: int = Field(default=8000)
+    workers: int = Field(default=1)
+    # Authentication settings
+    tokenCacheSize: int = Field(default=1024)
+    refreshExpirationDays: int = Field(default=30)
+    bcryptRounds: int = Field(default=12)
+    hashWorkers: int = Field(default=2)
+    hashConcurrency: int = Field(default=4)
+    loginAttempts: int = Field(default=30)
+    loginWindow: int = Field(default=60)
+    # Profiling settings
+    profileHeader: bool = Field(default=False)
+    profileSampleRate: float = Field(default=0.0)
+    slowQueryThreshold: float = Field(default=100.0)
+    nPlusOneThreshold: int = Field(default=10)
 
 
 def getPasswordHash(password: str, salt: str) -> str:
     return PWDCONTEXT.hash(password + salt)
 
 
-def getCurrentUser(token: Annotated[str, Depends(OAUTH2SCHEME)]) -> User:
+async def hashPassword(password: str, salt: str) -> str:
+    """
+    Hash a password in the hash executor without blocking the event loop.
+    """
+    async with HASHSEMAPHORE:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(HASHEXECUTOR, getPasswordHash, password, salt)
+
+
+async def verifyPassword(hashedPassword: str, plainPassword: str, salt: str) -> tuple[bool, str | None]:
+    """
+    Verify a password in the hash executor without blocking the event loop.
+    Returns if the password is valid and a new hash if the old one uses outdated settings.
+    """
+    async with HASHSEMAPHORE:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(HASHEXECUTOR, PWDCONTEXT.verify_and_update, plainPassword + salt, hashedPassword)
+
+
+async def getCurrentUser(token: Annotated[str, Depends(OAUTH2SCHEME)]) -> User:
+    syncRevocations()
+    # Verified tokens are cached until they expire, the cached user is shared and must not be modified
+    user = TOKENCACHE.get(token)
+    if user is not None:
+        return user
     try:
         data = jwt.decode(token, secrets["jwt"], algorithms=[JWTALGORITHM])
         username = data.get("username")
@@ -69,15 +137,70 @@ def getCurrentUser(token: Annotated[str, Depends(OAUTH2SCHEME)]) -> User:
     except InvalidTokenError:
         logger.debug("Token is invalid")
         raise FAILEDAUTHENTICATION
+    if token in revokedTokens:
+        logger.debug("Token is revoked")
+        raise FAILEDAUTHENTICATION
+    issued = data.get("issued")
+    if issued is None:
+        issued = expiration - JWTEXPIRATION.total_seconds()
+    if username in revokedUsers and issued <= revokedUsers[username]:
+        logger.debug(f"Tokens of user are revoked: \"{username}\"")
+        raise FAILEDAUTHENTICATION
     user = User(
         username=username,
         type=userType,
         disabled=False
     )
+    TOKENCACHE.set(token, user, expiration)
     return user
 
 
-def isAdmin(user: Annotated[User, Depends(getCurrentUser)]) -> User:
+def revokeToken(token: str) -> None:
+    """
+    Revoke a single token until it expires, used on logout.
+    """
+    try:
+        data = jwt.decode(token, secrets["jwt"], algorithms=[JWTALGORITHM])
+    except InvalidTokenError:
+        return
+    expiration = data.get("expiration")
+    if expiration is not None and expiration > time.time():
+        REVOCATIONS.append({"token": token, "expires": expiration})
+    syncRevocations()
+
+
+def revokeUser(username: str) -> None:
+    """
+    Revoke all tokens issued to a user so far, used when all sessions of a user are ended.
+    Changing or disabling a user has to call this too, cached tokens are otherwise accepted until they expire.
+    """
+    now = time.time()
+    REVOCATIONS.append({"user": username, "revoked": now, "expires": now + JWTEXPIRATION.total_seconds()})
+    syncRevocations()
+
+
+def syncRevocations() -> None:
+    """
+    Apply the revocations of all worker processes to the token cache of this process.
+    """
+    entries = REVOCATIONS.read()
+    if not entries:
+        return
+    for entry in entries:
+        if "token" in entry:
+            TOKENCACHE.pop(entry["token"])
+            revokedTokens[entry["token"]] = entry["expires"]
+        elif "user" in entry:
+            username = entry["user"]
+            TOKENCACHE.removeWhere(lambda user: user.username == username)
+            revokedUsers[username] = max(entry["revoked"], revokedUsers.get(username, 0))
+    now = time.time()
+    for revoked, expiration in list(revokedTokens.items()):
+        if expiration <= now:
+            del revokedTokens[revoked]
+
+
+async def isAdmin(user: Annotated[User, Depends(getCurrentUser)]) -> User:
     if user.type != 1:
         logger.debug(f"User is not admin: \"{user.username}\"")
         raise HTTPException(
@@ -102,15 +225,38 @@ def validateString(string: str) -> str:
             detail="String must be string",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    for char in string:
-        if char not in "".join(ALLOWEDCHARS):
-            logger.debug(f"Invalid character in string: \"{string}\", char: \"{char}\"")
+    char = findInvalidChar(string)
+    if char is not None:
+        logger.debug(f"Invalid character in string: \"{string}\", char: \"{char}\"")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="String contains invalid characters",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return string
+
+
+def validateStrings(strings: list[str]) -> list[str]:
+    """
+    Validate many strings at once, the error lists the indexes of all invalid strings.
+    """
+    for string in strings:
+        if type(string) is not str:
+            logger.debug(f"Invalid type: \"{type(string)}\"")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="String contains invalid characters",
+                detail="String must be string",
                 headers={"WWW-Authenticate": "Bearer"}
             )
-    return string
+    invalid = findInvalidStrings(strings)
+    if invalid:
+        logger.debug(f"Invalid characters in {len(invalid)} strings")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Strings contain invalid characters: {invalid}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return strings
 
 
 def validatePath(path: str) -> str:
@@ -127,14 +273,14 @@ def validatePath(path: str) -> str:
             detail="Path must be string",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    for char in path:
-        if char not in "".join(ALLOWEDCHARS[:-2]):
-            logger.debug(f"Invalid character in path: \"{path}\", char: \"{char}\"")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Path contains invalid characters",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
+    char = findInvalidChar(path, INVALIDPATHCHAR)
+    if char is not None:
+        logger.debug(f"Invalid character in path: \"{path}\", char: \"{char}\"")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Path contains invalid characters",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     return path
 
 
@@ -164,6 +310,23 @@ def validateUUID(id: str | uuid.UUID) -> uuid.UUID:
     return uuid.UUID(str(id), version=4)
 
 
+def validateFields(fields: str | None, allowed: tuple[str, ...], default: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Parse a comma separated fields parameter, the fields are returned in the order of allowed.
+    """
+    if fields is None:
+        return default
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}, allowed are: {', '.join(allowed)}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return tuple(field for field in allowed if field in requested)
+
+
 def validatePart(part: Part) -> Part:
     if part is None:
         raise HTTPException(
@@ -174,6 +337,8 @@ def validatePart(part: Part) -> Part:
     validateString(part.name)
     if part.description is not None:
         validateString(part.description)
+    if part.tags:
+        validateStrings(part.tags)
     if part.minStock is not None:
         if type(part.minStock) is not int:
             raise HTTPException(
@@ -211,33 +376,110 @@ def validateLocation(location: Location) -> Location:
     return location
 
 
-configPath = Path("data/config.json")
-if not configPath.exists():
-    logger.warning("Config file not found. Creating default config.")
-    with open(configPath, "w") as f:
-        config = Config()
-        f.write(config.model_dump_json(indent=4))
-        logger.info("Default config created")
-
-with open("data/config.json", "r") as f:
-    config = Config.model_validate_json(f.read())
+def loadConfig() -> Config:
+    """
+    Load the config file into the shared config object, creating a default config if there is none.
+    The object is updated in place, so modules which imported it see the loaded values.
+    """
+    with startupLock():
+        if not configPath.exists():
+            logger.warning("Config file not found. Creating default config.")
+            with open(configPath, "w") as f:
+                f.write(Config().model_dump_json(indent=4))
+                logger.info("Default config created")
+    with open(configPath, "r") as f:
+        loadedConfig = Config.model_validate_json(f.read())
+    for name in Config.model_fields:
+        setattr(config, name, getattr(loadedConfig, name))
     logger.info("Config loaded")
+    return config
 
-secretsPath = Path("data/secrets")
-if not secretsPath.exists():
-    logger.warning("Secrets folder not found. Creating default folder.")
-    secretsPath.mkdir(parents=True, exist_ok=True)
-    with open(secretsPath / "jwt.txt", "wb") as f:
-        f.write(b64encode(os.urandom(32)))
-        logger.info("New jwt secret created")
-secrets = {}
-with open("data/secrets/jwt.txt", "rb") as f:
-    jwtSecret = b64decode(f.read())
-secrets["jwt"] = jwtSecret
-
-logger.info("Secrets loaded")
 
+def loadSecrets() -> dict:
+    """
+    Load the secrets into the shared secrets dict, creating a new jwt secret if there is none.
+    """
+    with startupLock():
+        if not secretsPath.exists():
+            logger.warning("Secrets folder not found. Creating default folder.")
+            secretsPath.mkdir(parents=True, exist_ok=True)
+            with open(secretsPath / "jwt.txt", "wb") as f:
+                f.write(b64encode(os.urandom(32)))
+                logger.info("New jwt secret created")
+        REVOCATIONS.compact()
+    with open(secretsPath / "jwt.txt", "rb") as f:
+        secrets["jwt"] = b64decode(f.read())
+    logger.info("Secrets loaded")
+    return secrets
+
+
+def newDatasheetExecutor() -> ProcessPoolExecutor:
+    """
+    Create the process pool which extracts datasheet text and renders the previews.
+    """
+    # Spawned workers do not inherit the threads and open connections of the server process
+    return ProcessPoolExecutor(max_workers=config.datasheetWorkers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def initialize() -> None:
+    """
+    Load config and secrets and apply the config to the authentication, hashing and image helpers.
+    Called once on startup, importing this module has no side effects.
+    """
+    global HASHEXECUTOR, HASHSEMAPHORE, IMAGEEXECUTOR, DATASHEETEXECUTOR, DATASHEETSCHANGED, EXTRACTIONLOCK
+    loadConfig()
+    loadSecrets()
+    TOKENCACHE.maxSize = config.tokenCacheSize
+    CODECACHE.maxSize = config.codeCacheSize
+    # Hashes below the configured cost are flagged as deprecated and rehashed on login
+    PWDCONTEXT.update(
+        bcrypt__default_rounds=config.bcryptRounds,
+        bcrypt__min_rounds=config.bcryptRounds
+    )
+    HASHEXECUTOR.shutdown(wait=False)
+    HASHEXECUTOR = ThreadPoolExecutor(max_workers=config.hashWorkers, thread_name_prefix="hash")
+    HASHSEMAPHORE = asyncio.Semaphore(config.hashConcurrency)
+    LOGINLIMITER.limit = config.loginAttempts
+    LOGINLIMITER.window = config.loginWindow
+    IMAGEEXECUTOR.shutdown(wait=False)
+    IMAGEEXECUTOR = ThreadPoolExecutor(max_workers=config.imageWorkers, thread_name_prefix="image")
+    # Every process only evicts the files it knows about, with a share each they stay within imageCacheBytes together
+    workers = config.workers if config.workers > 0 else (os.cpu_count() or 1)
+    VARIANTCACHE.maxBytes = config.imageCacheBytes // workers
+    VARIANTCACHE.load()
+    DATASHEETEXECUTOR.shutdown(wait=False)
+    DATASHEETEXECUTOR = newDatasheetExecutor()
+    DATASHEETSCHANGED = asyncio.Event()
+    EXTRACTIONLOCK = asyncio.Lock()
+    datasheetPath.mkdir(parents=True, exist_ok=True)
+    imagePath.mkdir(parents=True, exist_ok=True)
+
+
+configPath = Path("data/config.json")
+secretsPath = Path("data/secrets")
 datasheetPath = Path("data/datasheets")
-datasheetPath.mkdir(parents=True, exist_ok=True)
 imagePath = Path("data/images")
-imagePath.mkdir(parents=True, exist_ok=True)
+REVOCATIONS = RevocationLog(Path("data/revocations.jsonl"))
+# Shared objects start with the defaults and are configured by initialize
+config = Config()
+secrets: dict[str, bytes] = {}
+TOKENCACHE = LRUCache(config.tokenCacheSize)
+CODECACHE = LRUCache(config.codeCacheSize)
+VARIANTCACHE = DiskCache(Path("data/cache/images"), config.imageCacheBytes)
+PWDCONTEXT = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=config.bcryptRounds,
+    bcrypt__min_rounds=config.bcryptRounds
+)
+HASHEXECUTOR = ThreadPoolExecutor(max_workers=config.hashWorkers, thread_name_prefix="hash")
+HASHSEMAPHORE = asyncio.Semaphore(config.hashConcurrency)
+IMAGEEXECUTOR = ThreadPoolExecutor(max_workers=config.imageWorkers, thread_name_prefix="image")
+# The worker processes are only started by the first job
+DATASHEETEXECUTOR = newDatasheetExecutor()
+# Set by uploads, the datasheet index loop then runs right away instead of waiting for the interval
+DATASHEETSCHANGED = asyncio.Event()
+EXTRACTIONLOCK = asyncio.Lock()
+LOGINLIMITER = RateLimiter(config.loginAttempts, config.loginWindow)
+revokedTokens: dict[str, float] = {}
+revokedUsers: dict[str, float] = {}
@@ -0,0 +1,102 @@
+import uuid
+from collections import defaultdict
+
+from sqlmodel import Session, select
+from sqlalchemy import func, insert, delete
+
+import src.database as db
+from src.similarity import trigrams, similarity
+
+
+def addTrigrams(session: Session, parts: list[tuple[uuid.UUID, str]]) -> None:
+    """
+    Add the trigrams of new parts to the index, in the session's transaction.
+    """
+    rows = [{"trigram": trigram, "partId": partId} for partId, name in parts for trigram in trigrams(name)]
+    if rows:
+        session.connection().execute(insert(db.PartTrigrams.__table__), rows)  # type: ignore
+
+
+def removeTrigrams(session: Session, partIds: list[uuid.UUID]) -> None:
+    session.connection().execute(delete(db.PartTrigrams.__table__).where(db.PartTrigrams.partId.in_(partIds)))  # type: ignore
+
+
+def findSimilar(session: Session, name: str, threshold: float, limit: int = 10, exclude: uuid.UUID | None = None) -> list[dict]:
+    """
+    Find parts with a name similar to the given one, the most similar first.
+    Only parts sharing enough trigrams to reach the threshold are loaded and compared.
+    """
+    nameTrigrams = trigrams(name)
+    # Jaccard similarity can only reach the threshold if at least this many trigrams are shared
+    minimumShared = max(1, int(threshold * len(nameTrigrams)))
+    shared = func.count(db.PartTrigrams.trigram)
+    stmt = (
+        select(db.Parts.id, db.Parts.name)
+        .join(db.PartTrigrams, db.PartTrigrams.partId == db.Parts.id)  # type: ignore
+        .where(db.PartTrigrams.trigram.in_(nameTrigrams))  # type: ignore
+        .group_by(db.Parts.id, db.Parts.name)
+        .having(shared >= minimumShared)
+        .order_by(shared.desc())
+        .limit(limit * 5)
+    )
+    matches = []
+    for partId, partName in session.exec(stmt):
+        if partId == exclude:
+            continue
+        score = similarity(nameTrigrams, trigrams(partName))
+        if score >= threshold:
+            matches.append({"id": partId, "name": partName, "similarity": round(score, 3)})
+    matches.sort(key=lambda match: match["similarity"], reverse=True)
+    return matches[:limit]
+
+
+def findDuplicates(session: Session, threshold: float, maxBlockSize: int) -> list[list[dict]]:
+    """
+    Group the whole catalogue into sets of likely duplicates.
+    Trigrams are used as blocking keys, only parts sharing a rare trigram are compared,
+    trigrams shared by more than maxBlockSize parts are too common to tell parts apart and are skipped.
+    This keeps the number of comparisons far below all pairs.
+    """
+    parts = session.exec(select(db.Parts.id, db.Parts.name)).all()
+    # Parts are numbered, hashing integers is much faster than hashing UUIDs
+    indexes = {partId: index for index, (partId, _) in enumerate(parts)}
+    count = len(parts)
+    blocks: dict[str, list[int]] = defaultdict(list)
+    for trigram, partId in session.exec(select(db.PartTrigrams.trigram, db.PartTrigrams.partId)):
+        if partId in indexes:
+            blocks[trigram].append(indexes[partId])
+    candidates: dict[int, int] = defaultdict(int)
+    for block in blocks.values():
+        if len(block) < 2 or len(block) > maxBlockSize:
+            continue
+        block.sort()
+        for i, first in enumerate(block):
+            offset = first * count
+            for second in block[i + 1:]:
+                candidates[offset + second] += 1
+    partTrigrams = [trigrams(name) for _, name in parts]
+    # Union find over the pairs above the threshold
+    parents = list(range(count))
+
+    def find(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    scores: dict[int, float] = {}
+    for pair, shared in candidates.items():
+        first, second = divmod(pair, count)
+        # Pairs sharing a single rare trigram are only compared if the names are short
+        if shared < 2 and min(len(partTrigrams[first]), len(partTrigrams[second])) > 4:
+            continue
+        score = similarity(partTrigrams[first], partTrigrams[second])
+        if score >= threshold:
+            parents[find(first)] = find(second)
+            scores[first] = max(scores.get(first, 0.0), score)
+            scores[second] = max(scores.get(second, 0.0), score)
+    groups: dict[int, list[dict]] = defaultdict(list)
+    for index, score in scores.items():
+        partId, name = parts[index]
+        groups[find(index)].append({"id": partId, "name": name, "similarity": round(score, 3)})
+    return sorted((sorted(group, key=lambda part: part["name"]) for group in groups.values()), key=len, reverse=True)
@@ -0,0 +1,217 @@
+"""
+Fill an empty database with a large synthetic catalogue, to test and benchmark at a realistic scale.
+
+Run from the app folder:
+    python -m src.generator --parts 100000
+"""
+import math
+import uuid
+import random
+import logging
+import argparse
+from time import perf_counter
+from pathlib import Path
+from logging import getLogger
+from datetime import datetime, timezone
+from dataclasses import dataclass
+
+from PIL import Image
+from sqlalchemy import insert, func, select
+from sqlalchemy.engine import Connection, Engine
+
+import src.database as db
+from src.similarity import trigrams
+
+
+logger = getLogger(__name__)
+
+# Part names look like real ones, the index keeps them unique
+FAMILIES = [
+    ("RES", ["10R", "100R", "1K", "4K7", "10K", "47K", "100K", "1M"], ["0402", "0603", "0805", "1206"]),
+    ("CAP", ["10P", "100P", "1N", "10N", "100N", "1U", "10U", "100U"], ["0402", "0603", "0805", "1206"]),
+    ("IND", ["1U", "4U7", "10U", "22U", "100U"], ["0805", "1210", "SMD"]),
+    ("LM", ["358", "324", "317", "393", "7805"], ["DIP8", "SOIC8", "TO220"]),
+    ("NE", ["555", "556", "5532"], ["DIP8", "SOIC8"]),
+    ("ATMEGA", ["328P", "32U4", "2560"], ["AU", "PU", "MU"]),
+    ("STM32", ["F103C8", "F401RE", "G031K6"], ["T6", "T7", "U6"]),
+    ("LED", ["RED", "GREEN", "BLUE", "WHITE"], ["3MM", "5MM", "0603"]),
+]
+
+
+@dataclass
+class Volumes:
+    parts: int = 100000
+    categories: int = 20
+    tags: int = 500
+    tagsPerPart: int = 3
+    locations: int = 2000
+    locationDepth: int = 4
+    locationsPerPart: int = 3
+    images: int = 200
+    datasheets: int = 200
+    seed: int = 0
+
+
+def insertRows(connection: Connection, table, rows: list[dict], batchSize: int) -> None:
+    # executemany with a plain insert, SQLAlchemy sends every batch as one prepared statement
+    for start in range(0, len(rows), batchSize):
+        connection.execute(insert(table), rows[start:start + batchSize])
+
+
+def makePdf(*pages: str) -> bytes:
+    """
+    Build the smallest valid PDF with one line of text on every page.
+    """
+    # Object 1 is the catalog, 2 the page tree, 3 the font, then a page and its content for every page
+    pageIds = [4 + 2 * i for i in range(len(pages))]
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{pageId} 0 R' for pageId in pageIds)}] /Count {len(pages)} >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for pageId, text in zip(pageIds, pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {pageId + 1} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return pdf.encode()
+
+
+def randomId(randomizer: random.Random) -> uuid.UUID:
+    # Ids come from the seeded generator, so a seed reproduces the whole dataset
+    return uuid.UUID(int=randomizer.getrandbits(128), version=4)
+
+
+def makeLocations(volumes: Volumes, randomizer: random.Random) -> list[dict]:
+    """
+    Build a tree of locations, breadth first, with volumes.locationDepth levels below the rooms.
+    """
+    branching = max(2, math.ceil(volumes.locations ** (1 / max(volumes.locationDepth, 1))))
+    locations: list[dict] = []
+    level = [None]
+    while len(locations) < volumes.locations:
+        nextLevel = []
+        for parent in level:
+            for i in range(branching):
+                if len(locations) >= volumes.locations:
+                    break
+                name = f"{parent['name']}.{i + 1}" if parent else f"Room {i + 1}"
+                location = {"id": randomId(randomizer), "name": name, "description": "", "image": None, "parent": parent["id"] if parent else None}
+                locations.append(location)
+                nextLevel.append(location)
+        level = nextLevel
+    return locations
+
+
+def generate(engine: Engine, volumes: Volumes, batchSize: int = 10000) -> dict[str, int]:
+    """
+    Insert the synthetic catalogue and return the number of rows per table.
+    The database must not contain parts yet, every table is written with bulk inserts in one transaction.
+    """
+    with engine.connect() as connection:
+        if connection.execute(select(func.count()).select_from(db.Parts)).scalar():
+            raise RuntimeError("The database already contains parts, the generator needs an empty database")
+    randomizer = random.Random(volumes.seed)
+    now = datetime.now(timezone.utc)
+    Path("data/images").mkdir(parents=True, exist_ok=True)
+    Path("data/datasheets").mkdir(parents=True, exist_ok=True)
+    images = []
+    for i in range(volumes.images):
+        path = Path("data/images") / f"generated-{i}.png"
+        Image.new("RGB", (50, 50), tuple(randomizer.randrange(256) for _ in range(3))).save(path)
+        images.append({"id": randomId(randomizer), "path": str(path)})
+    datasheets = []
+    for i in range(volumes.datasheets):
+        path = Path("data/datasheets") / f"generated-{i}.pdf"
+        path.write_bytes(makePdf(f"Generated datasheet {i}"))
+        datasheets.append({"id": randomId(randomizer), "path": str(path)})
+    categories = [{"id": randomId(randomizer), "name": f"Category {i}"} for i in range(volumes.categories)]
+    tags = [
+        {"id": randomId(randomizer), "name": f"tag-{i}", "categoryId": randomizer.choice(categories)["id"] if categories else None}
+        for i in range(volumes.tags)
+    ]
+    locations = makeLocations(volumes, randomizer)
+    # Parts are stored in the leaves of the tree, like drawers and boxes
+    parentIds = {location["parent"] for location in locations}
+    leaves = [location["id"] for location in locations if location["id"] not in parentIds] or [location["id"] for location in locations]
+    tagIds = [tag["id"] for tag in tags]
+    parts = []
+    partTags = []
+    inventory = []
+    movements = []
+    partTrigrams = []
+    for i in range(volumes.parts):
+        prefix, values, packages = FAMILIES[i % len(FAMILIES)]
+        name = f"{prefix}{randomizer.choice(values)}-{randomizer.choice(packages)}-{i}"
+        partId = randomId(randomizer)
+        stock = 0
+        for locationId in randomizer.sample(leaves, min(volumes.locationsPerPart, len(leaves))):
+            count = randomizer.randint(0, 500)
+            stock += count
+            inventory.append({"id": randomId(randomizer), "partId": partId, "locationId": locationId, "stock": count, "version": 0})
+            # The history starts with the receipt of the stock, so stock at past times adds up
+            movements.append({"partId": partId, "fromLocation": None, "toLocation": locationId, "delta": count, "username": "generator", "timestamp": now})
+        parts.append({
+            "id": partId,
+            "name": name,
+            "description": f"Generated {prefix} part",
+            "stock": stock,
+            "minStock": randomizer.randint(0, 50),
+            "image": randomizer.choice(images)["id"] if images else None,
+            "datasheet": randomizer.choice(datasheets)["id"] if datasheets else None,
+        })
+        for tagId in randomizer.sample(tagIds, min(volumes.tagsPerPart, len(tagIds))):
+            partTags.append({"partId": partId, "tagId": tagId})
+        partTrigrams.extend({"trigram": trigram, "partId": partId} for trigram in trigrams(name))
+    tables = [
+        (db.Images, images),
+        (db.Datasheets, datasheets),
+        (db.Categories, categories),
+        (db.Tags, tags),
+        (db.Locations, locations),
+        (db.Parts, parts),
+        (db.PartTagLinks, partTags),
+        (db.Inventory, inventory),
+        (db.Movements, movements),
+        (db.PartTrigrams, partTrigrams),
+    ]
+    counts = {}
+    with engine.begin() as connection:
+        for model, rows in tables:
+            start = perf_counter()
+            insertRows(connection, model.__table__, rows, batchSize)
+            counts[model.__tablename__] = len(rows)
+            logger.info(f"Inserted {len(rows)} rows into {model.__tablename__} in {perf_counter() - start:.1f} s")
+    return counts
+
+
+if __name__ == "__main__":
+    from src import configureLogging
+    import src.dependencies as dependencies
+
+    defaults = Volumes()
+    parser = argparse.ArgumentParser(prog="python -m src.generator", description="Fill an empty database with synthetic data")
+    for field, default in vars(defaults).items():
+        parser.add_argument(f"--{field}", type=int, default=default)
+    parser.add_argument("--batchSize", type=int, default=10000, help="Rows per insert statement")
+    args = parser.parse_args()
+
+    if Path("logger.yaml").exists():
+        configureLogging()
+    else:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    dependencies.loadConfig()
+    db.initialize()
+    start = perf_counter()
+    counts = generate(db.engine, Volumes(**{field: getattr(args, field) for field in vars(defaults)}), args.batchSize)
+    print(f"Inserted {sum(counts.values())} rows in {perf_counter() - start:.1f} s")
+    for table, count in counts.items():
+        print(f"{table}: {count}")
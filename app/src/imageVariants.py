@@ -0,0 +1,97 @@
+import io
+import zlib
+import asyncio
+from logging import getLogger
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+import src.dependencies as dependencies
+from src.startup import fileLock
+
+
+logger = getLogger(__name__)
+
+# Pillow format names of the formats a variant can be rendered in
+FORMATS = {
+    "avif": "AVIF",
+    "webp": "WEBP",
+    "png": "PNG",
+    "jpeg": "JPEG",
+}
+SUFFIXFORMATS = {".png": "png", ".jpg": "jpeg", ".jpeg": "jpeg"}
+# Renders in progress, requests for the same missing variant wait for the first one
+PENDING: dict[str, asyncio.Future] = {}
+# Renders of the same variant in different worker processes share one of these lock files
+RENDERLOCKS = 64
+
+
+def negotiateFormat(accept: str, suffix: str) -> str:
+    """
+    Pick the smallest format the client accepts, the format of the original otherwise.
+    """
+    accepted = set()
+    for item in accept.split(","):
+        mediaType, _, parameters = item.partition(";")
+        if parameters.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(mediaType.strip().lower())
+    if "image/avif" in accepted and features.check("avif"):
+        return "avif"
+    if "image/webp" in accepted and features.check("webp"):
+        return "webp"
+    return SUFFIXFORMATS.get(suffix.lower(), "png")
+
+
+def renderVariant(source: Path, size: int, format: str) -> bytes:
+    """
+    Scale the image to fit into a square of the given size, keeping its aspect ratio.
+    """
+    with Image.open(source) as image:
+        # JPEGs are decoded at a reduced scale directly, much faster for large photos
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        if format == "jpeg":
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        stream = io.BytesIO()
+        image.save(stream, format=FORMATS[format])
+    return stream.getvalue()
+
+
+def createVariant(source: Path, key: str, size: int, format: str) -> tuple[bytes, bool]:
+    """
+    Render a variant and store it in the cache, unless another worker process stored it in the meantime.
+    Returns the data and whether it was rendered.
+    """
+    cache = dependencies.VARIANTCACHE
+    with fileLock(cache.path / f".render-{zlib.crc32(key.encode()) % RENDERLOCKS}.lock"):
+        data = cache.read(key)
+        if data is not None:
+            return data, False
+        data = renderVariant(source, size, format)
+        cache.put(key, data)
+    return data, True
+
+
+async def getVariant(source: Path, key: str, size: int, format: str) -> tuple[bytes, str]:
+    """
+    Get a variant from the cache or render it in the image worker pool.
+    Returns the data and whether it was a hit, miss or shared render.
+    """
+    # Variants are small, the data is read at once so another process may evict the file right after
+    data = dependencies.VARIANTCACHE.read(key)
+    if data is not None:
+        return data, "hit"
+    pending = PENDING.get(key)
+    if pending is not None:
+        # Shielded, a client closing the connection does not cancel the render of the others
+        data, _ = await asyncio.shield(pending)
+        return data, "shared"
+    pending = asyncio.get_running_loop().run_in_executor(dependencies.IMAGEEXECUTOR, createVariant, source, key, size, format)
+    PENDING[key] = pending
+    pending.add_done_callback(lambda _: PENDING.pop(key, None))
+    data, rendered = await asyncio.shield(pending)
+    return data, "miss" if rendered else "hit"
@@ -1,3 +1,4 @@
+import re
 import logging
 
 
@@ -5,33 +6,46 @@ class RedactingFilter(logging.Filter):
     """
     A filter that redacts sensitive information from log messages.
     """
+    replacement = "<<SECRET>>"
 
     def __init__(self, sensitiveFields: list[str]):
         super().__init__()
         self.sensitiveFields = sensitiveFields
+        # One pattern for all fields, matching "field=value" up to the next separator
+        self.pattern = re.compile(f"({'|'.join(re.escape(field) for field in sensitiveFields)})=[^&\\s\"']*")
+
+
+    def redact(self, value):
+        """
+        Redact a string, other values are returned unchanged.
+        """
+        # Every match needs a "=", so most strings are skipped without running the pattern
+        if type(value) is not str or "=" not in value:
+            return value
+        return self.pattern.sub(self.substitute, value)
+
+
+    def substitute(self, match: re.Match) -> str:
+        # A function is faster than a replacement template with group references
+        return match.group(1) + "=" + self.replacement
 
 
     def filter(self, record: logging.LogRecord) -> bool:
         """
         Filter the log record to redact sensitive information.
+        Redacting is idempotent, attach the filter to the queue handler so it runs once per record.
         """
-        for field in self.sensitiveFields:
-            if record.args is None:
-                continue
-            if len(record.args) != 5:
-                continue
-            args = list(record.args)
-            args[0] = "<<SECRET>>"
-            msg = str(args[2])
-            if field in msg:
-                start = msg.index(field)
-                lenght = len(field) + 1
-                end = msg[start + lenght:].find("&")
-                if end == -1:
-                    end = len(msg)
-                else:
-                    end += start + lenght
-                msg = msg[:start + lenght] + "<<SECRET>>" + msg[end:]
-                args[2] = msg
-            record.args = tuple(args)
+        msg = record.msg
+        if type(msg) is str and "=" in msg:
+            record.msg = self.redact(msg)
+        args = record.args
+        if not args or type(args) is not tuple:
+            return True
+        # Access logs carry the client address as first argument
+        if record.name == "uvicorn.access" and len(args) == 5:
+            args = record.args = (self.replacement,) + args[1:]
+        for arg in args:
+            if type(arg) is str and "=" in arg:
+                record.args = tuple([self.redact(arg) for arg in args])
+                break
         return True
@@ -0,0 +1,27 @@
+import json
+import logging
+from datetime import datetime, timezone
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    A formatter that writes every record as a single JSON object per line.
+    """
+
+    def __init__(self, fields: list[str] | None = None):
+        super().__init__()
+        self.fields = fields or ["levelname", "name", "lineno", "process", "threadName"]
+
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "message": record.getMessage()
+        }
+        for field in self.fields:
+            entry[field] = getattr(record, field, None)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
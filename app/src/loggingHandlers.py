@@ -0,0 +1,39 @@
+import copy
+import atexit
+import logging
+import logging.handlers
+from queue import SimpleQueue
+
+
+class QueueListenerHandler(logging.handlers.QueueHandler):
+    """
+    A queue handler which starts its own listener, so the given handlers run on a background thread.
+    Log calls only put the record into the queue and never wait for file or console I/O.
+    """
+
+    def __init__(self, handlers: list, respectHandlerLevel: bool = True):
+        super().__init__(SimpleQueue())
+        # Handlers are passed as cfg:// references, which dictConfig only resolves on item access
+        targets = [handlers[index] for index in range(len(handlers))]
+        for target in targets:
+            if not isinstance(target, logging.Handler):
+                raise ValueError(f"Queue target is not a configured handler: {target}")
+        self.listener = logging.handlers.QueueListener(self.queue, *targets, respect_handler_level=respectHandlerLevel)
+        self.listener.start()
+        atexit.register(self.close)
+
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now, as they might change before the listener formats the record.
+        # Exceptions are kept and formatted on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+    def close(self) -> None:
+        # Stopping the listener flushes all queued records to the targets
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
@@ -0,0 +1,174 @@
+import time
+import random
+import cProfile
+from bisect import bisect_left
+from threading import Lock
+from logging import getLogger
+from pathlib import Path
+from datetime import datetime
+
+from src.dependencies import config
+from src.queryInspector import RequestStats, currentStats, checkRequest
+
+
+logger = getLogger(__name__)
+LATENCYBUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZEBUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUERYBUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+profilePath = Path("data/profiles")
+# cProfile has one profiling hook per thread, a second profiler would take it over from the first
+PROFILELOCK = Lock()
+
+
+class Histogram:
+    """
+    A cumulative histogram in the Prometheus format.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            lines.append(f"{name}_bucket{{{labels},le=\"{bound}\"}} {total}")
+        lines.append(f"{name}_bucket{{{labels},le=\"+Inf\"}} {self.count}")
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Registry:
+    """
+    Holds all metrics of this process, keyed by method and route template.
+    """
+
+    def __init__(self):
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.responseSize: dict[tuple[str, str], Histogram] = {}
+        self.queries: dict[tuple[str, str], Histogram] = {}
+        self.queryTime: dict[tuple[str, str], float] = {}
+        self._lock = Lock()
+
+
+    def record(self, method: str, route: str, statusCode: int, duration: float, size: int, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, statusCode)] = self.requests.get((method, route, statusCode), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCYBUCKETS)
+                self.responseSize[key] = Histogram(SIZEBUCKETS)
+                self.queries[key] = Histogram(QUERYBUCKETS)
+                self.queryTime[key] = 0.0
+            self.latency[key].observe(duration)
+            self.responseSize[key].observe(size)
+            self.queries[key].observe(stats.queries)
+            self.queryTime[key] += stats.queryTime
+
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, statusCode), count in self.requests.items():
+                lines.append(f"http_requests_total{{method=\"{method}\",route=\"{route}\",status=\"{statusCode}\"}} {count}")
+            for name, histograms in (
+                ("http_request_duration_seconds", self.latency),
+                ("http_response_size_bytes", self.responseSize),
+                ("db_statements_per_request", self.queries)
+            ):
+                lines.append(f"# TYPE {name} histogram")
+                for (method, route), histogram in histograms.items():
+                    lines.extend(histogram.render(name, f"method=\"{method}\",route=\"{route}\""))
+            lines.append("# TYPE db_statement_duration_seconds_total counter")
+            for (method, route), total in self.queryTime.items():
+                lines.append(f"db_statement_duration_seconds_total{{method=\"{method}\",route=\"{route}\"}} {total}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, response size and database statements per route.
+    Single requests are profiled when sampled or requested with the "X-Profile" header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = currentStats.set(stats)
+        start = time.perf_counter()
+        response = {"status": 500, "size": 0}
+
+        async def sendWrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(stats.queries).encode()))
+                headers.append((b"x-response-time", f"{(time.perf_counter() - start) * 1000:.2f}ms".encode()))
+                message["headers"] = headers
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        profiler = None
+        # Requests arriving while another one is profiled are not profiled
+        if self.shouldProfile(scope) and PROFILELOCK.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, sendWrapper)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                PROFILELOCK.release()
+            currentStats.reset(token)
+            route = scope.get("route")
+            routePath = route.path if route is not None else "unmatched"
+            duration = time.perf_counter() - start
+            REGISTRY.record(scope["method"], routePath, response["status"], duration, response["size"], stats)
+            checkRequest(stats, scope["method"], routePath)
+            if profiler is not None:
+                self.saveProfile(profiler, scope["method"], routePath, duration)
+
+
+    @staticmethod
+    def shouldProfile(scope) -> bool:
+        if config.profileHeader:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile" and value not in (b"", b"0"):
+                    return True
+        return config.profileSampleRate > 0 and random.random() < config.profileSampleRate
+
+
+    @staticmethod
+    def saveProfile(profiler: cProfile.Profile, method: str, route: str, duration: float) -> None:
+        # Profiles only cover the event loop thread and may include other concurrent requests
+        profilePath.mkdir(parents=True, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{method}-{route.strip('/').replace('/', '_').replace('{', '').replace('}', '') or 'root'}.prof"
+        profiler.dump_stats(profilePath / name)
+        logger.info(f"Saved profile of {method} {route} ({duration * 1000:.1f} ms) to {profilePath / name}")
@@ -0,0 +1,72 @@
+import time
+from logging import getLogger
+from types import ModuleType
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from src.migrations import v001_indexes, v002_partStock, v003_inventoryVersion, v004_partTrigrams, v005_datasheetPages, v006_datasheetPreviewError
+
+
+logger = getLogger(__name__)
+
+# Applied in order, a migration must never be changed once it was released
+MIGRATIONS: list[ModuleType] = [
+    v001_indexes,
+    v002_partStock,
+    v003_inventoryVersion,
+    v004_partTrigrams,
+    v005_datasheetPages,
+    v006_datasheetPreviewError,
+]
+
+
+def createVersionTable(connection: Connection) -> None:
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schemaversions ("
+        "version INTEGER PRIMARY KEY, "
+        "description TEXT NOT NULL, "
+        "applied TEXT NOT NULL)"
+    ))
+
+
+def getVersion(engine: Engine) -> int:
+    """
+    Get the version of the newest applied migration, 0 if none was applied.
+    """
+    with engine.begin() as connection:
+        createVersionTable(connection)
+        version = connection.execute(text("SELECT MAX(version) FROM schemaversions")).scalar()
+    return version or 0
+
+
+def getPending(engine: Engine) -> list[tuple[int, ModuleType]]:
+    """
+    Get the migrations which were not applied yet, with their version.
+    """
+    current = getVersion(engine)
+    return [(version, migration) for version, migration in enumerate(MIGRATIONS, start=1) if version > current]
+
+
+def migrate(engine: Engine, target: int | None = None) -> int:
+    """
+    Apply all pending migrations up to the target version and return the new version.
+    Only call this while holding the startup lock, so a single process migrates.
+    """
+    version = getVersion(engine)
+    for migrationVersion, migration in getPending(engine):
+        if target is not None and migrationVersion > target:
+            break
+        logger.info(f"Applying migration {migrationVersion}: {migration.description}")
+        start = time.perf_counter()
+        # A migration may commit several times, it is recorded only once it completed
+        migration.upgrade(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                text("INSERT INTO schemaversions (version, description, applied) VALUES (:version, :description, :applied)"),
+                {"version": migrationVersion, "description": migration.description, "applied": datetime.now(timezone.utc).isoformat()}
+            )
+        version = migrationVersion
+        logger.info(f"Applied migration {migrationVersion} in {time.perf_counter() - start:.2f} s")
+    return version
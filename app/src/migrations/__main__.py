@@ -0,0 +1,38 @@
+"""
+Apply or list database migrations without starting the server.
+
+Run from the app folder:
+    python -m src.migrations status
+    python -m src.migrations upgrade [version]
+"""
+import logging
+import argparse
+from pathlib import Path
+
+from src import configureLogging
+import src.database as db
+import src.dependencies as dependencies
+from src.migrations import getVersion, getPending
+
+
+parser = argparse.ArgumentParser(prog="python -m src.migrations", description="Manage database migrations")
+commands = parser.add_subparsers(dest="command", required=True)
+commands.add_parser("status", help="Show the current version and pending migrations")
+upgradeParser = commands.add_parser("upgrade", help="Apply pending migrations")
+upgradeParser.add_argument("version", type=int, nargs="?", default=None, help="Stop after this version")
+args = parser.parse_args()
+
+if Path("logger.yaml").exists():
+    configureLogging()
+else:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+dependencies.loadConfig()
+
+match args.command:
+    case "status":
+        print(f"Current version: {getVersion(db.engine)}")
+        for version, migration in getPending(db.engine):
+            print(f"Pending {version}: {migration.description}")
+    case "upgrade":
+        db.initialize(args.version)
+        print(f"Current version: {getVersion(db.engine)}")
@@ -0,0 +1,51 @@
+import time
+from logging import getLogger
+from typing import Callable, Iterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+
+logger = getLogger(__name__)
+
+
+def batches(engine: Engine, table: str, key: str, batchSize: int) -> Iterator[list]:
+    """
+    Yield the keys of a table in ordered batches, paging by key instead of offset so every batch is an index range scan.
+    """
+    last = None
+    while True:
+        with engine.connect() as connection:
+            if last is None:
+                stmt = text(f"SELECT {key} FROM {table} ORDER BY {key} LIMIT :limit")
+                keys = connection.execute(stmt, {"limit": batchSize}).scalars().all()
+            else:
+                stmt = text(f"SELECT {key} FROM {table} WHERE {key} > :last ORDER BY {key} LIMIT :limit")
+                keys = connection.execute(stmt, {"last": last, "limit": batchSize}).scalars().all()
+        if not keys:
+            return
+        yield list(keys)
+        last = keys[-1]
+
+
+def backfill(engine: Engine, table: str, key: str, update: Callable[[Connection, list], None], batchSize: int, pause: float = 0.0) -> int:
+    """
+    Run update for all rows of a table in batches, every batch in its own short transaction.
+    Other writers only wait for a single batch, not for the whole table.
+    The update must be idempotent, an interrupted backfill starts over on the next run.
+    Returns the number of processed rows.
+    """
+    with engine.connect() as connection:
+        total = connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() or 0
+    done = 0
+    start = time.perf_counter()
+    for keys in batches(engine, table, key, batchSize):
+        with engine.begin() as connection:
+            update(connection, keys)
+        done += len(keys)
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        logger.info(f"Backfill of {table}: {done}/{total} rows ({rate:.0f} rows/s)")
+        if pause:
+            # Leaves a gap for other writers between batches
+            time.sleep(pause)
+    return done
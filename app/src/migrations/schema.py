@@ -0,0 +1,15 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def hasColumn(connection: Connection, table: str, column: str) -> bool:
+    rows = connection.execute(text(f'PRAGMA table_info("{table}")'))
+    return any(row[1] == column for row in rows)
+
+
+def addColumn(connection: Connection, table: str, column: str, definition: str) -> None:
+    """
+    Add a column unless it exists, new databases already have it from the models.
+    """
+    if not hasColumn(connection, table, column):
+        connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {definition}'))
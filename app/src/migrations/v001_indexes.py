@@ -0,0 +1,13 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+description = "Index the foreign keys of inventory and part tag links"
+
+
+def upgrade(engine: Engine) -> None:
+    # New databases already have these indexes from the models, so they are only created if missing
+    with engine.begin() as connection:
+        connection.execute(text('CREATE INDEX IF NOT EXISTS "ix_inventory_partId" ON inventory ("partId")'))
+        connection.execute(text('CREATE INDEX IF NOT EXISTS "ix_inventory_locationId" ON inventory ("locationId")'))
+        connection.execute(text('CREATE INDEX IF NOT EXISTS "ix_parttaglinks_tagId" ON parttaglinks ("tagId")'))
@@ -0,0 +1,20 @@
+from sqlalchemy import text, bindparam
+from sqlalchemy.engine import Connection, Engine
+
+from src.dependencies import config
+from src.migrations.backfill import backfill
+
+
+description = "Recompute the stock of every part from its inventory"
+
+
+def updateStock(connection: Connection, keys: list) -> None:
+    stmt = text(
+        'UPDATE parts SET stock = COALESCE((SELECT SUM(inventory.stock) FROM inventory WHERE inventory."partId" = parts.id), 0) '
+        "WHERE id IN :keys"
+    ).bindparams(bindparam("keys", expanding=True))
+    connection.execute(stmt, {"keys": keys})
+
+
+def upgrade(engine: Engine) -> None:
+    backfill(engine, "parts", "id", updateStock, config.migrationBatchSize)
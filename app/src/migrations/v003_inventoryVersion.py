@@ -0,0 +1,11 @@
+from sqlalchemy.engine import Engine
+
+from src.migrations.schema import addColumn
+
+
+description = "Add a version column to inventory for optimistic concurrency"
+
+
+def upgrade(engine: Engine) -> None:
+    with engine.begin() as connection:
+        addColumn(connection, "inventory", "version", "INTEGER NOT NULL DEFAULT 0")
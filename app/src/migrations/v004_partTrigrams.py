@@ -0,0 +1,23 @@
+from sqlalchemy import text, bindparam
+from sqlalchemy.engine import Connection, Engine
+
+from src.dependencies import config
+from src.migrations.backfill import backfill
+from src.similarity import trigrams
+
+
+description = "Index the trigrams of all part names"
+
+
+def indexNames(connection: Connection, keys: list) -> None:
+    stmt = text("SELECT id, name FROM parts WHERE id IN :keys").bindparams(bindparam("keys", expanding=True))
+    parts = connection.execute(stmt, {"keys": keys}).all()
+    stmt = text('DELETE FROM parttrigrams WHERE "partId" IN :keys').bindparams(bindparam("keys", expanding=True))
+    connection.execute(stmt, {"keys": keys})
+    rows = [{"trigram": trigram, "partId": partId} for partId, name in parts for trigram in trigrams(name)]
+    if rows:
+        connection.execute(text('INSERT INTO parttrigrams (trigram, "partId") VALUES (:trigram, :partId)'), rows)
+
+
+def upgrade(engine: Engine) -> None:
+    backfill(engine, "parts", "id", indexNames, config.migrationBatchSize)
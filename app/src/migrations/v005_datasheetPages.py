@@ -0,0 +1,14 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+description = "Add a full text index of the datasheet pages"
+
+
+def upgrade(engine: Engine) -> None:
+    # SQLModel can not create virtual tables, the table is only created here
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS datasheetpages USING fts5("
+            "\"datasheetId\" UNINDEXED, page UNINDEXED, text, tokenize = 'porter unicode61')"
+        ))
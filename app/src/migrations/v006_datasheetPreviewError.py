@@ -0,0 +1,11 @@
+from sqlalchemy.engine import Engine
+
+from src.migrations.schema import addColumn
+
+
+description = "Add a column for the preview errors of datasheets"
+
+
+def upgrade(engine: Engine) -> None:
+    with engine.begin() as connection:
+        addColumn(connection, "datasheettexts", "previewError", "TEXT")
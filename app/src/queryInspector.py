@@ -0,0 +1,101 @@
+import re
+import time
+from logging import getLogger
+from functools import lru_cache
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.dependencies import config
+
+
+logger = getLogger(__name__)
+WHITESPACE = re.compile(r"\s+")
+INLIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)")
+LITERAL = re.compile(r"\b\d+\b|'(?:[^']|'')*'")
+
+
+class RequestStats:
+    """
+    Statistics collected while a single request is handled.
+    """
+    __slots__ = ("queries", "queryTime", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.queryTime = 0.0
+        self.statements: dict[str, int] = {}
+
+
+currentStats: ContextVar[RequestStats | None] = ContextVar("currentStats", default=None)
+
+
+@lru_cache(maxsize=1024)
+def statementShape(statement: str) -> str:
+    """
+    Reduce a statement to its shape, so statements only differing in literals or IN list lengths match.
+    """
+    shape = WHITESPACE.sub(" ", statement).strip()
+    shape = LITERAL.sub("?", shape)
+    return INLIST.sub("(?...)", shape)
+
+
+def redactParameters(parameters) -> str:
+    """
+    Describe statement parameters by type only, so no values end up in the logs.
+    """
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f"[{len(parameters)} x {redactParameters(parameters[0])}]"
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def beforeCursorExecute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("inspectorStart", []).append(time.perf_counter())
+    stats = currentStats.get()
+    if stats is not None:
+        shape = statementShape(statement)
+        stats.statements[shape] = stats.statements.get(shape, 0) + 1
+
+
+def afterCursorExecute(conn, cursor, statement, parameters, context, executemany) -> None:
+    duration = (time.perf_counter() - conn.info["inspectorStart"].pop()) * 1000
+    stats = currentStats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.queryTime += duration / 1000
+    if config.slowQueryThreshold > 0 and duration >= config.slowQueryThreshold:
+        logger.warning(f"Slow query ({duration:.1f} ms): {WHITESPACE.sub(' ', statement)} - Parameters: {redactParameters(parameters)}")
+
+
+def handleError(context) -> None:
+    # Failed statements never reach afterCursorExecute
+    if context.connection is not None:
+        starts = context.connection.info.get("inspectorStart")
+        if starts:
+            starts.pop()
+
+
+def instrumentEngine(engine: Engine) -> None:
+    """
+    Count, time and record the shape of all statements of the engine for the current request and log slow statements.
+    """
+    event.listen(engine, "before_cursor_execute", beforeCursorExecute)
+    event.listen(engine, "after_cursor_execute", afterCursorExecute)
+    event.listen(engine, "handle_error", handleError)
+
+
+def checkRequest(stats: RequestStats, method: str, route: str) -> list[str]:
+    """
+    Log and return all statement shapes which were repeated often enough within one request to hint at an N+1 query.
+    """
+    if config.nPlusOneThreshold <= 0:
+        return []
+    repeated = [shape for shape, count in stats.statements.items() if count >= config.nPlusOneThreshold]
+    for shape in repeated:
+        logger.warning(f"Possible N+1 query in {method} {route}, executed {stats.statements[shape]} times: {shape}")
+    return repeated
@@ -0,0 +1,42 @@
+import time
+from threading import Lock
+from collections import deque
+
+
+class RateLimiter:
+    """
+    A sliding window rate limiter which allows a number of hits per key within a window.
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._hits: dict[str, deque[float]] = {}
+        self._lock = Lock()
+
+
+    def hit(self, key: str) -> float:
+        """
+        Record a hit for the key and return 0 if it is allowed,
+        otherwise the seconds until the next hit would be allowed.
+        """
+        if self.limit <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                if len(self._hits) > 10000:
+                    self._prune(now)
+                hits = self._hits[key] = deque()
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return hits[0] + self.window - now
+            hits.append(now)
+        return 0
+
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, hits in self._hits.items() if not hits or hits[-1] <= now - self.window]:
+            del self._hits[key]
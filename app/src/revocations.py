@@ -0,0 +1,67 @@
+import os
+import json
+import time
+from pathlib import Path
+
+
+class RevocationLog:
+    """
+    An append only file of token revocations shared by all worker processes.
+    Every process reads the entries appended since its last read, so a logout reaches all workers.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+        # The file is replaced when another process compacts it, the offset is only valid for the same file
+        self.inode = None
+
+
+    def append(self, entry: dict) -> None:
+        # Appends of a single short line are not interleaved with appends of other processes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+    def read(self) -> list[dict]:
+        """
+        Return all entries appended since the last read, this is a single stat call when nothing changed.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self.inode:
+            # A new or compacted file, entries are idempotent so it is read from the start
+            self.inode = stat.st_ino
+            self.offset = 0
+        size = stat.st_size
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        # An entry which is still being written is read next time
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        return [json.loads(line) for line in data[:end].splitlines() if line]
+
+
+    def compact(self, maxSize: int = 1048576) -> None:
+        """
+        Drop expired entries once the file grew larger than maxSize, only call this while holding the startup lock.
+        """
+        if not self.path.exists():
+            # Reading an existing file is cheaper than handling a missing one on every request
+            self.path.touch()
+            return
+        if self.path.stat().st_size <= maxSize:
+            return
+        now = time.time()
+        with open(self.path, "r") as f:
+            lines = [line for line in f if line.strip() and json.loads(line)["expires"] > now]
+        temporaryPath = self.path.with_suffix(".tmp")
+        with open(temporaryPath, "w") as f:
+            f.writelines(lines)
+        os.replace(temporaryPath, self.path)
@@ -8,7 +8,8 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from sqlmodel import Session, select
 
 import src.database as db
-from src.dependencies import getPasswordHash, isAdmin
+import src.dependencies as dependencies
+from src.dependencies import hashPassword, isAdmin
 from src.schemes import User
 
 
@@ -43,7 +44,7 @@ async def addUser(user: Annotated[User, Depends(isAdmin)], username: str, passwo
             headers={"WWW-Authenticate": "Bearer"}
         )
     salt = b64encode(os.urandom(16)).decode()
-    hashedPassword = getPasswordHash(password, salt)
+    hashedPassword = await hashPassword(password, salt)
     with Session(db.engine) as session:
         newUser = db.Users(
             username=username,
@@ -138,3 +139,5 @@ async def reloadDatasheets(user: Annotated[User, Depends(isAdmin)]) -> None:
             session.add(newDatasheet)
         logger.info(f"Added {len(datasheets)} datasheets")
         session.commit()
+    # The datasheets got new ids, their text is indexed again
+    dependencies.DATASHEETSCHANGED.set()
@@ -0,0 +1,192 @@
+import uuid
+from logging import getLogger
+from typing import Annotated
+from collections import defaultdict
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from sqlmodel import Session, select
+from sqlalchemy.orm import aliased
+
+import src.database as db
+from src.dependencies import getCurrentUser, validateString
+from src.schemes import User, AttributeDefinition, AttributeSearch
+from src.units import parseQuantity
+
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+
+def getDefinitions(session: Session, names: set[str], category: str | None) -> dict[str, list[db.AttributeDefinitions]]:
+    """
+    Get the definitions of the given attribute names with one statement, optionally only of one category.
+    """
+    stmt = select(db.AttributeDefinitions).where(db.AttributeDefinitions.name.in_(names))  # type: ignore
+    if category is not None:
+        stmt = stmt.join(db.Categories, db.Categories.id == db.AttributeDefinitions.categoryId).where(db.Categories.name == category)  # type: ignore
+    definitions = defaultdict(list)
+    for definition in session.exec(stmt):
+        definitions[definition.name].append(definition)
+    return definitions
+
+
+def getDefinition(definitions: dict[str, list[db.AttributeDefinitions]], name: str) -> db.AttributeDefinitions:
+    if not definitions.get(name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No attribute was found with the name: {name}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if len(definitions[name]) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Attribute {name} exists in several categories, a category is required",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return definitions[name][0]
+
+
+def parseValue(definition: db.AttributeDefinitions, value: str | float) -> float:
+    try:
+        return parseQuantity(value, definition.unit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Attribute {definition.name}: {e}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@router.get("/definitions")
+async def getAttributeDefinitions(user: Annotated[User, Depends(getCurrentUser)], category: str | None = None) -> list[dict]:
+    with Session(db.engine) as session:
+        stmt = select(db.AttributeDefinitions, db.Categories.name).join(db.Categories, db.Categories.id == db.AttributeDefinitions.categoryId)  # type: ignore
+        if category is not None:
+            stmt = stmt.where(db.Categories.name == category)
+        return [
+            {"id": definition.id, "category": categoryName, "name": definition.name, "unit": definition.unit, "numeric": definition.numeric}
+            for definition, categoryName in session.exec(stmt)
+        ]
+
+
+@router.post("/definitions")
+async def addAttributeDefinition(definition: AttributeDefinition, user: Annotated[User, Depends(getCurrentUser)]) -> None:
+    validateString(definition.category)
+    validateString(definition.name)
+    with Session(db.engine) as session:
+        category = session.exec(select(db.Categories).where(db.Categories.name == definition.category)).first()
+        if category is None:
+            category = db.Categories(name=definition.category)
+            session.add(category)
+        else:
+            stmt = select(db.AttributeDefinitions).where(
+                db.AttributeDefinitions.categoryId == category.id,
+                db.AttributeDefinitions.name == definition.name
+            )
+            if session.exec(stmt).first() is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Attribute {definition.name} already exists in category {definition.category}",
+                    headers={"WWW-Authenticate": "Bearer"}
+                )
+        session.add(db.AttributeDefinitions(
+            categoryId=category.id,
+            name=definition.name,
+            unit=definition.unit,
+            numeric=definition.numeric
+        ))
+        session.commit()
+
+
+@router.get("/parts/{partId}")
+async def getPartAttributes(partId: uuid.UUID, user: Annotated[User, Depends(getCurrentUser)]) -> dict:
+    with Session(db.engine) as session:
+        stmt = (
+            select(db.AttributeDefinitions.name, db.PartAttributes.numericValue, db.PartAttributes.textValue)
+            .join(db.AttributeDefinitions, db.AttributeDefinitions.id == db.PartAttributes.attributeId)  # type: ignore
+            .where(db.PartAttributes.partId == partId)
+        )
+        return {name: numericValue if numericValue is not None else textValue for name, numericValue, textValue in session.exec(stmt)}
+
+
+@router.put("/parts/{partId}")
+async def setPartAttributes(
+    partId: uuid.UUID,
+    values: dict[str, str | float | None],
+    user: Annotated[User, Depends(getCurrentUser)],
+    category: str | None = None
+) -> None:
+    with Session(db.engine) as session:
+        if session.get(db.Parts, partId) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No part was found with the id: {partId}",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        if category is not None:
+            validateString(category)
+            if session.exec(select(db.Categories.id).where(db.Categories.name == category)).first() is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"No category was found with the name: {category}",
+                    headers={"WWW-Authenticate": "Bearer"}
+                )
+        definitions = getDefinitions(session, set(values), category)
+        stmt = select(db.PartAttributes).where(db.PartAttributes.partId == partId)
+        existing = {attribute.attributeId: attribute for attribute in session.exec(stmt)}
+        for name, value in values.items():
+            definition = getDefinition(definitions, name)
+            attribute = existing.get(definition.id)
+            # None removes the value
+            if value is None:
+                if attribute is not None:
+                    session.delete(attribute)
+                continue
+            if attribute is None:
+                attribute = db.PartAttributes(partId=partId, attributeId=definition.id)
+            if definition.numeric:
+                attribute.numericValue = parseValue(definition, value)
+                attribute.textValue = None
+            else:
+                attribute.numericValue = None
+                attribute.textValue = validateString(str(value))
+            session.add(attribute)
+        session.commit()
+
+
+@router.post("/search")
+async def searchParts(search: AttributeSearch, user: Annotated[User, Depends(getCurrentUser)]) -> list[dict]:
+    with Session(db.engine) as session:
+        definitions = getDefinitions(session, {attributeFilter.attribute for attributeFilter in search.filters}, search.category)
+        # Every filter joins its own alias of the value table, so all filters run as one statement
+        # and each one is an index range scan on (attributeId, value)
+        stmt = select(db.Parts.id, db.Parts.name, db.Parts.stock)
+        for attributeFilter in search.filters:
+            definition = getDefinition(definitions, attributeFilter.attribute)
+            value = aliased(db.PartAttributes)
+            stmt = stmt.join(value, (value.partId == db.Parts.id) & (value.attributeId == definition.id))  # type: ignore
+            if definition.numeric:
+                if attributeFilter.equals is not None:
+                    stmt = stmt.where(value.numericValue == parseValue(definition, attributeFilter.equals))
+                if attributeFilter.min is not None:
+                    stmt = stmt.where(value.numericValue >= parseValue(definition, attributeFilter.min))  # type: ignore
+                if attributeFilter.max is not None:
+                    stmt = stmt.where(value.numericValue <= parseValue(definition, attributeFilter.max))  # type: ignore
+            else:
+                if attributeFilter.equals is not None:
+                    stmt = stmt.where(value.textValue == str(attributeFilter.equals))
+                if attributeFilter.min is not None:
+                    stmt = stmt.where(value.textValue >= str(attributeFilter.min))  # type: ignore
+                if attributeFilter.max is not None:
+                    stmt = stmt.where(value.textValue <= str(attributeFilter.max))  # type: ignore
+        stmt = stmt.order_by(db.Parts.name).limit(search.limit)
+        parts = {partId: {"id": partId, "name": name, "stock": stock, "attributes": {}} for partId, name, stock in session.exec(stmt)}
+        if parts:
+            stmt = (
+                select(db.PartAttributes.partId, db.AttributeDefinitions.name, db.PartAttributes.numericValue, db.PartAttributes.textValue)
+                .join(db.AttributeDefinitions, db.AttributeDefinitions.id == db.PartAttributes.attributeId)  # type: ignore
+                .where(db.PartAttributes.partId.in_(parts))  # type: ignore
+            )
+            for partId, name, numericValue, textValue in session.exec(stmt):
+                parts[partId]["attributes"][name] = numericValue if numericValue is not None else textValue
+    return list(parts.values())
@@ -0,0 +1,97 @@
+import uuid
+from logging import getLogger
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import JSONResponse
+from sqlmodel import Session, select
+
+import src.database as db
+from src.dependencies import config, getCurrentUser, validateStrings
+from src.schemes import User, Bom
+
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+
+def suggestPicks(locations: list[tuple[uuid.UUID, str, int]], required: int) -> list[dict]:
+    """
+    Pick from the locations holding the most first, so a line needs as few picks as possible.
+    The locations must be sorted by stock, largest first.
+    """
+    picks = []
+    for locationId, name, stock in locations:
+        if required <= 0:
+            break
+        quantity = min(stock, required)
+        picks.append({"locationId": str(locationId), "location": name, "quantity": quantity})
+        required -= quantity
+    return picks
+
+
+@router.post("/check")
+async def checkBom(bom: Bom, user: Annotated[User, Depends(getCurrentUser)]) -> JSONResponse:
+    if len(bom.lines) > config.bomMaxLines:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A BOM can have at most {config.bomMaxLines} lines",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    for line in bom.lines:
+        if line.partId is None and not line.name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Every BOM line needs a partId or name",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+    validateStrings([line.name for line in bom.lines if line.name is not None])
+    ids = {line.partId for line in bom.lines if line.partId is not None}
+    names = {line.name for line in bom.lines if line.partId is None}
+    with Session(db.engine) as session:
+        # All lines are resolved with one statement and all stock is read with a second one
+        stmt = select(db.Parts.id, db.Parts.name).where(db.Parts.id.in_(ids) | db.Parts.name.in_(names))  # type: ignore
+        parts = session.exec(stmt).all()
+        partIds = {partId for partId, _ in parts}
+        stmt = (
+            select(db.Inventory.partId, db.Inventory.locationId, db.Locations.name, db.Inventory.stock)
+            .join(db.Locations, db.Locations.id == db.Inventory.locationId)  # type: ignore
+            .where(db.Inventory.partId.in_(partIds), db.Inventory.stock > 0)  # type: ignore
+            .order_by(db.Inventory.stock.desc())  # type: ignore
+        )
+        inventory: dict[uuid.UUID, list[tuple[uuid.UUID, str, int]]] = {partId: [] for partId in partIds}
+        for partId, locationId, locationName, stock in session.exec(stmt):
+            inventory[partId].append((locationId, locationName, stock))
+    byId = {partId: name for partId, name in parts}
+    byName = {name: partId for partId, name in parts}
+    # Lines of the same part are added up, the result keeps the order of the first line
+    perBuild: dict[uuid.UUID, int] = {}
+    unresolved = []
+    for line in bom.lines:
+        partId = line.partId if line.partId is not None else byName.get(line.name)  # type: ignore
+        if partId not in byId:
+            unresolved.append({"partId": str(line.partId) if line.partId else None, "name": line.name, "quantity": line.quantity})
+            continue
+        perBuild[partId] = perBuild.get(partId, 0) + line.quantity  # type: ignore
+    lines = []
+    maxBuilds = None
+    for partId, quantity in perBuild.items():
+        available = sum(stock for _, _, stock in inventory[partId])
+        required = quantity * bom.count
+        builds = available // quantity
+        maxBuilds = builds if maxBuilds is None else min(maxBuilds, builds)
+        lines.append({
+            "partId": str(partId),
+            "name": byId[partId],
+            "required": required,
+            "available": available,
+            "shortfall": max(required - available, 0),
+            "picks": suggestPicks(inventory[partId], required),
+        })
+    # The result only holds JSON types, returning a response skips the slower generic encoding of large BOMs
+    return JSONResponse({
+        "buildable": not unresolved and all(line["shortfall"] == 0 for line in lines),
+        "maxBuilds": 0 if unresolved or maxBuilds is None else maxBuilds,
+        "lines": lines,
+        "unresolved": unresolved,
+    })
@@ -0,0 +1,158 @@
+import time
+import uuid
+from logging import getLogger
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
+
+import src.database as db
+from src.dependencies import config, getCurrentUser, CODECACHE
+from src.schemes import User, Code
+
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+
+def getTarget(session: Session, code: str) -> tuple[str, uuid.UUID] | None:
+    """
+    Get the kind and id of the entity a code points to, from the cache if possible.
+    """
+    target = CODECACHE.get(code)
+    if target is not None:
+        return target
+    stmt = select(db.Codes.partId, db.Codes.locationId).where(db.Codes.code == code)
+    row = session.exec(stmt).first()
+    if row is None:
+        return None
+    partId, locationId = row
+    target = ("part", partId) if partId is not None else ("location", locationId)
+    CODECACHE.set(code, target, time.time() + config.codeCacheTime)
+    return target
+
+
+@router.get("/resolve")
+async def resolveCode(code: str, user: Annotated[User, Depends(getCurrentUser)]) -> dict:
+    # Scanners often send a trailing line break
+    code = code.strip()
+    with Session(db.engine) as session:
+        target = getTarget(session, code)
+        if target is not None:
+            kind, entityId = target
+            # The entity and its stock per location are read with a single statement
+            if kind == "part":
+                stmt = (
+                    select(db.Parts, db.Inventory.locationId, db.Inventory.stock)
+                    .outerjoin(db.Inventory, db.Inventory.partId == db.Parts.id)  # type: ignore
+                    .where(db.Parts.id == entityId)
+                )
+                rows = session.exec(stmt).all()
+                if rows:
+                    part = rows[0][0]
+                    return {
+                        "type": "part",
+                        "id": part.id,
+                        "name": part.name,
+                        "description": part.description,
+                        "stock": part.stock,
+                        "minStock": part.minStock,
+                        "image": part.image,
+                        "datasheet": part.datasheet,
+                        "locations": {locationId: stock for _, locationId, stock in rows if locationId is not None},
+                    }
+            else:
+                stmt = (
+                    select(db.Locations, db.Inventory.partId, db.Inventory.stock)
+                    .outerjoin(db.Inventory, db.Inventory.locationId == db.Locations.id)  # type: ignore
+                    .where(db.Locations.id == entityId)
+                )
+                rows = session.exec(stmt).all()
+                if rows:
+                    location = rows[0][0]
+                    return {
+                        "type": "location",
+                        "id": location.id,
+                        "name": location.name,
+                        "description": location.description,
+                        "image": location.image,
+                        "parent": location.parent,
+                        "parts": {partId: stock for _, partId, stock in rows if partId is not None},
+                    }
+            # The cached entity was removed
+            CODECACHE.pop(code)
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"No part or location was found with the code: {code}",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+@router.get("")
+async def getCodes(user: Annotated[User, Depends(getCurrentUser)], partId: uuid.UUID | None = None, locationId: uuid.UUID | None = None) -> list[dict]:
+    with Session(db.engine) as session:
+        stmt = select(db.Codes)
+        if partId is not None:
+            stmt = stmt.where(db.Codes.partId == partId)
+        if locationId is not None:
+            stmt = stmt.where(db.Codes.locationId == locationId)
+        return [
+            {"code": code.code, "kind": code.kind, "partId": code.partId, "locationId": code.locationId}
+            for code in session.exec(stmt)
+        ]
+
+
+@router.post("")
+async def addCode(code: Code, user: Annotated[User, Depends(getCurrentUser)]) -> None:
+    if (code.partId is None) == (code.locationId is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A code points to either a part or a location",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    code.code = code.code.strip()
+    if not code.code:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Code must not be empty",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    with Session(db.engine) as session:
+        if code.partId is not None and session.get(db.Parts, code.partId) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No part was found with the id: {code.partId}",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        if code.locationId is not None and session.get(db.Locations, code.locationId) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No location was found with the id: {code.locationId}",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        session.add(db.Codes(code=code.code, kind=code.kind, partId=code.partId, locationId=code.locationId))
+        try:
+            session.commit()
+        except IntegrityError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Code {code.code} is already in use",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+
+
+@router.delete("")
+async def deleteCode(code: str, user: Annotated[User, Depends(getCurrentUser)]) -> None:
+    code = code.strip()
+    with Session(db.engine) as session:
+        existingCode = session.exec(select(db.Codes).where(db.Codes.code == code)).first()
+        if existingCode is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No code was found: {code}",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        session.delete(existingCode)
+        session.commit()
+    CODECACHE.pop(code)
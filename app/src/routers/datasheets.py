@@ -3,11 +3,18 @@ import shutil
 from logging import getLogger
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Depends, Header
+from fastapi.responses import FileResponse, Response
 from sqlmodel import Session, select
 
 import src.database as db
+import src.dependencies as dependencies
+from src.dependencies import getCurrentUser
+from src.datasheetIndex import indexDatasheets, searchPages
+from src.datasheetPreviews import previewPath
+from src.schemes import User
 
 
 logger = getLogger(__name__)
@@ -69,9 +76,35 @@ async def addDatasheet(datasheet: UploadFile = File(...)) -> dict:
         session.add(dbDatasheet)
         session.commit()
         session.refresh(dbDatasheet)
+    # The text is extracted by the index loop, uploads in quick succession share one run
+    dependencies.DATASHEETSCHANGED.set()
     return {"id": str(dbDatasheet.id)}
 
 
+@router.get("/search")
+async def searchDatasheets(q: str, user: Annotated[User, Depends(getCurrentUser)], limit: int = 20) -> list[dict]:
+    """
+    Search the text of all datasheets, every word must appear on the same page.
+    Returns the parts using the best matching datasheets with the matching pages.
+    """
+    if not q.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query is required",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    with Session(db.engine) as session:
+        return searchPages(session, q, max(1, min(limit, 100)))
+
+
+@router.post("/index")
+async def updateDatasheetIndex(user: Annotated[User, Depends(getCurrentUser)]) -> dict:
+    """
+    Extract the text of new and changed datasheets now, instead of waiting for the background indexing.
+    """
+    return await indexDatasheets()
+
+
 @router.get("/{datasheetId}")
 async def getDatasheet(datasheetId: str) -> FileResponse:
     datasheetUUID = uuid.UUID(str(datasheetId), version=4)
@@ -99,3 +132,29 @@ async def getDatasheet(datasheetId: str) -> FileResponse:
             headers={"WWW-Authenticate": "Bearer"}
         )
     return FileResponse(path, media_type="application/pdf", filename=path.name, headers={"Content-Disposition": f"inline; filename={path.name}"})
+
+
+@router.get("/{datasheetId}/preview")
+async def getDatasheetPreview(datasheetId: str, ifNoneMatch: Annotated[str | None, Header(alias="If-None-Match")] = None) -> Response:
+    datasheetUUID = uuid.UUID(str(datasheetId), version=4)
+    with Session(db.engine) as session:
+        result = session.get(db.Datasheets, datasheetUUID)
+    if not result or len(result.path) <= 1:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No datasheet was found with the id: {datasheetUUID}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    path = Path.cwd() / previewPath(result.path)
+    try:
+        stat = path.stat()
+    except OSError:
+        # Rendered in the background after the upload, the placeholder must not be cached
+        path = Path.cwd() / "assets" / "images" / "file-x.svg"
+        return FileResponse(path, media_type="image/svg+xml", headers={"Cache-Control": "no-cache"})
+    # The preview is rendered again when the datasheet file changes, clients revalidate with the ETag
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {"Cache-Control": "public, max-age=3600", "ETag": etag}
+    if ifNoneMatch is not None and etag in (tag.strip() for tag in ifNoneMatch.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(path, media_type="image/webp", headers=headers)
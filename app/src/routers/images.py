@@ -1,20 +1,33 @@
 import uuid
 import io
+import asyncio
 from logging import getLogger
 from pathlib import Path
+from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Header
+from fastapi.responses import FileResponse, Response
 from sqlmodel import Session, select
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 
 import src.database as db
+import src.dependencies as dependencies
+from src.dependencies import config
+from src.imageVariants import negotiateFormat, getVariant
 
 
 logger = getLogger(__name__)
 router = APIRouter()
 
 
+def saveImage(path: Path, data: bytes) -> None:
+    # SVGs can not be checked by Pillow
+    if path.suffix != ".svg":
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+    path.write_bytes(data)
+
+
 @router.get("/")
 async def getImages() -> dict:
     images = {}
@@ -63,10 +76,16 @@ async def addImage(image: UploadFile = File(...)) -> dict:
             detail="Image file already exists",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    imageStream = io.BytesIO(await image.read())
-    img = Image.open(imageStream)
-    img = img.resize((50, 50))
-    img.save(path)
+    data = await image.read()
+    # The original is kept, sizes are rendered on request
+    try:
+        await asyncio.get_running_loop().run_in_executor(dependencies.IMAGEEXECUTOR, saveImage, path, data)
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, OSError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Image file is not a valid image",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     with Session(db.engine) as session:
         dbImage = db.Images(path=str(path))
         session.add(dbImage)
@@ -76,7 +95,19 @@ async def addImage(image: UploadFile = File(...)) -> dict:
 
 
 @router.get("/{imageId}")
-async def getImage(imageId: str) -> FileResponse:
+async def getImage(imageId: str, accept: Annotated[str, Header()] = "", size: int | None = None) -> Response:
+    """
+    Get an image scaled to fit into size pixels, thumbnailSize by default and the original with size 0.
+    The format is picked from the Accept header, AVIF or WebP if accepted, the original format otherwise.
+    """
+    if size is None:
+        size = config.thumbnailSize
+    if size < 0 or size > config.imageMaxSize:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Image size must be between 0 and {config.imageMaxSize}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
     imageUUID = uuid.UUID(str(imageId), version=4)
     with Session(db.engine) as session:
         stmt = select(db.Images).where(db.Images.id == imageUUID)
@@ -98,4 +129,10 @@ async def getImage(imageId: str) -> FileResponse:
         logger.warning(f"Image not found: {path}")
         # Send default missing png
         path = Path.cwd() / "assets" / "images" / "file-x.svg"
-    return FileResponse(path, media_type=path.suffix[1:], filename=path.name)
+    if size == 0 or path.suffix == ".svg":
+        return FileResponse(path, media_type=path.suffix[1:], filename=path.name)
+    format = negotiateFormat(accept, path.suffix)
+    variant, cache = await getVariant(path, f"{imageUUID.hex}-{size}.{format}", size, format)
+    # Images never change, the variant depends on the Accept header
+    headers = {"Cache-Control": "public, max-age=86400", "Vary": "Accept", "X-Cache": cache}
+    return Response(variant, media_type=f"image/{format}", headers=headers)
@@ -0,0 +1,167 @@
+import uuid
+from logging import getLogger
+from typing import Annotated
+from collections import defaultdict
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from sqlmodel import Session, select
+from sqlalchemy import insert, update, bindparam
+
+import src.database as db
+from src.dependencies import config, getCurrentUser
+from src.schemes import User, StockAdjustment
+from src.routers.movements import inventoryTable, movementsTable, updatePartStock
+
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+setInventory = (
+    update(inventoryTable)
+    .where(inventoryTable.c.id == bindparam("rowId"))
+    .values(stock=bindparam("newStock"), version=bindparam("newVersion"))
+)
+
+
+def checkAdjustment(adjustment: StockAdjustment, parts: set[uuid.UUID], locations: set[uuid.UUID]) -> str | None:
+    # Returns why an adjustment is invalid, None if it is valid
+    if (adjustment.delta is None) == (adjustment.count is None):
+        return "Either delta or count is required"
+    if adjustment.toLocation is not None:
+        if adjustment.delta is None or adjustment.delta <= 0:
+            return "A transfer needs a positive delta"
+        if adjustment.toLocation == adjustment.locationId:
+            return "A transfer needs two different locations"
+    if adjustment.partId not in parts:
+        return f"No part was found with the id: {adjustment.partId}"
+    for locationId in (adjustment.locationId, adjustment.toLocation):
+        if locationId is not None and locationId not in locations:
+            return f"No location was found with the id: {locationId}"
+    return None
+
+
+def applyAdjustments(session: Session, adjustments: list[StockAdjustment], username: str) -> list[dict]:
+    """
+    Apply adjustments in order in the session's transaction and return a result for every adjustment.
+    An adjustment with a version is only applied if the inventory row still has that version,
+    otherwise it is reported as a conflict together with the current stock and version.
+    Every change is also recorded as a movement.
+    """
+    # Holding the write lock from the start, no other process can change a row between the version check and the write
+    db.lockForWrite(session)
+    partIds = {adjustment.partId for adjustment in adjustments}
+    locationIds = {adjustment.locationId for adjustment in adjustments} | {adjustment.toLocation for adjustment in adjustments if adjustment.toLocation}
+    stmt = select(db.Parts.id).where(db.Parts.id.in_(partIds))  # type: ignore
+    parts = set(session.exec(stmt))
+    stmt = select(db.Locations.id).where(db.Locations.id.in_(locationIds))  # type: ignore
+    locations = set(session.exec(stmt))
+    rows: dict[tuple[uuid.UUID, uuid.UUID], dict] = {}
+    stmt = select(db.Inventory.id, db.Inventory.partId, db.Inventory.locationId, db.Inventory.stock, db.Inventory.version).where(db.Inventory.partId.in_(partIds))  # type: ignore
+    for rowId, partId, locationId, stock, version in session.exec(stmt):
+        rows.setdefault((partId, locationId), {"id": rowId, "stock": stock, "version": version, "new": False, "changed": False})
+
+    def getRow(partId: uuid.UUID, locationId: uuid.UUID) -> dict:
+        if (partId, locationId) not in rows:
+            rows[(partId, locationId)] = {"id": uuid.uuid4(), "stock": 0, "version": 0, "new": True, "changed": False}
+        return rows[(partId, locationId)]
+
+    def changeRow(row: dict, delta: int) -> None:
+        row["stock"] += delta
+        row["version"] += 1
+        row["changed"] = True
+
+    results = []
+    movements = []
+    partDeltas: dict[uuid.UUID, int] = defaultdict(int)
+    for adjustment in adjustments:
+        result: dict = {"partId": str(adjustment.partId), "locationId": str(adjustment.locationId)}
+        results.append(result)
+        error = checkAdjustment(adjustment, parts, locations)
+        if error is not None:
+            result.update(status="invalid", detail=error)
+            continue
+        row = getRow(adjustment.partId, adjustment.locationId)
+        result.update(stock=row["stock"], version=row["version"])
+        if adjustment.version is not None and adjustment.version != row["version"]:
+            result.update(status="conflict")
+            continue
+        delta = adjustment.delta if adjustment.delta is not None else adjustment.count - row["stock"]  # type: ignore
+        if adjustment.toLocation is not None:
+            # A transfer takes the delta from the location and puts it at toLocation
+            delta = -delta
+        if row["stock"] + delta < 0:
+            result.update(status="insufficient")
+            continue
+        changeRow(row, delta)
+        if adjustment.toLocation is not None:
+            changeRow(getRow(adjustment.partId, adjustment.toLocation), -delta)
+            movements.append((adjustment.partId, adjustment.locationId, adjustment.toLocation, -delta))
+        elif delta > 0:
+            partDeltas[adjustment.partId] += delta
+            movements.append((adjustment.partId, None, adjustment.locationId, delta))
+        elif delta < 0:
+            partDeltas[adjustment.partId] += delta
+            movements.append((adjustment.partId, adjustment.locationId, None, -delta))
+        result.update(status="applied", stock=row["stock"], version=row["version"])
+
+    updates = []
+    inserts = []
+    for (partId, locationId), row in rows.items():
+        if not row["changed"]:
+            continue
+        if row["new"]:
+            inserts.append({"id": row["id"], "partId": partId, "locationId": locationId, "stock": row["stock"], "version": row["version"]})
+        else:
+            updates.append({"rowId": row["id"], "newStock": row["stock"], "newVersion": row["version"]})
+    connection = session.connection()
+    if updates:
+        connection.execute(setInventory, updates)
+    if inserts:
+        connection.execute(insert(inventoryTable), inserts)
+    partUpdates = [{"rowId": partId, "delta": delta} for partId, delta in partDeltas.items() if delta != 0]
+    if partUpdates:
+        connection.execute(updatePartStock, partUpdates)
+    if movements:
+        connection.execute(insert(movementsTable), [
+            {"partId": partId, "fromLocation": fromLocation, "toLocation": toLocation, "delta": delta, "username": username}
+            for partId, fromLocation, toLocation, delta in movements
+        ])
+    return results
+
+
+@router.get("")
+async def getInventory(user: Annotated[User, Depends(getCurrentUser)], partId: uuid.UUID | None = None, locationId: uuid.UUID | None = None) -> list[dict]:
+    with Session(db.engine) as session:
+        stmt = select(db.Inventory.partId, db.Inventory.locationId, db.Inventory.stock, db.Inventory.version)
+        if partId is not None:
+            stmt = stmt.where(db.Inventory.partId == partId)
+        if locationId is not None:
+            stmt = stmt.where(db.Inventory.locationId == locationId)
+        return [
+            {"partId": rowPartId, "locationId": rowLocationId, "stock": stock, "version": version}
+            for rowPartId, rowLocationId, stock, version in session.exec(stmt)
+        ]
+
+
+@router.post("/adjust")
+async def adjustStock(adjustments: list[StockAdjustment], user: Annotated[User, Depends(getCurrentUser)], atomic: bool = False) -> dict:
+    if len(adjustments) > config.movementBatchSize:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {config.movementBatchSize} adjustments can be applied at once",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if not adjustments:
+        return {"applied": 0, "results": []}
+    with Session(db.engine) as session:
+        results = applyAdjustments(session, adjustments, user.username)
+        applied = sum(1 for result in results if result["status"] == "applied")
+        if atomic and applied != len(results):
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"applied": 0, "results": results},
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        session.commit()
+    return {"applied": applied, "results": results}
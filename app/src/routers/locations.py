@@ -6,7 +6,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from sqlmodel import Session, select
 
 import src.database as db
-from src.dependencies import getCurrentUser, validateLocation
+from src.dependencies import config, getCurrentUser, validateLocation, validateFields
 from src.schemes import User, Location
 
 
@@ -14,48 +14,70 @@ logger = getLogger(__name__)
 router = APIRouter()
 
 
+LOCATIONFIELDS = ("name", "description", "image", "parent", "parts")
+
+
+def getLocationFields(session: Session, fields: tuple[str, ...], locationIds: list[uuid.UUID] | None = None, name: str | None = None) -> dict[uuid.UUID, dict]:
+    """
+    Read the given fields of the locations, or of all locations, only the requested columns are selected.
+    The stored parts are read with one more statement if requested.
+    """
+    names = [field for field in fields if field != "parts"]
+    stmt = select(db.Locations.id, *[getattr(db.Locations, field) for field in names])
+    if locationIds is not None:
+        stmt = stmt.where(db.Locations.id.in_(locationIds))  # type: ignore
+    if name is not None:
+        stmt = stmt.where(db.Locations.name == name)
+    locations = {row[0]: dict(zip(names, row[1:])) for row in session.exec(stmt)}
+    if "parts" in fields and locations:
+        for location in locations.values():
+            location["parts"] = []
+        stmt = select(db.Inventory.locationId, db.Inventory.partId, db.Inventory.stock)
+        if locationIds is not None or name is not None:
+            stmt = stmt.where(db.Inventory.locationId.in_(list(locations)))  # type: ignore
+        for locationId, partId, stock in session.exec(stmt):
+            if locationId in locations:
+                locations[locationId]["parts"].append((partId, stock))
+    return locations
+
+
 @router.get("")
-async def getLocations(user: Annotated[User, Depends(getCurrentUser)]) -> dict:
-    locations: dict[uuid.UUID, dict] = {}
+async def getLocations(user: Annotated[User, Depends(getCurrentUser)], fields: str | None = None) -> dict:
+    fieldNames = validateFields(fields, LOCATIONFIELDS, LOCATIONFIELDS)
     with Session(db.engine) as session:
-        stmt = select(db.Locations)
-        result = session.exec(stmt)
-        for location in result:
-            locations[location.id] = {
-                "name": location.name,
-                "description": location.description,
-                "image": location.image,
-                "parts": [],
-            }
-            if location.parent:
-                locations[location.id]["parent"] = location.parent
-            else:
-                locations[location.id]["parent"] = None
-        for location in locations.keys():
-            stmt = select(db.Inventory).where(db.Inventory.locationId == location)
-            inv_result = session.exec(stmt).all()
-            for inv in inv_result:
-                locations[location]["parts"].append((inv.partId, inv.stock))
-    return locations
+        return getLocationFields(session, fieldNames)
+
+
+@router.post("/batch")
+async def getLocationsBatch(locationIds: list[uuid.UUID], user: Annotated[User, Depends(getCurrentUser)], fields: str | None = None) -> dict:
+    """
+    Get many locations by id with one statement, unknown ids are left out of the result.
+    """
+    if len(locationIds) > config.batchGetSize:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {config.batchGetSize} locations can be requested at once",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    fieldNames = validateFields(fields, LOCATIONFIELDS, LOCATIONFIELDS)
+    if not locationIds:
+        return {}
+    with Session(db.engine) as session:
+        return getLocationFields(session, fieldNames, list(set(locationIds)))
 
 
 @router.get("/{locationName}")
-async def getLocationByName(user: Annotated[User, Depends(getCurrentUser)], locationName: str) -> dict:
+async def getLocationByName(user: Annotated[User, Depends(getCurrentUser)], locationName: str, fields: str | None = None) -> dict:
+    fieldNames = validateFields(fields, LOCATIONFIELDS, ("name", "description", "image", "parent"))
     with Session(db.engine) as session:
-        stmt = select(db.Locations).where(db.Locations.name == locationName)
-        result = session.exec(stmt).first()
-        if not result:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Location not found",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
-        return {
-            "name": result.name,
-            "description": result.description,
-            "image": result.image,
-            "parent": result.parent
-        }
+        locations = getLocationFields(session, fieldNames, name=locationName)
+    if not locations:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Location not found",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return next(iter(locations.values()))
 
 
 @router.post("/")
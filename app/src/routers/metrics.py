@@ -0,0 +1,15 @@
+from logging import getLogger
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.metrics import REGISTRY
+
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+async def getMetrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
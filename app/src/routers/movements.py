@@ -0,0 +1,143 @@
+import uuid
+from logging import getLogger
+from typing import Annotated
+from collections import defaultdict
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from sqlmodel import Session, select
+from sqlalchemy import insert, update, bindparam
+
+import src.database as db
+from src.dependencies import config, getCurrentUser
+from src.schemes import User, Movement
+
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+inventoryTable = db.Inventory.__table__  # type: ignore
+partsTable = db.Parts.__table__  # type: ignore
+movementsTable = db.Movements.__table__  # type: ignore
+# Executed once per batch with a parameter set for every row, instead of loading and flushing ORM objects
+updateInventory = (
+    update(inventoryTable)
+    .where(inventoryTable.c.id == bindparam("rowId"))
+    .values(stock=inventoryTable.c.stock + bindparam("delta"), version=inventoryTable.c.version + 1)
+)
+updatePartStock = (
+    update(partsTable)
+    .where(partsTable.c.id == bindparam("rowId"))
+    .values(stock=partsTable.c.stock + bindparam("delta"))
+)
+
+
+def applyMovements(session: Session, movements: list[Movement], username: str) -> None:
+    """
+    Append movements to the ledger and update Inventory and Parts.stock in the session's transaction.
+    The whole batch is rejected if a part or location does not exist or a location would go below zero.
+    """
+    db.lockForWrite(session)
+    partIds = {movement.partId for movement in movements}
+    locationIds = {
+        location
+        for movement in movements
+        for location in (movement.fromLocation, movement.toLocation)
+        if location is not None
+    }
+    stmt = select(db.Parts.id).where(db.Parts.id.in_(partIds))  # type: ignore
+    missingParts = partIds - set(session.exec(stmt))
+    stmt = select(db.Locations.id).where(db.Locations.id.in_(locationIds))  # type: ignore
+    missingLocations = locationIds - set(session.exec(stmt))
+    if missingParts or missingLocations:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "missingParts": sorted(str(partId) for partId in missingParts),
+                "missingLocations": sorted(str(locationId) for locationId in missingLocations),
+            },
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    # Sum up the batch, so every inventory row and part is written once
+    inventoryDeltas: dict[tuple[uuid.UUID, uuid.UUID], int] = defaultdict(int)
+    partDeltas: dict[uuid.UUID, int] = defaultdict(int)
+    for movement in movements:
+        if movement.fromLocation is not None:
+            inventoryDeltas[(movement.partId, movement.fromLocation)] -= movement.delta
+        else:
+            partDeltas[movement.partId] += movement.delta
+        if movement.toLocation is not None:
+            inventoryDeltas[(movement.partId, movement.toLocation)] += movement.delta
+        else:
+            partDeltas[movement.partId] -= movement.delta
+    stmt = select(db.Inventory.id, db.Inventory.partId, db.Inventory.locationId, db.Inventory.stock).where(db.Inventory.partId.in_(partIds))  # type: ignore
+    existing: dict[tuple[uuid.UUID, uuid.UUID], tuple[uuid.UUID, int]] = {}
+    for rowId, partId, locationId, stock in session.exec(stmt):
+        existing.setdefault((partId, locationId), (rowId, stock))
+    updates = []
+    inserts = []
+    shortfalls = []
+    for (partId, locationId), delta in inventoryDeltas.items():
+        rowId, stock = existing.get((partId, locationId), (None, 0))
+        if stock + delta < 0:
+            shortfalls.append({"partId": str(partId), "locationId": str(locationId), "stock": stock, "delta": delta})
+        elif rowId is not None:
+            if delta != 0:
+                updates.append({"rowId": rowId, "delta": delta})
+        else:
+            inserts.append({"id": uuid.uuid4(), "partId": partId, "locationId": locationId, "stock": delta, "version": 0})
+    if shortfalls:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"shortfalls": shortfalls},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    connection = session.connection()
+    if updates:
+        connection.execute(updateInventory, updates)
+    if inserts:
+        connection.execute(insert(inventoryTable), inserts)
+    partUpdates = [{"rowId": partId, "delta": delta} for partId, delta in partDeltas.items() if delta != 0]
+    if partUpdates:
+        connection.execute(updatePartStock, partUpdates)
+    connection.execute(insert(movementsTable), [
+        {
+            "partId": movement.partId,
+            "fromLocation": movement.fromLocation,
+            "toLocation": movement.toLocation,
+            "delta": movement.delta,
+            "username": username,
+        }
+        for movement in movements
+    ])
+
+
+@router.post("")
+async def addMovements(movements: list[Movement], user: Annotated[User, Depends(getCurrentUser)]) -> dict:
+    if len(movements) > config.movementBatchSize:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {config.movementBatchSize} movements can be added at once",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    for movement in movements:
+        if movement.fromLocation == movement.toLocation:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Movement of part {movement.partId} needs a fromLocation or toLocation and they must differ",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+    if not movements:
+        return {"count": 0}
+    with Session(db.engine) as session:
+        applyMovements(session, movements, user.username)
+        session.commit()
+    return {"count": len(movements)}
+
+
+@router.get("")
+async def getMovements(user: Annotated[User, Depends(getCurrentUser)], partId: uuid.UUID | None = None, limit: int = 100) -> list[dict]:
+    with Session(db.engine) as session:
+        stmt = select(db.Movements).order_by(db.Movements.id.desc()).limit(min(limit, 1000))  # type: ignore
+        if partId is not None:
+            stmt = stmt.where(db.Movements.partId == partId)
+        return [movement.model_dump() for movement in session.exec(stmt)]
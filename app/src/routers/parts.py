@@ -1,12 +1,14 @@
 import uuid
+import asyncio
 from logging import getLogger
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from sqlmodel import Session, select
 
 import src.database as db
-from src.dependencies import getCurrentUser, validatePart
+from src.dependencies import config, getCurrentUser, validatePart, validateFields
+from src.duplicates import addTrigrams, removeTrigrams, findSimilar, findDuplicates
 from src.schemes import User, Part
 
 
@@ -14,50 +16,86 @@ logger = getLogger(__name__)
 router = APIRouter()
 
 
+PARTFIELDS = ("name", "description", "stock", "minStock", "image", "datasheet", "tags")
+
+
+def getPartFields(session: Session, fields: tuple[str, ...], partIds: list[uuid.UUID] | None = None) -> dict[uuid.UUID, dict]:
+    """
+    Read the given fields of the parts, or of all parts, only the requested columns are selected.
+    Tags are read with one more statement if requested.
+    """
+    columns = [getattr(db.Parts, field) for field in fields if field != "tags"]
+    stmt = select(db.Parts.id, *columns)
+    if partIds is not None:
+        stmt = stmt.where(db.Parts.id.in_(partIds))  # type: ignore
+    names = [field for field in fields if field != "tags"]
+    parts = {row[0]: dict(zip(names, row[1:])) for row in session.exec(stmt)}
+    if "tags" in fields:
+        for part in parts.values():
+            part["tags"] = []
+        stmt = select(db.PartTagLinks.partId, db.Tags.name).join(db.Tags, db.Tags.id == db.PartTagLinks.tagId)  # type: ignore
+        if partIds is not None:
+            stmt = stmt.where(db.PartTagLinks.partId.in_(partIds))  # type: ignore
+        for partId, tagName in session.exec(stmt):
+            if partId in parts:
+                parts[partId]["tags"].append(tagName)
+    return parts
+
+
 @router.get("/")
-async def getParts(user: Annotated[User, Depends(getCurrentUser)]) -> dict:
-    parts = {}
+async def getParts(user: Annotated[User, Depends(getCurrentUser)], fields: str | None = None) -> dict:
+    fieldNames = validateFields(fields, PARTFIELDS, PARTFIELDS)
     with Session(db.engine) as session:
-        stmt = select(db.Parts)
-        result = session.exec(stmt)
-        for part in result:
-            parts[part.id] = {
-                "name": part.name,
-                "description": part.description,
-                "stock": part.stock,
-                "minStock": part.minStock,
-                "image": part.image,
-                "datasheet": part.datasheet,
-                "tags": [tag.name for tag in part.tags],
-            }
-    return parts
+        return getPartFields(session, fieldNames)
+
+
+@router.post("/batch")
+async def getPartsBatch(partIds: list[uuid.UUID], user: Annotated[User, Depends(getCurrentUser)], fields: str | None = None) -> dict:
+    """
+    Get many parts by id with one statement, unknown ids are left out of the result.
+    """
+    if len(partIds) > config.batchGetSize:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {config.batchGetSize} parts can be requested at once",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    fieldNames = validateFields(fields, PARTFIELDS, PARTFIELDS)
+    if not partIds:
+        return {}
+    with Session(db.engine) as session:
+        return getPartFields(session, fieldNames, list(set(partIds)))
+
+
+def readDuplicates(threshold: float) -> list[list[dict]]:
+    with Session(db.engine) as session:
+        return findDuplicates(session, threshold, config.duplicateBlockSize)
+
+
+@router.get("/duplicates")
+async def getDuplicates(user: Annotated[User, Depends(getCurrentUser)], threshold: Annotated[float | None, Query(gt=0, le=1)] = None) -> list[list[dict]]:
+    if threshold is None:
+        threshold = config.duplicateThreshold
+    # Comparing all names takes seconds for large catalogues, the other requests of this worker must not wait for it
+    return await asyncio.to_thread(readDuplicates, threshold)
 
 
 @router.get("/{partId}")
-async def getPart(partId: uuid.UUID, user: Annotated[User, Depends(getCurrentUser)]) -> dict:
+async def getPart(partId: uuid.UUID, user: Annotated[User, Depends(getCurrentUser)], fields: str | None = None) -> dict:
+    fieldNames = validateFields(fields, PARTFIELDS, PARTFIELDS)
     with Session(db.engine) as session:
-        stmt = select(db.Parts).where(db.Parts.id == partId)
-        result = session.exec(stmt)
-        part = result.first()
-        if not part:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"No part was found with the id: {partId}",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
-    return  {
-        "name": part.name,
-        "description": part.description,
-        "stock": part.stock,
-        "minStock": part.minStock,
-        "image": part.image,
-        "datasheet": part.datasheet,
-        "tags": [tag.name for tag in part.tags],
-    }
+        parts = getPartFields(session, fieldNames, [partId])
+    if partId not in parts:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No part was found with the id: {partId}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return parts[partId]
 
 
 @router.post("/")
-async def addPart(part: Annotated[Part, Depends(validatePart)], user: Annotated[User, Depends(getCurrentUser)]) -> None:
+async def addPart(part: Annotated[Part, Depends(validatePart)], user: Annotated[User, Depends(getCurrentUser)]) -> dict:
     if part.minStock is None or part.minStock < 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -102,16 +140,16 @@ async def addPart(part: Annotated[Part, Depends(validatePart)], user: Annotated[
         if part.tags is None:
             part.tags = []
         tags = []
-        for tag in part.tags:
-            stmt = select(db.Tags).where(db.Tags.name == tag)
-            result = session.exec(stmt)
-            existingTag = result.first()
-            if existingTag is not None:
-                tags.append(existingTag)
+        existingTags = {}
+        if part.tags:
+            stmt = select(db.Tags).where(db.Tags.name.in_(part.tags))  # type: ignore
+            existingTags = {tag.name: tag for tag in session.exec(stmt)}
+        for tag in dict.fromkeys(part.tags):
+            if tag in existingTags:
+                tags.append(existingTags[tag])
             else:
                 newTag = db.Tags(name=tag)
                 session.add(newTag)
-                session.commit()
                 tags.append(newTag)
         if part.id is not None:
             stmt = select(db.Parts).where(db.Parts.id == part.id)
@@ -143,8 +181,13 @@ async def addPart(part: Annotated[Part, Depends(validatePart)], user: Annotated[
             )
         for tag in tags:
             newPart.tags.append(tag)
+        # The part is still created, clients decide what to do with a likely duplicate
+        possibleDuplicates = findSimilar(session, part.name, config.duplicateThreshold)
         session.add(newPart)
+        session.flush()
+        addTrigrams(session, [(newPart.id, newPart.name)])
         session.commit()
+        return {"id": newPart.id, "possibleDuplicates": possibleDuplicates}
 
 @router.put("/")
 async def updatePart(part: Annotated[Part, Depends(validatePart)], user: Annotated[User, Depends(getCurrentUser)]) -> None:
@@ -163,6 +206,9 @@ async def updatePart(part: Annotated[Part, Depends(validatePart)], user: Annotat
                 detail=f"No part was found with the id: {part.id}",
                 headers={"WWW-Authenticate": "Bearer"}
             )
+        if existingPart.name != part.name:
+            removeTrigrams(session, [existingPart.id])
+            addTrigrams(session, [(existingPart.id, part.name)])
         existingPart.name = part.name
         if part.description is not None:
             existingPart.description = part.description
@@ -0,0 +1,73 @@
+import uuid
+from logging import getLogger
+from typing import Annotated
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, HTTPException, status, Depends
+from sqlmodel import Session
+
+import src.database as db
+from src.dependencies import getCurrentUser, isAdmin
+from src.schemes import User
+from src.snapshots import toUtc, takeSnapshot, getLocationStock, getStockSeries
+
+
+logger = getLogger(__name__)
+router = APIRouter()
+
+MAXPOINTS = 1000
+
+
+@router.get("/locations/{locationId}")
+async def getStockAtLocation(locationId: uuid.UUID, user: Annotated[User, Depends(getCurrentUser)], at: datetime | None = None) -> dict:
+    with Session(db.engine) as session:
+        if session.get(db.Locations, locationId) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No location was found with the id: {locationId}",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+    if at is None:
+        at = datetime.now(timezone.utc)
+    return {
+        "at": at,
+        "parts": getLocationStock(locationId, at),
+    }
+
+
+@router.get("/parts/{partId}/series")
+async def getPartStockSeries(
+    partId: uuid.UUID,
+    start: datetime,
+    user: Annotated[User, Depends(getCurrentUser)],
+    end: datetime | None = None,
+    interval: int = 86400,
+    locationId: uuid.UUID | None = None
+) -> list[dict]:
+    with Session(db.engine) as session:
+        if session.get(db.Parts, partId) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No part was found with the id: {partId}",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+    start = toUtc(start)
+    end = datetime.now(timezone.utc) if end is None else toUtc(end)
+    if interval <= 0 or (end - start).total_seconds() / interval > MAXPOINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Interval must be positive and give at most {MAXPOINTS} points",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    series = getStockSeries(partId, start, end, timedelta(seconds=interval), locationId)
+    return [{"time": moment, "stock": stock} for moment, stock in series]
+
+
+@router.post("/snapshots")
+async def addSnapshot(user: Annotated[User, Depends(isAdmin)]) -> dict:
+    snapshot = takeSnapshot()
+    return {
+        "id": snapshot.id,
+        "taken": snapshot.taken,
+        "movementId": snapshot.movementId,
+    }
@@ -1,25 +1,24 @@
+import hashlib
 from logging import getLogger
 from typing import Annotated
-from datetime import datetime, timedelta
+from secrets import token_urlsafe
+from datetime import datetime, timedelta, timezone
 
 import jwt
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
 
 import src.database as db
-from src.dependencies import secrets, JWTALGORITHM, JWTEXPIRATION, FAILEDAUTHENTICATION, getCurrentUser, PWDCONTEXT
-from src.schemes import Token, TokenData, User
+from src.dependencies import secrets, JWTALGORITHM, JWTEXPIRATION, FAILEDAUTHENTICATION, OAUTH2SCHEME, LOGINLIMITER
+from src.dependencies import config, getCurrentUser, revokeToken, revokeUser, verifyPassword
+from src.schemes import Token, TokenData, User, RefreshRequest
 
 
 logger = getLogger(__name__)
 router = APIRouter()
 
 
-def verifyPassword(hashedPassword: str, plainPassword: str, salt: str) -> bool:
-    return PWDCONTEXT.verify(plainPassword + salt, hashedPassword)
-
-
-def authenticateUser(username: str, password: str) -> User:
+async def authenticateUser(username: str, password: str) -> User:
     """
     Authenticate a user by username and password.
     """
@@ -33,8 +32,12 @@ def authenticateUser(username: str, password: str) -> User:
             detail="Unable to authenticate user",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    if not verifyPassword(user.password, password, salt):
+    valid, newHash = await verifyPassword(user.password, password, salt)
+    if not valid:
         raise FAILEDAUTHENTICATION
+    if newHash is not None:
+        logger.info(f"Rehashing outdated password hash of user: \"{username}\"")
+        db.updatePasswordHash(username, newHash)
     return user
 
 
@@ -44,7 +47,8 @@ def createToken(user: User, expiration: timedelta | None = None) -> Token:
     """
     if expiration is None:
         expiration = JWTEXPIRATION
-    expires = datetime.now() + expiration
+    issued = datetime.now()
+    expires = issued + expiration
     if user.type is None or user.disabled is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -56,19 +60,79 @@ def createToken(user: User, expiration: timedelta | None = None) -> Token:
     payload = TokenData(
         username=user.username,
         type=user.type,
-        expiration=expires.timestamp()
+        expiration=expires.timestamp(),
+        issued=issued.timestamp()
     )
     token = jwt.encode(payload.model_dump(), secrets["jwt"], algorithm=JWTALGORITHM)
     return Token(access_token=token)
 
 
+def hashRefreshToken(refreshToken: str) -> str:
+    # Refresh tokens are random, so a fast hash is enough to not store them in plain text
+    return hashlib.sha256(refreshToken.encode()).hexdigest()
+
+
+def createRefreshToken(user: User, device: str = "") -> str:
+    """
+    Create a long lived refresh token for the user, only its hash is stored.
+    """
+    refreshToken = token_urlsafe(32)
+    expires = datetime.now(timezone.utc) + timedelta(days=config.refreshExpirationDays)
+    db.addRefreshToken(user.username, hashRefreshToken(refreshToken), device, expires)
+    return refreshToken
+
+
 @router.post("/login")
-async def login(formData: Annotated[OAuth2PasswordRequestForm, Depends()]) -> Token:
-    user = authenticateUser(formData.username, formData.password)
+async def login(formData: Annotated[OAuth2PasswordRequestForm, Depends()], request: Request) -> Token:
+    client = request.client.host if request.client else "unknown"
+    # The username is limited per client, otherwise anyone could lock a user out by guessing their password
+    for key in (f"user:{formData.username}:{client}", f"ip:{client}"):
+        retryAfter = LOGINLIMITER.hit(key)
+        if retryAfter > 0:
+            logger.warning(f"Too many login attempts: \"{key}\"")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts",
+                headers={"WWW-Authenticate": "Bearer", "Retry-After": str(int(retryAfter) + 1)}
+            )
+    user = await authenticateUser(formData.username, formData.password)
     token = createToken(user)
+    token.refresh_token = createRefreshToken(user, formData.client_id or "")
     return token
 
 
-@router.get("me", response_model=User)
+@router.post("/refresh")
+async def refresh(refreshRequest: RefreshRequest) -> Token:
+    # Every refresh token is used once, a leaked token stops working once its owner refreshed
+    refreshToken = token_urlsafe(32)
+    expires = datetime.now(timezone.utc) + timedelta(days=config.refreshExpirationDays)
+    user = db.rotateRefreshToken(hashRefreshToken(refreshRequest.refresh_token), hashRefreshToken(refreshToken), expires)
+    if user is None:
+        logger.debug("Refresh token is invalid, expired or revoked")
+        raise FAILEDAUTHENTICATION
+    token = createToken(user)
+    token.refresh_token = refreshToken
+    return token
+
+
+@router.post("/logout")
+async def logout(token: Annotated[str, Depends(OAUTH2SCHEME)], currentUser: Annotated[User, Depends(getCurrentUser)], refreshRequest: RefreshRequest | None = None) -> None:
+    revokeToken(token)
+    if refreshRequest is not None:
+        db.revokeRefreshToken(hashRefreshToken(refreshRequest.refresh_token))
+    logger.debug(f"User logged out: \"{currentUser.username}\"")
+
+
+@router.delete("/sessions")
+async def deleteSessions(currentUser: Annotated[User, Depends(getCurrentUser)]) -> dict:
+    count = db.revokeRefreshTokens(currentUser.username)
+    revokeUser(currentUser.username)
+    logger.info(f"Revoked {count} sessions of user: \"{currentUser.username}\"")
+    return {"revoked": count}
+
+
+@router.get("/me", response_model=User)
+# The path used to be /userme, kept for existing clients
+@router.get("me", response_model=User, include_in_schema=False)
 async def getMe(currentUser: Annotated[User, Depends(getCurrentUser)]) -> User:
     return currentUser
@@ -1,6 +1,8 @@
 import uuid
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from src.validators import SafeString
 
 
 class User(BaseModel):
@@ -19,6 +21,14 @@ class Token(BaseModel):
     """
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    """
+    Refresh token request model for the application.
+    """
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -28,6 +38,7 @@ class TokenData(BaseModel):
     username: str
     type: int
     expiration: float
+    issued: float | None = None
 
 
 class Part(BaseModel):
@@ -68,3 +79,89 @@ class Datasheet(BaseModel):
     """
     id: uuid.UUID | None = None
     path: str | None = None
+
+
+class Movement(BaseModel):
+    """
+    Movement model for the application.
+    Without fromLocation parts are received, without toLocation parts are consumed.
+    """
+    partId: uuid.UUID
+    fromLocation: uuid.UUID | None = None
+    toLocation: uuid.UUID | None = None
+    delta: int = Field(gt=0)
+
+
+class StockAdjustment(BaseModel):
+    """
+    Stock adjustment model for the application.
+    Either a delta or an absolute count, a positive delta with toLocation transfers parts.
+    """
+    partId: uuid.UUID
+    locationId: uuid.UUID
+    delta: int | None = None
+    count: int | None = Field(default=None, ge=0)
+    toLocation: uuid.UUID | None = None
+    version: int | None = None
+
+
+class Code(BaseModel):
+    """
+    Code model for the application.
+    Kind describes the code, for example mpn, sku or label.
+    """
+    # Not restricted to the allowed characters, scanned codes may contain control characters like GS1 separators
+    code: str = Field(min_length=1, max_length=512)
+    kind: SafeString = ""
+    partId: uuid.UUID | None = None
+    locationId: uuid.UUID | None = None
+
+
+class BomLine(BaseModel):
+    """
+    BOM line model for the application.
+    The part is identified by id or name, quantity is needed per build.
+    """
+    partId: uuid.UUID | None = None
+    name: str | None = None
+    quantity: int = Field(gt=0)
+
+
+class Bom(BaseModel):
+    """
+    BOM model for the application.
+    """
+    lines: list[BomLine]
+    count: int = Field(default=1, gt=0)
+
+
+class AttributeDefinition(BaseModel):
+    """
+    Attribute definition model for the application.
+    The category is created if it does not exist, numeric values are stored in the given SI base unit.
+    """
+    category: str
+    name: str
+    unit: str = ""
+    numeric: bool = True
+
+
+class AttributeFilter(BaseModel):
+    """
+    Attribute filter model for the application.
+    Numeric values may use SI prefixes like 4k7 or 100nF.
+    """
+    attribute: str
+    equals: str | float | None = None
+    min: str | float | None = None
+    max: str | float | None = None
+
+
+class AttributeSearch(BaseModel):
+    """
+    Attribute search model for the application.
+    """
+    category: str | None = None
+    # Without a filter the category would not restrict the result
+    filters: list[AttributeFilter] = Field(min_length=1)
+    limit: int = Field(default=100, gt=0, le=1000)
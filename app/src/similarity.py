@@ -0,0 +1,27 @@
+import re
+
+
+NONALPHANUMERIC = re.compile(r"[^0-9A-Z]")
+
+
+def normalize(name: str) -> str:
+    """
+    Normalise a part name, so "lm358 " and "LM-358" compare equal.
+    """
+    return NONALPHANUMERIC.sub("", name.upper())
+
+
+def trigrams(name: str) -> set[str]:
+    # Padding gives the start and end of a name their own trigrams, like PostgreSQL's pg_trgm
+    padded = f"  {normalize(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(first: set[str], second: set[str]) -> float:
+    """
+    Jaccard similarity of two trigram sets.
+    """
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
@@ -0,0 +1,172 @@
+import uuid
+import asyncio
+from logging import getLogger
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, select
+from sqlalchemy import func, insert, literal
+from sqlalchemy import select as selectColumns
+
+import src.database as db
+from src.dependencies import config
+from src.startup import startupLock
+
+
+logger = getLogger(__name__)
+
+
+def toUtc(moment: datetime) -> datetime:
+    # Naive datetimes are taken as UTC, like the stored timestamps
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def takeSnapshot() -> db.InventorySnapshots:
+    """
+    Copy the current stock of every part and location into a new snapshot.
+    """
+    with Session(db.engine) as session:
+        # Adding the snapshot first takes the write lock, so no movement is committed while copying
+        snapshot = db.InventorySnapshots()
+        session.add(snapshot)
+        session.flush()
+        snapshot.taken = datetime.now(timezone.utc)
+        snapshot.movementId = session.exec(select(func.max(db.Movements.id))).one() or 0
+        stockSum = func.sum(db.Inventory.stock)
+        stmt = insert(db.SnapshotStock.__table__).from_select(  # type: ignore
+            ["snapshotId", "partId", "locationId", "stock"],
+            selectColumns(literal(snapshot.id), db.Inventory.partId, db.Inventory.locationId, stockSum)
+            .group_by(db.Inventory.partId, db.Inventory.locationId)
+            .having(stockSum != 0)
+        )
+        session.connection().execute(stmt)
+        session.add(snapshot)
+        session.commit()
+        session.refresh(snapshot)
+    logger.info(f"Inventory snapshot {snapshot.id} taken up to movement {snapshot.movementId}")
+    return snapshot
+
+
+def takeSnapshotIfDue() -> db.InventorySnapshots | None:
+    """
+    Take a snapshot if there is none yet, or the last one is older than the snapshot interval and stock moved since.
+    """
+    # Every worker process checks, the lock lets only one of them take the snapshot
+    with startupLock():
+        with Session(db.engine) as session:
+            stmt = select(db.InventorySnapshots).order_by(db.InventorySnapshots.id.desc()).limit(1)  # type: ignore
+            latest = session.exec(stmt).first()
+            if latest is not None:
+                if toUtc(latest.taken) > datetime.now(timezone.utc) - timedelta(seconds=config.snapshotInterval):
+                    return None
+                lastMovement = session.exec(select(func.max(db.Movements.id))).one() or 0
+                if lastMovement == latest.movementId:
+                    return None
+        return takeSnapshot()
+
+
+async def snapshotLoop() -> None:
+    """
+    Take snapshots in the background for as long as the app runs.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(takeSnapshotIfDue)
+        except Exception:
+            logger.error("Taking an inventory snapshot failed", exc_info=True)
+        await asyncio.sleep(min(config.snapshotInterval, 3600))
+
+
+def getBaseSnapshot(session: Session, at: datetime) -> db.InventorySnapshots | None:
+    # The newest snapshot taken before the given time, later movements are replayed on top of it
+    stmt = (
+        select(db.InventorySnapshots)
+        .where(db.InventorySnapshots.taken <= at)
+        .order_by(db.InventorySnapshots.taken.desc())  # type: ignore
+        .limit(1)
+    )
+    return session.exec(stmt).first()
+
+
+def movementChange(fromLocation: uuid.UUID | None, toLocation: uuid.UUID | None, delta: int, locationId: uuid.UUID | None) -> int:
+    # Without a location the total stock of the part only changes for receipts and consumption
+    if locationId is None:
+        if fromLocation is None:
+            return delta
+        if toLocation is None:
+            return -delta
+        return 0
+    change = 0
+    if fromLocation == locationId:
+        change -= delta
+    if toLocation == locationId:
+        change += delta
+    return change
+
+
+def getLocationStock(locationId: uuid.UUID, at: datetime) -> dict[uuid.UUID, int]:
+    """
+    Get the stock of every part at a location at the given time.
+    """
+    at = toUtc(at)
+    stock: dict[uuid.UUID, int] = defaultdict(int)
+    with Session(db.engine) as session:
+        snapshot = getBaseSnapshot(session, at)
+        movementId = 0
+        if snapshot is not None:
+            movementId = snapshot.movementId
+            stmt = select(db.SnapshotStock.partId, db.SnapshotStock.stock).where(
+                db.SnapshotStock.snapshotId == snapshot.id,
+                db.SnapshotStock.locationId == locationId
+            )
+            for partId, partStock in session.exec(stmt):
+                stock[partId] = partStock
+        stmt = select(db.Movements.partId, db.Movements.fromLocation, db.Movements.toLocation, db.Movements.delta).where(
+            db.Movements.id > movementId,  # type: ignore
+            db.Movements.timestamp <= at,
+            (db.Movements.fromLocation == locationId) | (db.Movements.toLocation == locationId)
+        )
+        for partId, fromLocation, toLocation, delta in session.exec(stmt):
+            stock[partId] += movementChange(fromLocation, toLocation, delta, locationId)
+    return {partId: partStock for partId, partStock in stock.items() if partStock != 0}
+
+
+def getStockSeries(partId: uuid.UUID, start: datetime, end: datetime, interval: timedelta, locationId: uuid.UUID | None = None) -> list[tuple[datetime, int]]:
+    """
+    Get the stock of a part at every interval from start to end, in total or at a single location.
+    The movements are read once in order, so the cost grows with the movements in the range, not with the points.
+    """
+    start = toUtc(start)
+    end = toUtc(end)
+    stock = 0
+    movementId = 0
+    with Session(db.engine) as session:
+        snapshot = getBaseSnapshot(session, start)
+        if snapshot is not None:
+            movementId = snapshot.movementId
+            stmt = select(func.sum(db.SnapshotStock.stock)).where(
+                db.SnapshotStock.snapshotId == snapshot.id,
+                db.SnapshotStock.partId == partId
+            )
+            if locationId is not None:
+                stmt = stmt.where(db.SnapshotStock.locationId == locationId)
+            stock = session.exec(stmt).one() or 0
+        stmt = (
+            select(db.Movements.timestamp, db.Movements.fromLocation, db.Movements.toLocation, db.Movements.delta)
+            .where(db.Movements.partId == partId, db.Movements.id > movementId, db.Movements.timestamp <= end)  # type: ignore
+            .order_by(db.Movements.id)  # type: ignore
+        )
+        series = []
+        moment = start
+        for timestamp, fromLocation, toLocation, delta in session.exec(stmt):
+            timestamp = toUtc(timestamp)
+            while moment < timestamp and moment <= end:
+                series.append((moment, stock))
+                moment += interval
+            stock += movementChange(fromLocation, toLocation, delta, locationId)
+    while moment <= end:
+        series.append((moment, stock))
+        moment += interval
+    return series
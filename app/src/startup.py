@@ -0,0 +1,55 @@
+import os
+import time
+from logging import getLogger
+from pathlib import Path
+from contextlib import contextmanager, AbstractContextManager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+logger = getLogger(__name__)
+lockPath = Path("data/startup.lock")
+
+
+@contextmanager
+def fileLock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on the file across all worker processes.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        waited = time.perf_counter() - start
+        if waited > 0.1:
+            logger.debug(f"Waited {waited:.2f} s for the lock {path.name} in process {os.getpid()}")
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def startupLock() -> AbstractContextManager[None]:
+    """
+    Hold an exclusive lock across all worker processes, so startup work like
+    creating the config, secrets and database only runs in one of them at a time.
+    """
+    return fileLock(lockPath)
@@ -0,0 +1,56 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+
+# Powers of ten of the SI prefixes, u is accepted for micro
+PREFIXES = {
+    "p": -12,
+    "n": -9,
+    "u": -6,
+    "µ": -6,
+    "μ": -6,
+    "m": -3,
+    "": 0,
+    "k": 3,
+    "K": 3,
+    "M": 6,
+    "G": 9,
+    "T": 12,
+}
+UNITALIASES = {
+    "Ω": ("Ω", "Ohms", "ohms", "Ohm", "ohm"),
+}
+QUANTITY = re.compile(r"([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)\s*([pnuµμmkKMGT]?)")
+# Values like 4k7 or 0R1, where the prefix replaces the decimal point
+RKM = re.compile(r"(\d+)([pnuµμmkKMGTR])(\d+)")
+
+
+def parseQuantity(value: str | float | int, unit: str = "") -> float:
+    """
+    Parse a value with an optional SI prefix and unit into the base unit, 10k with unit Ω gives 10000.0.
+    Raises ValueError if the value can not be parsed.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = value.strip()
+    # The unit is removed first, so 5mm with unit m is read as 5 millimetres
+    for alias in UNITALIASES.get(unit, (unit,)):
+        if alias and text.endswith(alias):
+            text = text[:-len(alias)].rstrip()
+            break
+    match = QUANTITY.fullmatch(text)
+    if match is not None:
+        number, prefix = match.groups()
+    else:
+        match = RKM.fullmatch(text)
+        if match is None:
+            raise ValueError(f"Can not parse the quantity: {value}")
+        whole, prefix, fraction = match.groups()
+        number = f"{whole}.{fraction}"
+        if prefix == "R":
+            prefix = ""
+    try:
+        # Decimal keeps 4.7u and 4u7 the same float, so equality filters match
+        return float(Decimal(number).scaleb(PREFIXES[prefix]))
+    except InvalidOperation:
+        raise ValueError(f"Can not parse the quantity: {value}")
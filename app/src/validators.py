@@ -0,0 +1,59 @@
+import re
+from typing import Annotated, Iterable
+
+from pydantic import AfterValidator
+
+
+ALLOWEDCHARS = [
+    "abcdefghijklmnopqrstuvwxyz",
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "0123456789",
+    "!@#$%^()_+-=[]{}',.~°` ",
+    "&*;?/\\<>\"|:",
+    "\n\t\r"
+]
+# Patterns matching the first character which is not allowed
+INVALIDSTRINGCHAR = re.compile(f"[^{re.escape(''.join(ALLOWEDCHARS))}]")
+INVALIDPATHCHAR = re.compile(f"[^{re.escape(''.join(ALLOWEDCHARS[:-2]))}]")
+# Used to join many strings so they can be checked with a single search, allowed by both patterns
+SEPARATOR = " "
+
+
+def findInvalidChar(string: str, pattern: re.Pattern = INVALIDSTRINGCHAR) -> str | None:
+    """
+    Return the first character of the string which is not allowed by the pattern.
+    """
+    match = pattern.search(string)
+    if match is None:
+        return None
+    return match.group()
+
+
+def findInvalidStrings(strings: Iterable[str], pattern: re.Pattern = INVALIDSTRINGCHAR) -> list[int]:
+    """
+    Return the indexes of all strings containing a character which is not allowed.
+    All strings are checked with a single search first, so valid batches are checked in one pass.
+    """
+    strings = list(strings)
+    if pattern.search(SEPARATOR.join(strings)) is None:
+        return []
+    return [index for index, string in enumerate(strings) if pattern.search(string) is not None]
+
+
+def checkString(string: str) -> str:
+    char = findInvalidChar(string)
+    if char is not None:
+        raise ValueError(f"String contains invalid character: \"{char}\"")
+    return string
+
+
+def checkPath(path: str) -> str:
+    char = findInvalidChar(path, INVALIDPATHCHAR)
+    if char is not None:
+        raise ValueError(f"Path contains invalid character: \"{char}\"")
+    return path
+
+
+# Reusable string types for Pydantic models, for batches use e.g. TypeAdapter(list[SafeString])
+SafeString = Annotated[str, AfterValidator(checkString)]
+SafePath = Annotated[str, AfterValidator(checkPath)]
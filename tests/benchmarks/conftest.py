@@ -0,0 +1,185 @@
+"""
+In-process endpoint benchmarks against generated datasets of several sizes.
+
+The benchmarks only run when BENCHMARK=1 is set:
+    BENCHMARK=1 python -m pytest -q tests/benchmarks
+
+Environment variables:
+    BENCHMARK_SIZES      Part counts of the datasets, default 1000,20000
+    BENCHMARK_TOLERANCE  Allowed slowdown of p50 and p95 over the baseline, default 0.5 (50 %)
+                         The baselines are absolute times measured on one machine. On other machines or shared
+                         CI runners, record own baselines with BENCHMARK_UPDATE=1 or raise the tolerance,
+                         the query counts are compared exactly everywhere.
+    BENCHMARK_SLACK      Allowed slowdown in ms on top of the tolerance, for very fast endpoints, default 2
+    BENCHMARK_UPDATE     Set to 1 to store the results as the new baselines instead of comparing
+    BENCHMARK_OUTPUT     Path of a JSON file to write all results to
+
+A benchmark fails when its p50 or p95 latency regressed beyond the tolerance or when it runs more queries than its baseline.
+Benchmarks without a baseline are recorded but never fail.
+
+The requests are sent through TestClient, which runs the BackgroundTasks of an endpoint before it returns the response,
+so work an endpoint queues there counts towards its latency. Datasheet uploads only wake the index loop instead,
+their benchmark finishes the indexing afterwards so it does not run during the next benchmarks.
+"""
+import os
+import sys
+import json
+import math
+import time
+import statistics
+from pathlib import Path
+from dataclasses import dataclass, field
+
+import pytest
+
+TOOLS_PATH = Path(__file__).resolve().parents[2] / "tools"
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+SIZES = [int(size) for size in os.environ.get("BENCHMARK_SIZES", "1000,20000").split(",")]
+TOLERANCE = float(os.environ.get("BENCHMARK_TOLERANCE", "0.5"))
+SLACK = float(os.environ.get("BENCHMARK_SLACK", "2"))
+UPDATE = os.environ.get("BENCHMARK_UPDATE") == "1"
+
+RESULTS: dict[str, dict] = {}
+
+# The benchmarks share the working directory setup of the benchmark tools
+sys.path.insert(0, str(TOOLS_PATH))
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("BENCHMARK") == "1":
+        return
+    skip = pytest.mark.skip(reason="Benchmarks only run with BENCHMARK=1")
+    for item in items:
+        if "benchmarks" in item.path.parts:
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not RESULTS:
+        return
+    if UPDATE:
+        baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+        baselines.update(RESULTS)
+        BASELINES_PATH.write_text(json.dumps(dict(sorted(baselines.items())), indent=4) + "\n")
+    if "BENCHMARK_OUTPUT" in os.environ:
+        Path(os.environ["BENCHMARK_OUTPUT"]).write_text(json.dumps(RESULTS, indent=4) + "\n")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not RESULTS:
+        return
+    terminalreporter.section("benchmarks")
+    for name, result in RESULTS.items():
+        terminalreporter.write_line(
+            f"{name:45} p50 {result['p50']:9.2f} ms | p95 {result['p95']:9.2f} ms"
+            f" | {result['throughput']:9.1f} req/s | {result['queries']:4} queries"
+        )
+
+
+@dataclass
+class Dataset:
+    size: int
+    client: object
+    headers: dict
+    partIds: list = field(default_factory=list)
+    locationIds: list = field(default_factory=list)
+    locationNames: list = field(default_factory=list)
+    imageIds: list = field(default_factory=list)
+    datasheetIds: list = field(default_factory=list)
+
+
+@pytest.fixture(scope="session")
+def workDir():
+    """
+    Import the app inside a temporary working directory, so no data is written to the repository.
+    """
+    from benchmarkSetup import createWorkDir, removeWorkDir
+    cwd = os.getcwd()
+    path = createWorkDir("ERROR")
+    from src import configureLogging
+    configureLogging()
+    yield path
+    removeWorkDir(path, cwd)
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}parts")
+def dataset(request, workDir):
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, select
+    from sqlalchemy import func
+    import src.database as db
+    from src.generator import Volumes, generate
+    from src.routers.user import createToken
+    from src.schemes import User
+    from main import app
+
+    size = request.param
+    # Every size has its own database, the startup reads the file name from the config
+    (workDir / "data" / "config.json").write_text(json.dumps({"dbFile": f"benchmark-{size}.db", "loginAttempts": 1000000}))
+    engine = vars(db).pop("engine", None)
+    if engine is not None:
+        engine.dispose()
+    with TestClient(app) as client:
+        with Session(db.engine) as session:
+            generated = session.exec(select(func.count()).select_from(db.Parts)).one() > 0
+        if not generated:
+            generate(db.engine, Volumes(parts=size, locations=max(size // 20, 10), images=20, datasheets=20))
+        token = createToken(User(username="admin", type=1, disabled=False)).access_token
+        current = Dataset(size=size, client=client, headers={"Authorization": f"Bearer {token}"})
+        with Session(db.engine) as session:
+            current.partIds = [str(partId) for partId in session.exec(select(db.Parts.id).limit(1000))]
+            for locationId, name in session.exec(select(db.Locations.id, db.Locations.name).limit(1000)):
+                current.locationIds.append(str(locationId))
+                current.locationNames.append(name)
+            current.imageIds = [str(imageId) for imageId in session.exec(select(db.Images.id))]
+            current.datasheetIds = [str(datasheetId) for datasheetId in session.exec(select(db.Datasheets.id))]
+        yield current
+
+
+@pytest.fixture
+def benchmark(request, dataset):
+    """
+    Send a request repeatedly, record its latency, throughput and queries and compare them with the baseline.
+    The arguments can be a function of the round number, to send a different request every round.
+    """
+    def run(method: str, url, rounds: int = 50, warmup: int = 2, **kwargs) -> dict:
+        name = f"{request.node.originalname}[{dataset.size}]"
+
+        def send(number: int):
+            arguments = {key: value(number) if callable(value) else value for key, value in kwargs.items()}
+            response = dataset.client.request(method, url(number) if callable(url) else url, **arguments)
+            assert response.status_code < 400, f"{name}: {response.status_code} {response.text[:200]}"
+            return response
+
+        for number in range(warmup):
+            send(-number - 1)
+        durations = []
+        queries = 0
+        start = time.perf_counter()
+        for number in range(rounds):
+            requestStart = time.perf_counter()
+            response = send(number)
+            durations.append((time.perf_counter() - requestStart) * 1000)
+            queries = max(queries, int(response.headers.get("x-query-count", 0)))
+        total = time.perf_counter() - start
+        durations.sort()
+        result = {
+            "p50": round(statistics.median(durations), 3),
+            # Nearest rank, so a single outlier in a short run is not the p95
+            "p95": round(durations[math.ceil(len(durations) * 0.95) - 1], 3),
+            "throughput": round(rounds / total, 1),
+            "queries": queries,
+            "rounds": rounds,
+        }
+        RESULTS[name] = result
+        if UPDATE or not BASELINES_PATH.exists():
+            return result
+        baseline = json.loads(BASELINES_PATH.read_text()).get(name)
+        if baseline is None:
+            return result
+        for key in ("p50", "p95"):
+            limit = baseline[key] * (1 + TOLERANCE) + SLACK
+            assert result[key] <= limit, f"{name}: {key} {result[key]:.2f} ms regressed over the baseline {baseline[key]:.2f} ms (limit {limit:.2f} ms)"
+        assert result["queries"] <= baseline["queries"], f"{name}: {result['queries']} queries, the baseline ran {baseline['queries']}"
+        return result
+    return run
@@ -0,0 +1,70 @@
+import io
+import uuid
+
+from PIL import Image
+
+
+def pngFile(number: int) -> dict:
+    # Every upload needs a new file name
+    stream = io.BytesIO()
+    Image.new("RGB", (200, 200), (number % 256, 0, 0)).save(stream, format="PNG")
+    return {"image": (f"benchmark-{number}-{uuid.uuid4().hex}.png", stream.getvalue(), "image/png")}
+
+def pdfFile(number: int) -> dict:
+    from src.generator import makePdf
+    return {"datasheet": (f"benchmark-{number}-{uuid.uuid4().hex}.pdf", makePdf(f"Benchmark {number}"), "application/pdf")}
+
+def test_list_parts(benchmark, dataset):
+    benchmark("GET", "/parts/", rounds=5, headers=dataset.headers)
+
+def test_get_part(benchmark, dataset):
+    benchmark("GET", lambda number: f"/parts/{dataset.partIds[number % len(dataset.partIds)]}", headers=dataset.headers)
+
+def test_get_parts_batch(benchmark, dataset):
+    benchmark("POST", "/parts/batch", json=dataset.partIds[:50], headers=dataset.headers)
+
+def test_list_parts_names(benchmark, dataset):
+    benchmark("GET", "/parts/", rounds=5, params={"fields": "name,stock"}, headers=dataset.headers)
+
+def test_part_duplicates(benchmark, dataset):
+    benchmark("GET", "/parts/duplicates", rounds=3, warmup=1, headers=dataset.headers)
+
+def test_list_locations(benchmark, dataset):
+    benchmark("GET", "/locations", rounds=5, headers=dataset.headers)
+
+def test_get_location(benchmark, dataset):
+    benchmark("GET", lambda number: f"/locations/{dataset.locationNames[number % len(dataset.locationNames)]}", headers=dataset.headers)
+
+def test_list_inventory_of_part(benchmark, dataset):
+    benchmark("GET", "/inventory", params=lambda number: {"partId": dataset.partIds[number % len(dataset.partIds)]}, headers=dataset.headers)
+
+def test_stock_at_location(benchmark, dataset):
+    benchmark("GET", lambda number: f"/stock/locations/{dataset.locationIds[number % len(dataset.locationIds)]}", headers=dataset.headers)
+
+def test_bom_check(benchmark, dataset):
+    bom = {"count": 2, "lines": [{"partId": partId, "quantity": 1} for partId in dataset.partIds[:200]]}
+    benchmark("POST", "/bom/check", rounds=20, json=bom, headers=dataset.headers)
+
+def test_list_images(benchmark, dataset):
+    benchmark("GET", "/images/", headers=dataset.headers)
+
+def test_download_image(benchmark, dataset):
+    benchmark("GET", lambda number: f"/images/{dataset.imageIds[number % len(dataset.imageIds)]}", headers=dataset.headers)
+
+def test_upload_image(benchmark, dataset):
+    benchmark("POST", "/images/", rounds=20, files=pngFile, headers=dataset.headers)
+
+def test_download_datasheet(benchmark, dataset):
+    benchmark("GET", lambda number: f"/datasheets/{dataset.datasheetIds[number % len(dataset.datasheetIds)]}", headers=dataset.headers)
+
+def test_upload_datasheet(benchmark, dataset):
+    benchmark("POST", "/datasheets/", rounds=20, files=pdfFile, headers=dataset.headers)
+    # The uploads are indexed in the background, finish it so it does not slow down the next benchmarks
+    dataset.client.post("/datasheets/index", headers=dataset.headers)
+
+def test_login(benchmark, dataset):
+    # Dominated by the password hash, which is slow on purpose
+    benchmark("POST", "/user/login", rounds=5, warmup=1, data={"username": "admin", "password": "admin"})
+
+def test_token_check(benchmark, dataset):
+    benchmark("GET", "/user/me", rounds=200, headers=dataset.headers)
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_PATH = Path(__file__).resolve().parents[2] / "app"
+
+
+@pytest.fixture
+def maxQueries():
+    """
+    Assert that a response was served with at most the given number of database statements.
+    """
+    def check(response, limit: int):
+        assert "x-query-count" in response.headers
+        count = int(response.headers["x-query-count"])
+        assert count <= limit, f"{response.request.method} {response.request.url.path} ran {count} queries, expected at most {limit}"
+    return check
+
+
+@pytest.fixture(scope="session")
+def makePdf():
+    """
+    Build small PDFs to upload, with one line of text on every page, using the generator of the app.
+    """
+    sys.path.insert(0, str(APP_PATH))
+    from src.generator import makePdf
+    return makePdf
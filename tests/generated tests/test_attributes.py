@@ -0,0 +1,63 @@
+import uuid
+import pytest
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture(scope="session")
+def token():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+@pytest.fixture
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_attribute_search(auth_headers, maxQueries):
+    category = f"Resistors {uuid.uuid4().hex}"
+    for definition in ({"name": "resistance", "unit": "Ω"}, {"name": "package", "numeric": False}):
+        response = httpx.post(f"{BASE_URL}/attributes/definitions", json={"category": category, **definition}, headers=auth_headers)
+        assert response.status_code == 200
+
+    parts = {}
+    for resistance, package in (("1k", "0603"), ("4k7", "0603"), ("22kΩ", "0603"), ("4.7k", "0805")):
+        partId = str(uuid.uuid4())
+        parts[partId] = resistance
+        response = httpx.post(f"{BASE_URL}/parts/", json={"id": partId, "name": f"Resistor {partId}", "minStock": 1}, headers=auth_headers)
+        assert response.status_code == 200
+        response = httpx.put(
+            f"{BASE_URL}/attributes/parts/{partId}",
+            params={"category": category},
+            json={"resistance": resistance, "package": package},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+    response = httpx.get(f"{BASE_URL}/attributes/parts/{partId}", headers=auth_headers)
+    assert response.json() == {"resistance": 4700.0, "package": "0805"}
+    response = httpx.put(f"{BASE_URL}/attributes/parts/{partId}", params={"category": category}, json={"package": "0805\x00"}, headers=auth_headers)
+    assert response.status_code == 400
+    response = httpx.put(f"{BASE_URL}/attributes/parts/{partId}", params={"category": f"Missing {category}"}, json={"package": "0805"}, headers=auth_headers)
+    assert response.status_code == 404
+
+    search = {
+        "category": category,
+        "filters": [
+            {"attribute": "resistance", "min": "1k", "max": "10k"},
+            {"attribute": "package", "equals": "0603"},
+        ],
+    }
+    response = httpx.post(f"{BASE_URL}/attributes/search", json=search, headers=auth_headers)
+    assert response.status_code == 200
+    maxQueries(response, 3)
+    assert sorted(parts[part["id"]] for part in response.json()) == ["1k", "4k7"]
+    search["filters"] = [{"attribute": "resistance", "equals": "4u7k"}]
+    response = httpx.post(f"{BASE_URL}/attributes/search", json=search, headers=auth_headers)
+    assert response.status_code == 400
+    search["filters"] = []
+    response = httpx.post(f"{BASE_URL}/attributes/search", json=search, headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,66 @@
+import uuid
+import pytest
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture(scope="session")
+def token():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+@pytest.fixture
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_bom_check(auth_headers, maxQueries):
+    resistor = str(uuid.uuid4())
+    capacitor = str(uuid.uuid4())
+    shelf = str(uuid.uuid4())
+    drawer = str(uuid.uuid4())
+    for partId in (resistor, capacitor):
+        response = httpx.post(f"{BASE_URL}/parts/", json={"id": partId, "name": f"BomPart {partId}", "minStock": 1}, headers=auth_headers)
+        assert response.status_code == 200
+    for locationId in (shelf, drawer):
+        response = httpx.post(f"{BASE_URL}/locations/", json={"id": locationId, "name": f"BomLocation {locationId}"}, headers=auth_headers)
+        assert response.status_code == 200
+    movements = [
+        {"partId": resistor, "toLocation": shelf, "delta": 30},
+        {"partId": resistor, "toLocation": drawer, "delta": 10},
+        {"partId": capacitor, "toLocation": drawer, "delta": 5},
+    ]
+    response = httpx.post(f"{BASE_URL}/movements", json=movements, headers=auth_headers)
+    assert response.status_code == 200
+
+    bom = {
+        "count": 3,
+        "lines": [
+            {"partId": resistor, "quantity": 8},
+            {"name": f"BomPart {capacitor}", "quantity": 2},
+            {"partId": resistor, "quantity": 2},
+        ],
+    }
+    response = httpx.post(f"{BASE_URL}/bom/check", json=bom, headers=auth_headers)
+    assert response.status_code == 200
+    maxQueries(response, 2)
+    result = response.json()
+    assert result["buildable"] is False
+    assert result["maxBuilds"] == 2
+    lines = {line["partId"]: line for line in result["lines"]}
+    assert lines[resistor]["required"] == 30
+    assert lines[resistor]["shortfall"] == 0
+    assert lines[resistor]["picks"] == [{"locationId": shelf, "location": f"BomLocation {shelf}", "quantity": 30}]
+    assert lines[capacitor]["shortfall"] == 1
+
+    bom = {"lines": [{"name": "NoSuchBomPart", "quantity": 1}]}
+    response = httpx.post(f"{BASE_URL}/bom/check", json=bom, headers=auth_headers)
+    assert response.json()["unresolved"] == [{"partId": None, "name": "NoSuchBomPart", "quantity": 1}]
+    bom = {"lines": [{"name": "BomPart", "quantity": 1}, {"name": "10 µF", "quantity": 1}]}
+    response = httpx.post(f"{BASE_URL}/bom/check", json=bom, headers=auth_headers)
+    assert response.status_code == 400
+    assert "[1]" in response.json()["detail"]
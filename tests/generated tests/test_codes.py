@@ -0,0 +1,56 @@
+import uuid
+import pytest
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture(scope="session")
+def token():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+@pytest.fixture
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_code_resolve(auth_headers, maxQueries):
+    partId = str(uuid.uuid4())
+    locationId = str(uuid.uuid4())
+    response = httpx.post(f"{BASE_URL}/parts/", json={"id": partId, "name": f"CodePart {partId}", "minStock": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/locations/", json={"id": locationId, "name": f"CodeLocation {locationId}"}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/movements", json=[{"partId": partId, "toLocation": locationId, "delta": 7}], headers=auth_headers)
+    assert response.status_code == 200
+
+    partCode = f"https://example.com/p?sku={partId}"
+    response = httpx.post(f"{BASE_URL}/codes", json={"code": partCode, "kind": "sku", "partId": partId}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/codes", json={"code": partCode, "kind": "sku", "locationId": locationId}, headers=auth_headers)
+    assert response.status_code == 409
+    response = httpx.post(f"{BASE_URL}/codes", json={"code": f"BIN-{locationId}", "kind": "label", "locationId": locationId}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/codes", json={"code": f"BIN2-{locationId}", "kind": "lab\x00el", "locationId": locationId}, headers=auth_headers)
+    assert response.status_code == 422
+    response = httpx.post(f"{BASE_URL}/codes", json={"code": " \r\n", "kind": "label", "locationId": locationId}, headers=auth_headers)
+    assert response.status_code == 400
+
+    response = httpx.get(f"{BASE_URL}/codes/resolve", params={"code": partCode + "\r\n"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["type"] == "part"
+    assert response.json()["locations"] == {locationId: 7}
+    # Resolved from the cache with a single statement
+    response = httpx.get(f"{BASE_URL}/codes/resolve", params={"code": partCode}, headers=auth_headers)
+    maxQueries(response, 1)
+    response = httpx.get(f"{BASE_URL}/codes/resolve", params={"code": f"BIN-{locationId}"}, headers=auth_headers)
+    assert response.json()["parts"] == {partId: 7}
+
+    response = httpx.delete(f"{BASE_URL}/codes", params={"code": partCode}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.get(f"{BASE_URL}/codes/resolve", params={"code": partCode}, headers=auth_headers)
+    assert response.status_code == 404
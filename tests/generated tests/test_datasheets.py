@@ -1,5 +1,10 @@
+import io
+import time
+import uuid
+
 import pytest
 import httpx
+from PIL import Image
 
 BASE_URL = "http://localhost:8000"
 
@@ -19,4 +24,63 @@ def auth_headers(token):
 
 def test_datasheets_endpoint(auth_headers):
     response = httpx.get(f"{BASE_URL}/datasheets/", headers=auth_headers)
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+def test_datasheet_search(auth_headers, makePdf):
+    marker = f"zq{uuid.uuid4().hex[:8]}"
+    pdf = makePdf(f"Features of {marker}", f"LDO regulator 3.3V 1A output {marker}")
+    response = httpx.post(f"{BASE_URL}/datasheets/", files={"datasheet": (f"{marker}.pdf", pdf, "application/pdf")})
+    assert response.status_code == 200
+    datasheetId = response.json()["id"]
+    response = httpx.post(f"{BASE_URL}/parts/", json={"name": f"LDO {marker}", "minStock": 1, "datasheet": datasheetId}, headers=auth_headers)
+    assert response.status_code == 200
+    partId = response.json()["id"]
+    response = httpx.post(f"{BASE_URL}/datasheets/index", headers=auth_headers, timeout=60)
+    assert response.status_code == 200
+    # Only new and changed files are extracted
+    response = httpx.post(f"{BASE_URL}/datasheets/index", headers=auth_headers, timeout=60)
+    assert response.json()["extracted"] == 0
+    response = httpx.get(f"{BASE_URL}/datasheets/search", params={"q": f"3.3V LDO {marker}"}, headers=auth_headers)
+    assert response.status_code == 200
+    hits = response.json()
+    assert [hit["id"] for hit in hits] == [partId]
+    assert hits[0]["datasheetId"] == datasheetId
+    assert [page["page"] for page in hits[0]["pages"]] == [2]
+    assert f"[{marker}]" in hits[0]["pages"][0]["snippet"]
+    response = httpx.get(f"{BASE_URL}/datasheets/search", params={"q": f"{marker}"}, headers=auth_headers)
+    assert [page["page"] for page in response.json()[0]["pages"]] == [1, 2]
+    response = httpx.get(f"{BASE_URL}/datasheets/search", params={"q": f"5V \"{marker}"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == []
+    response = httpx.get(f"{BASE_URL}/datasheets/search", params={"q": " "}, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_datasheet_upload_indexed(auth_headers, makePdf):
+    marker = f"zq{uuid.uuid4().hex[:8]}"
+    response = httpx.post(f"{BASE_URL}/datasheets/", files={"datasheet": (f"{marker}.pdf", makePdf(f"Upload {marker}"), "application/pdf")})
+    assert response.status_code == 200
+    datasheetId = response.json()["id"]
+    # Uploads wake the background indexing, without waiting for the interval
+    for _ in range(100):
+        response = httpx.get(f"{BASE_URL}/datasheets/search", params={"q": marker}, headers=auth_headers)
+        if response.json():
+            break
+        time.sleep(0.1)
+    assert [hit["datasheetId"] for hit in response.json()] == [datasheetId]
+
+def test_datasheet_preview(auth_headers, makePdf):
+    pdf = makePdf("Preview")
+    response = httpx.post(f"{BASE_URL}/datasheets/", files={"datasheet": (f"preview-{uuid.uuid4()}.pdf", pdf, "application/pdf")})
+    assert response.status_code == 200
+    datasheetId = response.json()["id"]
+    response = httpx.post(f"{BASE_URL}/datasheets/index", headers=auth_headers, timeout=60)
+    assert response.status_code == 200
+    response = httpx.get(f"{BASE_URL}/datasheets/{datasheetId}/preview")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert "max-age" in response.headers["cache-control"]
+    assert max(Image.open(io.BytesIO(response.content)).size) == 300
+    response = httpx.get(f"{BASE_URL}/datasheets/{datasheetId}/preview", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    response = httpx.get(f"{BASE_URL}/datasheets/{uuid.uuid4()}/preview")
+    assert response.status_code == 404
@@ -0,0 +1,52 @@
+import os
+import sys
+import sqlite3
+import subprocess
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parents[2] / "app"
+
+def runGenerator(cwd: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "src.generator", *args],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": str(APP_PATH)},
+        capture_output=True,
+        text=True
+    )
+
+def test_generator_fills_database(tmp_path):
+    (tmp_path / "data").mkdir()
+    result = runGenerator(tmp_path, "--parts", "200", "--locations", "30", "--locationDepth", "3", "--images", "2", "--datasheets", "2")
+    assert result.returncode == 0, result.stderr
+    connection = sqlite3.connect(tmp_path / "data" / "db.db")
+    assert connection.execute("SELECT count(*) FROM parts").fetchone() == (200,)
+    assert connection.execute("SELECT count(*) FROM locations").fetchone() == (30,)
+    assert connection.execute("SELECT count(*) FROM inventory").fetchone() == (600,)
+    assert connection.execute("SELECT count(*) FROM parttaglinks").fetchone() == (600,)
+    # The location tree is deeper than one level
+    assert connection.execute("SELECT count(*) FROM locations WHERE parent IN (SELECT id FROM locations WHERE parent IS NOT NULL)").fetchone()[0] > 0
+    # The stock of every part matches its inventory and its movements
+    mismatches = connection.execute(
+        "SELECT count(*) FROM parts WHERE stock != (SELECT coalesce(sum(stock), 0) FROM inventory WHERE \"partId\" = parts.id)"
+        " OR stock != (SELECT coalesce(sum(delta), 0) FROM movements WHERE \"partId\" = parts.id)"
+    ).fetchone()
+    assert mismatches == (0,)
+    assert connection.execute("SELECT count(DISTINCT \"partId\") FROM parttrigrams").fetchone() == (200,)
+    assert len(list((tmp_path / "data" / "images").glob("generated-*.png"))) == 2
+    assert (tmp_path / "data" / "datasheets" / "generated-0.pdf").read_bytes().startswith(b"%PDF")
+    partIds = connection.execute("SELECT id FROM parts ORDER BY id").fetchall()
+    connection.close()
+    # A second run would create duplicate names, it stops before writing any files
+    modified = (tmp_path / "data" / "images" / "generated-0.png").stat().st_mtime_ns
+    result = runGenerator(tmp_path, "--parts", "10")
+    assert result.returncode != 0
+    assert "already contains parts" in result.stderr
+    assert (tmp_path / "data" / "images" / "generated-0.png").stat().st_mtime_ns == modified
+    # The same seed reproduces the dataset
+    (tmp_path / "again" / "data").mkdir(parents=True)
+    result = runGenerator(tmp_path / "again", "--parts", "200", "--locations", "30", "--locationDepth", "3", "--images", "2", "--datasheets", "2")
+    assert result.returncode == 0, result.stderr
+    connection = sqlite3.connect(tmp_path / "again" / "data" / "db.db")
+    assert connection.execute("SELECT id FROM parts ORDER BY id").fetchall() == partIds
+    connection.close()
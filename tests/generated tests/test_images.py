@@ -1,5 +1,10 @@
+import io
+import uuid
+import asyncio
+
 import pytest
 import httpx
+from PIL import Image
 
 BASE_URL = "http://localhost:8000"
 
@@ -19,4 +24,57 @@ def auth_headers(token):
 
 def test_images_endpoint(auth_headers):
     response = httpx.get(f"{BASE_URL}/images/", headers=auth_headers)
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+def uploadImage(width: int, height: int) -> str:
+    stream = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(stream, format="PNG")
+    response = httpx.post(f"{BASE_URL}/images/", files={"image": (f"variant-{uuid.uuid4()}.png", stream.getvalue(), "image/png")})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_image_variants():
+    imageId = uploadImage(400, 300)
+    response = httpx.get(f"{BASE_URL}/images/{imageId}")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["x-cache"] == "miss"
+    assert Image.open(io.BytesIO(response.content)).size == (50, 38)
+    response = httpx.get(f"{BASE_URL}/images/{imageId}")
+    assert response.headers["x-cache"] == "hit"
+    response = httpx.get(f"{BASE_URL}/images/{imageId}", params={"size": 120}, headers={"Accept": "image/webp,*/*"})
+    assert response.headers["content-type"] == "image/webp"
+    assert "Accept" in response.headers["vary"]
+    assert Image.open(io.BytesIO(response.content)).size == (120, 90)
+    response = httpx.get(f"{BASE_URL}/images/{imageId}", params={"size": 0})
+    assert Image.open(io.BytesIO(response.content)).size == (400, 300)
+    response = httpx.get(f"{BASE_URL}/images/{imageId}", params={"size": 100000})
+    assert response.status_code == 400
+
+def test_image_variant_renders_once():
+    imageId = uploadImage(1600, 1200)
+
+    async def fetch():
+        async with httpx.AsyncClient() as client:
+            return await asyncio.gather(*(
+                client.get(f"{BASE_URL}/images/{imageId}", params={"size": 300}, headers={"Accept": "image/avif,image/webp"})
+                for _ in range(8)
+            ))
+
+    responses = asyncio.run(fetch())
+    assert all(response.status_code == 200 for response in responses)
+    assert [response.headers["x-cache"] for response in responses].count("miss") == 1
+    assert len({response.content for response in responses}) == 1
+    # Every connection may reach another worker process, all of them use the stored variant
+    for _ in range(6):
+        response = httpx.get(f"{BASE_URL}/images/{imageId}", params={"size": 300}, headers={"Accept": "image/avif,image/webp"})
+        assert response.headers["x-cache"] == "hit"
+
+def test_invalid_image_upload():
+    response = httpx.post(f"{BASE_URL}/images/", files={"image": (f"broken-{uuid.uuid4()}.png", b"not an image", "image/png")})
+    assert response.status_code == 400
+    stream = io.BytesIO()
+    # Far more pixels than Pillow opens, compresses to a few kB
+    Image.new("1", (20000, 20000)).save(stream, format="PNG")
+    response = httpx.post(f"{BASE_URL}/images/", files={"image": (f"bomb-{uuid.uuid4()}.png", stream.getvalue(), "image/png")})
+    assert response.status_code == 400
@@ -0,0 +1,30 @@
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parents[2] / "app"
+# Cumulative import time of the main module in milliseconds
+BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", 2000))
+
+def importMain(cwd: Path) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": str(APP_PATH)},
+        capture_output=True,
+        text=True
+    )
+
+def test_import_has_no_side_effects(tmp_path):
+    result = importMain(tmp_path)
+    assert result.returncode == 0, result.stderr
+    # Config, secrets, logs and the database are only created on startup
+    assert list(tmp_path.iterdir()) == []
+
+def test_import_time_budget(tmp_path):
+    result = importMain(tmp_path)
+    assert result.returncode == 0, result.stderr
+    line = next(line for line in result.stderr.splitlines() if line.endswith("| main"))
+    cumulative = int(line.split("|")[1]) / 1000
+    assert cumulative < BUDGET, f"Importing main took {cumulative:.0f} ms, the budget is {BUDGET:.0f} ms"
@@ -0,0 +1,56 @@
+import uuid
+import pytest
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture(scope="session")
+def token():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+@pytest.fixture
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_inventory_adjust(auth_headers):
+    partId = str(uuid.uuid4())
+    shelf = str(uuid.uuid4())
+    drawer = str(uuid.uuid4())
+    response = httpx.post(f"{BASE_URL}/parts/", json={"id": partId, "name": f"InventoryPart {partId}", "minStock": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    for locationId in (shelf, drawer):
+        response = httpx.post(f"{BASE_URL}/locations/", json={"id": locationId, "name": f"InventoryLocation {locationId}"}, headers=auth_headers)
+        assert response.status_code == 200
+
+    adjustments = [
+        {"partId": partId, "locationId": shelf, "count": 20, "version": 0},
+        {"partId": partId, "locationId": shelf, "toLocation": drawer, "delta": 5},
+        {"partId": partId, "locationId": drawer, "delta": -50},
+    ]
+    response = httpx.post(f"{BASE_URL}/inventory/adjust", json=adjustments, headers=auth_headers)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["applied", "applied", "insufficient"]
+    assert results[1]["stock"] == 15
+
+    response = httpx.get(f"{BASE_URL}/inventory", params={"partId": partId}, headers=auth_headers)
+    rows = {row["locationId"]: row for row in response.json()}
+    assert rows[shelf]["stock"] == 15
+    assert rows[drawer]["stock"] == 5
+    response = httpx.get(f"{BASE_URL}/parts/{partId}", headers=auth_headers)
+    assert response.json()["stock"] == 20
+
+    # A scanner which read an old version gets a conflict instead of overwriting the count
+    stale = [{"partId": partId, "locationId": shelf, "count": 0, "version": 0}]
+    response = httpx.post(f"{BASE_URL}/inventory/adjust", json=stale, headers=auth_headers)
+    assert response.json()["results"][0] == {"partId": partId, "locationId": shelf, "stock": 15, "version": rows[shelf]["version"], "status": "conflict"}
+    response = httpx.post(f"{BASE_URL}/inventory/adjust", params={"atomic": True}, json=stale + adjustments[:1], headers=auth_headers)
+    assert response.status_code == 409
+    response = httpx.get(f"{BASE_URL}/parts/{partId}", headers=auth_headers)
+    assert response.json()["stock"] == 20
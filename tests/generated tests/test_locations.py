@@ -1,3 +1,4 @@
+import uuid
 import pytest
 import httpx
 
@@ -53,4 +54,32 @@ def test_location_lifecycle(auth_headers):
 
         # Get by name
         response = httpx.get(f"{BASE_URL}/locations/{update_name}", headers=auth_headers)
-        assert response.status_code == 200
\ No newline at end of file
+        assert response.status_code == 200
+
+def test_get_locations_queries(auth_headers, maxQueries):
+    response = httpx.get(f"{BASE_URL}/locations", headers=auth_headers)
+    assert response.status_code == 200
+    maxQueries(response, 2)
+
+def test_locations_batch_and_fields(auth_headers, maxQueries):
+    names = [f"BatchLocation {uuid.uuid4()}" for _ in range(2)]
+    locationIds = [str(uuid.uuid4()) for _ in names]
+    for locationId, name in zip(locationIds, names):
+        response = httpx.post(f"{BASE_URL}/locations/", json={"id": locationId, "name": name}, headers=auth_headers)
+        assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/locations/batch", json=locationIds + [str(uuid.uuid4())], headers=auth_headers)
+    assert response.status_code == 200
+    locations = response.json()
+    assert set(locations) == set(locationIds)
+    assert locations[locationIds[0]]["parts"] == []
+    maxQueries(response, 2)
+    response = httpx.post(f"{BASE_URL}/locations/batch", params={"fields": "name"}, json=locationIds, headers=auth_headers)
+    assert response.json()[locationIds[1]] == {"name": names[1]}
+    maxQueries(response, 1)
+    response = httpx.get(f"{BASE_URL}/locations", params={"fields": "name,parent"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()[locationIds[0]] == {"name": names[0], "parent": None}
+    response = httpx.get(f"{BASE_URL}/locations/{names[0]}", params={"fields": "parent,parts"}, headers=auth_headers)
+    assert response.json() == {"parent": None, "parts": []}
+    response = httpx.get(f"{BASE_URL}/locations/{names[0]}", params={"fields": "stock"}, headers=auth_headers)
+    assert response.status_code == 400
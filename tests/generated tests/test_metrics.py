@@ -0,0 +1,12 @@
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+def test_metrics_endpoint():
+    response = httpx.get(f"{BASE_URL}/images/")
+    assert response.status_code == 200
+    assert "x-query-count" in response.headers
+    response = httpx.get(f"{BASE_URL}/metrics")
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/images/",status="200"}' in response.text
+    assert "db_statements_per_request_bucket" in response.text
@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import uuid
+import sqlite3
+import subprocess
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parents[2] / "app"
+
+def runMigrations(cwd: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-m", "src.migrations", *args],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": str(APP_PATH)},
+        capture_output=True,
+        text=True
+    )
+
+def test_migrations_upgrade_existing_database(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "config.json").write_text(json.dumps({"migrationBatchSize": 2}))
+    result = runMigrations(tmp_path, "upgrade")
+    assert result.returncode == 0, result.stderr
+    # Turn the database into one created before the migrations existed
+    connection = sqlite3.connect(tmp_path / "data" / "db.db")
+    connection.execute('DROP INDEX "ix_inventory_partId"')
+    connection.execute("DROP TABLE schemaversions")
+    connection.execute("ALTER TABLE inventory DROP COLUMN version")
+    connection.execute('ALTER TABLE datasheettexts DROP COLUMN "previewError"')
+    locationId = uuid.uuid4().hex
+    connection.execute("INSERT INTO locations (id, name, description) VALUES (?, 'shelf', '')", (locationId,))
+    for i in range(5):
+        partId = uuid.uuid4().hex
+        connection.execute("INSERT INTO parts (id, name, description, stock, \"minStock\") VALUES (?, ?, '', 99, 0)", (partId, f"part {i}"))
+        connection.execute("INSERT INTO inventory (id, \"partId\", \"locationId\", stock) VALUES (?, ?, ?, ?)", (uuid.uuid4().hex, partId, locationId, i))
+    connection.commit()
+    result = runMigrations(tmp_path, "status")
+    assert result.returncode == 0, result.stderr
+    assert "Current version: 0" in result.stdout
+    result = runMigrations(tmp_path, "upgrade")
+    assert result.returncode == 0, result.stderr
+    assert "Backfill of parts: 5/5 rows" in result.stderr
+    assert sorted(stock for (stock,) in connection.execute("SELECT stock FROM parts")) == [0, 1, 2, 3, 4]
+    indexes = [name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")]
+    assert "ix_inventory_partId" in indexes
+    assert [version for (version,) in connection.execute("SELECT version FROM inventory")] == [0] * 5
+    assert "previewError" in [row[1] for row in connection.execute("PRAGMA table_info(datasheettexts)")]
+    result = runMigrations(tmp_path, "status")
+    assert "Pending" not in result.stdout
+    connection.close()
@@ -0,0 +1,77 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import httpx
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture(scope="session")
+def token():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+@pytest.fixture
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_movements(auth_headers):
+    partId = str(uuid.uuid4())
+    shelf = str(uuid.uuid4())
+    drawer = str(uuid.uuid4())
+    response = httpx.post(f"{BASE_URL}/parts/", json={"id": partId, "name": f"MovementPart {partId}", "minStock": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    for locationId in (shelf, drawer):
+        response = httpx.post(f"{BASE_URL}/locations/", json={"id": locationId, "name": f"MovementLocation {locationId}"}, headers=auth_headers)
+        assert response.status_code == 200
+
+    movements = [
+        {"partId": partId, "toLocation": shelf, "delta": 10},
+        {"partId": partId, "fromLocation": shelf, "toLocation": drawer, "delta": 3},
+        {"partId": partId, "fromLocation": drawer, "delta": 2},
+    ]
+    response = httpx.post(f"{BASE_URL}/movements", json=movements, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"count": 3}
+    response = httpx.get(f"{BASE_URL}/parts/{partId}", headers=auth_headers)
+    assert response.json()["stock"] == 8
+
+    # Taking more than a location holds rejects the whole batch
+    movements = [
+        {"partId": partId, "toLocation": shelf, "delta": 1},
+        {"partId": partId, "fromLocation": drawer, "delta": 5},
+    ]
+    response = httpx.post(f"{BASE_URL}/movements", json=movements, headers=auth_headers)
+    assert response.status_code == 409
+    response = httpx.get(f"{BASE_URL}/parts/{partId}", headers=auth_headers)
+    assert response.json()["stock"] == 8
+
+    response = httpx.post(f"{BASE_URL}/movements", json=[{"partId": str(uuid.uuid4()), "toLocation": shelf, "delta": 1}], headers=auth_headers)
+    assert response.status_code == 400
+    response = httpx.get(f"{BASE_URL}/movements", params={"partId": partId}, headers=auth_headers)
+    assert response.status_code == 200
+    assert [movement["delta"] for movement in response.json()] == [2, 3, 10]
+
+def test_movements_concurrent(auth_headers):
+    partId = str(uuid.uuid4())
+    shelf = str(uuid.uuid4())
+    response = httpx.post(f"{BASE_URL}/parts/", json={"id": partId, "name": f"MovementPart {partId}", "minStock": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/locations/", json={"id": shelf, "name": f"MovementLocation {shelf}"}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/movements", json=[{"partId": partId, "toLocation": shelf, "delta": 5}], headers=auth_headers)
+    assert response.status_code == 200
+
+    # The shortfall check runs under the write lock, so parallel batches can not take the same stock twice
+    def take(_):
+        return httpx.post(f"{BASE_URL}/movements", json=[{"partId": partId, "fromLocation": shelf, "delta": 1}], headers=auth_headers, timeout=30).status_code
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        codes = list(pool.map(take, range(10)))
+    assert sorted(codes) == [200] * 5 + [409] * 5
+    response = httpx.get(f"{BASE_URL}/parts/{partId}", headers=auth_headers)
+    assert response.json()["stock"] == 0
@@ -1,3 +1,4 @@
+import uuid
 import pytest
 import httpx
 
@@ -46,4 +47,56 @@ def test_part_lifecycle(auth_headers):
 def test_get_parts(auth_headers):
 
     response = httpx.get(f"{BASE_URL}/parts/", headers=auth_headers)
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+def test_get_parts_queries(auth_headers, maxQueries):
+    response = httpx.get(f"{BASE_URL}/parts/", headers=auth_headers)
+    assert response.status_code == 200
+    maxQueries(response, 2)
+
+def test_part_duplicates(auth_headers):
+    name = f"LM358 {uuid.uuid4().hex[:8]}"
+    response = httpx.post(f"{BASE_URL}/parts/", json={"name": name, "minStock": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    partId = response.json()["id"]
+    response = httpx.post(f"{BASE_URL}/parts/", json={"name": f"{name.lower()}N", "minStock": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    duplicateId = response.json()["id"]
+    assert partId in [part["id"] for part in response.json()["possibleDuplicates"]]
+    response = httpx.get(f"{BASE_URL}/parts/duplicates", headers=auth_headers)
+    assert response.status_code == 200
+    assert any({partId, duplicateId} <= {part["id"] for part in group} for group in response.json())
+    for threshold in (0, 1.5):
+        response = httpx.get(f"{BASE_URL}/parts/duplicates", params={"threshold": threshold}, headers=auth_headers)
+        assert response.status_code == 422
+
+def test_parts_batch_and_fields(auth_headers, maxQueries):
+    partIds = []
+    for i in range(3):
+        response = httpx.post(f"{BASE_URL}/parts/", json={"name": f"BatchPart {uuid.uuid4()}", "minStock": 1, "tags": ["batch"]}, headers=auth_headers)
+        assert response.status_code == 200
+        partIds.append(response.json()["id"])
+    missingId = str(uuid.uuid4())
+    response = httpx.post(f"{BASE_URL}/parts/batch", json=partIds + [missingId], headers=auth_headers)
+    assert response.status_code == 200
+    parts = response.json()
+    assert set(parts) == set(partIds)
+    assert parts[partIds[0]]["tags"] == ["batch"]
+    maxQueries(response, 2)
+    response = httpx.post(f"{BASE_URL}/parts/batch", params={"fields": "name,stock"}, json=partIds, headers=auth_headers)
+    assert response.status_code == 200
+    assert all(set(part) == {"name", "stock"} for part in response.json().values())
+    maxQueries(response, 1)
+    response = httpx.get(f"{BASE_URL}/parts/{partIds[0]}", params={"fields": "name,tags"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["tags"] == ["batch"]
+    assert set(response.json()) == {"name", "tags"}
+    response = httpx.get(f"{BASE_URL}/parts/", params={"fields": "name"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()[partIds[1]] == {"name": parts[partIds[1]]["name"]}
+    response = httpx.get(f"{BASE_URL}/parts/", params={"fields": "name,password"}, headers=auth_headers)
+    assert response.status_code == 400
+    response = httpx.post(f"{BASE_URL}/parts/", json={"name": f"BatchPart {uuid.uuid4()}", "tags": ["fine", "µ"]}, headers=auth_headers)
+    assert response.status_code == 400
+    response = httpx.get(f"{BASE_URL}/parts/{missingId}", params={"fields": "name"}, headers=auth_headers)
+    assert response.status_code == 404
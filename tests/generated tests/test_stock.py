@@ -0,0 +1,56 @@
+import uuid
+import pytest
+import httpx
+from datetime import datetime, timedelta
+
+BASE_URL = "http://localhost:8000"
+
+@pytest.fixture(scope="session")
+def token():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+@pytest.fixture
+def auth_headers(token):
+    return {"Authorization": f"Bearer {token}"}
+
+def test_stock_history(auth_headers):
+    partId = str(uuid.uuid4())
+    locationId = str(uuid.uuid4())
+    response = httpx.post(f"{BASE_URL}/parts/", json={"id": partId, "name": f"StockPart {partId}", "minStock": 1}, headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/locations/", json={"id": locationId, "name": f"StockLocation {locationId}"}, headers=auth_headers)
+    assert response.status_code == 200
+
+    response = httpx.post(f"{BASE_URL}/movements", json=[{"partId": partId, "toLocation": locationId, "delta": 10}], headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/stock/snapshots", headers=auth_headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/movements", json=[{"partId": partId, "fromLocation": locationId, "delta": 4}], headers=auth_headers)
+    assert response.status_code == 200
+    received, consumed = [
+        datetime.fromisoformat(movement["timestamp"])
+        for movement in reversed(httpx.get(f"{BASE_URL}/movements", params={"partId": partId}, headers=auth_headers).json())
+    ]
+
+    response = httpx.get(f"{BASE_URL}/stock/locations/{locationId}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["parts"] == {partId: 6}
+    response = httpx.get(f"{BASE_URL}/stock/locations/{locationId}", params={"at": received.isoformat()}, headers=auth_headers)
+    assert response.json()["parts"] == {partId: 10}
+
+    params = {
+        "start": (received - timedelta(seconds=2)).isoformat(),
+        "end": (consumed + timedelta(seconds=1)).isoformat(),
+        "interval": 1,
+    }
+    response = httpx.get(f"{BASE_URL}/stock/parts/{partId}/series", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    series = response.json()
+    assert series[0]["stock"] == 0
+    assert series[-1]["stock"] == 6
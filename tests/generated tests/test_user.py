@@ -20,4 +20,45 @@ def auth_headers(token):
 def test_user_me(auth_headers):
     response = httpx.get(f"{BASE_URL}/userme", headers=auth_headers)
     assert response.status_code == 200
-    assert "username" in response.json()
\ No newline at end of file
+    assert "username" in response.json()
+    response = httpx.get(f"{BASE_URL}/user/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert "username" in response.json()
+
+def test_user_logout():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    response = httpx.get(f"{BASE_URL}/userme", headers=headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/user/logout", headers=headers)
+    assert response.status_code == 200
+    response = httpx.get(f"{BASE_URL}/userme", headers=headers)
+    assert response.status_code == 401
+
+def test_user_refresh():
+    response = httpx.post(
+        f"{BASE_URL}/user/login",
+        data={"username": "admin", "password": "admin", "client_id": "scanner"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+    oldToken = response.json()["refresh_token"]
+    response = httpx.post(f"{BASE_URL}/user/refresh", json={"refresh_token": oldToken})
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    refreshToken = response.json()["refresh_token"]
+    assert refreshToken != oldToken
+    # Refresh tokens are rotated, the old one is used up
+    response = httpx.post(f"{BASE_URL}/user/refresh", json={"refresh_token": oldToken})
+    assert response.status_code == 401
+    response = httpx.get(f"{BASE_URL}/userme", headers=headers)
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/user/logout", headers=headers, json={"refresh_token": refreshToken})
+    assert response.status_code == 200
+    response = httpx.post(f"{BASE_URL}/user/refresh", json={"refresh_token": refreshToken})
+    assert response.status_code == 401
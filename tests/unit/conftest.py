@@ -0,0 +1,8 @@
+"""
+In-process unit tests of app modules, they need no running server.
+"""
+import sys
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parents[2] / "app"
+sys.path.insert(0, str(APP_PATH))
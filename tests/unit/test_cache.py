@@ -0,0 +1,30 @@
+from src.cache import DiskCache
+
+def test_disk_cache_eviction(tmp_path):
+    cache = DiskCache(tmp_path, 250)
+    cache.load()
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    assert cache.get("a") is not None
+    # b is the least recently used entry now
+    cache.put("c", b"c" * 100)
+    assert cache.get("b") is None
+    assert not (tmp_path / "b").exists()
+    assert cache.size == 200
+    assert cache.put("huge", b"x" * 1000) is None
+    # A new instance picks up the files of the old one
+    reloaded = DiskCache(tmp_path, 250)
+    reloaded.load()
+    assert len(reloaded) == 2
+    assert reloaded.get("c").read_bytes() == b"c" * 100
+    # Files removed by another process are misses
+    (tmp_path / "c").unlink()
+    assert reloaded.read("c") is None
+    assert reloaded.size == 100
+    # Files written by another process are hits and count towards the size
+    other = DiskCache(tmp_path, 250)
+    other.load()
+    other.put("d", b"d" * 100)
+    assert reloaded.read("d") == b"d" * 100
+    assert len(reloaded) == 2
+    assert reloaded.size == 200
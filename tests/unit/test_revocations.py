@@ -0,0 +1,21 @@
+import json
+
+from src.revocations import RevocationLog
+
+def test_revocation_log_compaction(tmp_path):
+    path = tmp_path / "revocations.jsonl"
+    writer = RevocationLog(path)
+    reader = RevocationLog(path)
+    for i in range(20):
+        writer.append({"token": f"expired {i}", "expires": 0})
+    writer.append({"token": "kept", "expires": 4102444800})
+    assert len(reader.read()) == 21
+    # Another process compacts the file and appends, it is still longer than the offset of this one
+    writer.compact(maxSize=0)
+    for i in range(20):
+        writer.append({"token": f"new {i}", "expires": 4102444800})
+    assert path.stat().st_size > reader.offset
+    entries = reader.read()
+    assert [entry["token"] for entry in entries] == ["kept"] + [f"new {i}" for i in range(20)]
+    assert reader.read() == []
+    assert json.loads(path.read_text().splitlines()[0])["token"] == "kept"
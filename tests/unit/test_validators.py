@@ -0,0 +1,32 @@
+import sys
+
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from src.validators import ALLOWEDCHARS, INVALIDSTRINGCHAR, INVALIDPATHCHAR, SafeString, SafePath, findInvalidChar, findInvalidStrings
+
+def test_patterns_match_allowed_chars():
+    # The characters the validation accepted before the patterns, checked one by one
+    stringChars = "".join(ALLOWEDCHARS)
+    pathChars = "".join(ALLOWEDCHARS[:-2])
+    for code in range(sys.maxunicode + 1):
+        char = chr(code)
+        assert (INVALIDSTRINGCHAR.search(char) is None) == (char in stringChars), repr(char)
+        assert (INVALIDPATHCHAR.search(char) is None) == (char in pathChars), repr(char)
+
+def test_find_invalid():
+    assert findInvalidChar("LM358 [SOIC-8], 5% 'dual' op-amp\n") is None
+    assert findInvalidChar("10 µF") == "µ"
+    assert findInvalidChar("a\nb", INVALIDPATHCHAR) == "\n"
+    assert findInvalidStrings(["fine", "10 µF", "also fine", "tab\there", "Ω"]) == [1, 4]
+    assert findInvalidStrings(["fine", "tab\there"], INVALIDPATHCHAR) == [1]
+    assert findInvalidStrings([]) == []
+
+def test_pydantic_types():
+    assert TypeAdapter(list[SafeString]).validate_python(["a", "b\n"]) == ["a", "b\n"]
+    with pytest.raises(ValidationError, match="invalid character"):
+        TypeAdapter(list[SafeString]).validate_python(["a", "Ω"])
+    assert TypeAdapter(SafePath).validate_python("LM358 (rev. 2).pdf") == "LM358 (rev. 2).pdf"
+    # Paths are file names, separators are not allowed
+    with pytest.raises(ValidationError):
+        TypeAdapter(SafePath).validate_python("../secrets.json")
@@ -0,0 +1,57 @@
+"""
+Benchmark of stock adjustments, a stocktake applied in batches against one request per item.
+
+Run from the repository root: python tools/benchmarkAdjustments.py [adjustments] [batchSize]
+"""
+import sys
+import time
+import random
+
+from benchmarkSetup import createWorkDir
+
+total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+batchSize = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+createWorkDir("WARNING")
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from src import configureLogging, dependencies
+import src.database as db
+from src.routers.user import createToken
+from src.schemes import User
+from main import app
+
+configureLogging()
+dependencies.initialize()
+db.initialize()
+dependencies.config.movementBatchSize = max(batchSize, dependencies.config.movementBatchSize)
+token = createToken(User(username="benchmark", type=1, disabled=False)).access_token
+headers = {"Authorization": f"Bearer {token}"}
+
+with Session(db.engine) as session:
+    parts = [db.Parts(name=f"part {i}") for i in range(200)]
+    locations = [db.Locations(name=f"location {i}") for i in range(20)]
+    session.add_all(parts + locations)
+    session.commit()
+    partIds = [str(part.id) for part in parts]
+    locationIds = [str(location.id) for location in locations]
+
+
+def counts(count: int) -> list[dict]:
+    # Absolute counts are never rejected for missing stock
+    return [
+        {"partId": random.choice(partIds), "locationId": random.choice(locationIds), "count": random.randint(0, 100)}
+        for _ in range(count)
+    ]
+
+
+with TestClient(app) as client:
+    for name, size, count in (("batched", batchSize, total), ("single", 1, min(total, 2000))):
+        batches = [counts(size) for _ in range(count // size)]
+        start = time.perf_counter()
+        for batch in batches:
+            response = client.post("/inventory/adjust", json=batch, headers=headers)
+            assert response.status_code == 200, response.text
+        duration = time.perf_counter() - start
+        print(f"{name:>7}: {len(batches) * size:6d} adjustments in {duration:6.2f} s ({len(batches) * size / duration:8.0f} adjustments/s)")
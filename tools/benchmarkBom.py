@@ -0,0 +1,61 @@
+"""
+Benchmark of the BOM availability check with a large BOM.
+
+Run from the repository root: python tools/benchmarkBom.py [lines] [requests]
+"""
+import sys
+import random
+import statistics
+
+from benchmarkSetup import createWorkDir
+
+lines = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+requests = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+createWorkDir("WARNING")
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from src import configureLogging, dependencies
+import src.database as db
+from src.routers.user import createToken
+from src.schemes import User
+from main import app
+
+configureLogging()
+dependencies.initialize()
+db.initialize()
+token = createToken(User(username="benchmark", type=1, disabled=False)).access_token
+headers = {"Authorization": f"Bearer {token}"}
+
+with Session(db.engine) as session:
+    parts = [db.Parts(name=f"part {i}") for i in range(lines * 4)]
+    locations = [db.Locations(name=f"location {i}") for i in range(50)]
+    session.add_all(parts + locations)
+    session.flush()
+    # Every part is stored in a few locations
+    for part in parts:
+        for location in random.sample(locations, 3):
+            session.add(db.Inventory(partId=part.id, locationId=location.id, stock=random.randint(0, 200)))
+    session.commit()
+    partIds = [str(part.id) for part in parts]
+
+bom = {
+    "count": 10,
+    "lines": [{"partId": partId, "quantity": random.randint(1, 10)} for partId in random.sample(partIds, lines)],
+}
+
+with TestClient(app) as client:
+    client.post("/bom/check", json=bom, headers=headers)
+    durations = []
+    for _ in range(requests):
+        response = client.post("/bom/check", json=bom, headers=headers)
+        assert response.status_code == 200, response.text
+        # Server side time, without the test client
+        durations.append(float(response.headers["x-response-time"].removesuffix("ms")) / 1000)
+durations.sort()
+print(
+    f"{lines} lines: p50 {statistics.median(durations) * 1000:6.2f} ms"
+    f" | p95 {durations[int(len(durations) * 0.95)] * 1000:6.2f} ms"
+    f" | {response.headers['x-query-count']} queries"
+)
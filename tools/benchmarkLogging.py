@@ -0,0 +1,66 @@
+"""
+Benchmark of the request latency with DEBUG logging, comparing handlers called directly
+on the request path with the queued logging pipeline from logger.template.yaml.
+
+Run from the repository root: python tools/benchmarkLogging.py [requests]
+"""
+import sys
+import copy
+import time
+import statistics
+import logging.config
+from pathlib import Path
+
+from benchmarkSetup import createWorkDir
+
+requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+workDir = createWorkDir("DEBUG")
+# Console output goes to a file, so the benchmark measures real I/O without flooding the terminal
+sys.stderr = open(Path(workDir) / "console.log", "w")
+
+from fastapi.testclient import TestClient
+from src import configureLogging, dependencies
+from src.routers.user import createToken
+from src.schemes import User
+from main import app
+
+loggerConfig = configureLogging()
+dependencies.initialize()
+queuedConfig = copy.deepcopy(loggerConfig)
+queuedConfig["loggers"]["sqlalchemy.engine"]["level"] = "INFO"
+directConfig = copy.deepcopy(queuedConfig)
+del directConfig["handlers"]["queue"]
+for name in ("console", "file"):
+    directConfig["handlers"][name]["filters"] = ["filter"]
+directConfig["root"]["handlers"] = ["console", "file"]
+
+token = createToken(User(username="benchmark", type=1, disabled=False)).access_token
+headers = {"Authorization": f"Bearer {token}"}
+
+
+def run(client: TestClient) -> list[float]:
+    durations = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get("/parts/", headers=headers)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+results = {}
+with TestClient(app) as client:
+    for name, config in (("direct", directConfig), ("queued", queuedConfig)):
+        logging.config.dictConfig(config)
+        run(client)
+        results[name] = run(client)
+logging.shutdown()
+
+sys.stderr = sys.__stderr__
+for name, durations in results.items():
+    durations.sort()
+    print(
+        f"{name:>6}: p50 {statistics.median(durations) * 1000:6.2f} ms"
+        f" | p95 {durations[int(len(durations) * 0.95)] * 1000:6.2f} ms"
+        f" | {len(durations) / sum(durations):7.0f} requests/s"
+    )
@@ -0,0 +1,57 @@
+"""
+Benchmark of the movement ledger, posting scan events in batches and one per request.
+
+Run from the repository root: python tools/benchmarkMovements.py [movements] [batchSize]
+"""
+import sys
+import time
+import random
+
+from benchmarkSetup import createWorkDir
+
+total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+batchSize = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+createWorkDir("WARNING")
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from src import configureLogging, dependencies
+import src.database as db
+from src.routers.user import createToken
+from src.schemes import User
+from main import app
+
+configureLogging()
+dependencies.initialize()
+db.initialize()
+dependencies.config.movementBatchSize = max(batchSize, dependencies.config.movementBatchSize)
+token = createToken(User(username="benchmark", type=1, disabled=False)).access_token
+headers = {"Authorization": f"Bearer {token}"}
+
+with Session(db.engine) as session:
+    parts = [db.Parts(name=f"part {i}") for i in range(200)]
+    locations = [db.Locations(name=f"location {i}") for i in range(20)]
+    session.add_all(parts + locations)
+    session.commit()
+    partIds = [str(part.id) for part in parts]
+    locationIds = [str(location.id) for location in locations]
+
+
+def scans(count: int) -> list[dict]:
+    # Only receipts, so no movement is rejected for missing stock
+    return [
+        {"partId": random.choice(partIds), "toLocation": random.choice(locationIds), "delta": random.randint(1, 10)}
+        for _ in range(count)
+    ]
+
+
+with TestClient(app) as client:
+    for name, size, count in (("batched", batchSize, total), ("single", 1, min(total, 2000))):
+        batches = [scans(size) for _ in range(count // size)]
+        start = time.perf_counter()
+        for batch in batches:
+            response = client.post("/movements", json=batch, headers=headers)
+            assert response.status_code == 200, response.text
+        duration = time.perf_counter() - start
+        print(f"{name:>7}: {len(batches) * size:6d} movements in {duration:6.2f} s ({len(batches) * size / duration:8.0f} movements/s)")
@@ -0,0 +1,82 @@
+"""
+Throughput benchmark of the RedactingFilter on uvicorn access log records.
+
+Run from the repository root: python tools/benchmarkRedaction.py [records]
+"""
+import sys
+import time
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+from src.loggingFilters import RedactingFilter
+
+records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+fields = ["password", "token"]
+paths = [
+    "/parts/",
+    "/locations",
+    "/parts/?fields=name,stock",
+    "/images/6f1c2b9e-3c1f-4c7a-9a57-0c5d3e1f2a4b",
+    "/user/login?password=secret&remember=1",
+    "/datasheets/",
+    "/locations/Shelf%20A",
+    "/user/me"
+]
+
+
+class LegacyRedactingFilter(logging.Filter):
+    """
+    The previous implementation, kept as baseline.
+    """
+
+    def __init__(self, sensitiveFields: list[str]):
+        super().__init__()
+        self.sensitiveFields = sensitiveFields
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field in self.sensitiveFields:
+            if record.args is None:
+                continue
+            if len(record.args) != 5:
+                continue
+            args = list(record.args)
+            args[0] = "<<SECRET>>"
+            msg = str(args[2])
+            if field in msg:
+                start = msg.index(field)
+                lenght = len(field) + 1
+                end = msg[start + lenght:].find("&")
+                if end == -1:
+                    end = len(msg)
+                else:
+                    end += start + lenght
+                msg = msg[:start + lenght] + "<<SECRET>>" + msg[end:]
+                args[2] = msg
+            record.args = tuple(args)
+        return True
+
+
+def makeRecords() -> list[logging.LogRecord]:
+    return [
+        logging.LogRecord(
+            "uvicorn.access", logging.INFO, __file__, 0, '%s - "%s %s HTTP/%s" %d',
+            ("127.0.0.1:50000", "GET", paths[index % len(paths)], "1.1", 200), None
+        )
+        for index in range(records)
+    ]
+
+
+# The legacy filter ran on the console and the file handler, the current one only on the queue handler
+for name, recordFilter, passes in (("legacy", LegacyRedactingFilter(fields), 2), ("current", RedactingFilter(fields), 1)):
+    # Best of several rounds, to reduce the noise of other processes
+    durations = []
+    for _ in range(5):
+        batch = makeRecords()
+        start = time.perf_counter()
+        for record in batch:
+            for _ in range(passes):
+                recordFilter.filter(record)
+        durations.append(time.perf_counter() - start)
+    duration = min(durations)
+    print(f"{name:>8}: {records / duration:10.0f} records/s ({duration / records * 1e6:.2f} us/record)")
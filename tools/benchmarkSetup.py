@@ -0,0 +1,34 @@
+"""
+Shared setup of the benchmarks, which import the app inside a temporary working directory
+so no data is written to the repository.
+"""
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+from pathlib import Path
+
+appPath = Path(__file__).resolve().parent.parent / "app"
+
+
+def createWorkDir(logLevel: str = "WARNING") -> Path:
+    """
+    Create a temporary working directory with a logger config and a data folder, change into it
+    and put the app on the import path. The directory is removed again when the process exits.
+    """
+    workDir = Path(tempfile.mkdtemp())
+    template = (appPath / "logger.template.yaml").read_text()
+    (workDir / "logger.yaml").write_text(template.replace("${LOG_LEVEL}", logLevel).replace("${LOG_FILE_FORMAT}", "complex"))
+    (workDir / "data").mkdir()
+    atexit.register(removeWorkDir, workDir, os.getcwd())
+    os.chdir(workDir)
+    if str(appPath) not in sys.path:
+        sys.path.insert(0, str(appPath))
+    return workDir
+
+
+def removeWorkDir(workDir: Path, cwd: str) -> None:
+    # Safe to call more than once
+    os.chdir(cwd)
+    shutil.rmtree(workDir, ignore_errors=True)
@@ -0,0 +1,35 @@
+"""
+Micro-benchmark of the per request overhead of the getCurrentUser dependency.
+
+Run from the repository root: python tools/benchmarkTokenCache.py [iterations]
+"""
+import sys
+import time
+import asyncio
+
+from benchmarkSetup import createWorkDir
+
+iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+createWorkDir("WARNING")
+
+from src import dependencies
+from src.routers.user import createToken
+from src.schemes import User
+
+dependencies.initialize()
+token = createToken(User(username="benchmark", type=1, disabled=False)).access_token
+
+
+async def run(cached: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            dependencies.TOKENCACHE.clear()
+        await dependencies.getCurrentUser(token)
+    return time.perf_counter() - start
+
+
+for name, cached in (("uncached", False), ("cached", True)):
+    duration = asyncio.run(run(cached))
+    print(f"{name:>8}: {duration / iterations * 1e6:8.2f} us/request ({iterations / duration:10.0f} requests/s)")
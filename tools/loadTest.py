@@ -0,0 +1,284 @@
+"""
+Load test of a running server with concurrent clients in mixed scenarios.
+
+Scenarios:
+    scanner    resolves scanned codes and looks up the part and its inventory, without pauses
+    dashboard  polls the part and location lists, stock of a location and recent movements
+    uploader   uploads images and datasheets and posts batches of movements
+    login      logs in with bursts of concurrent requests
+
+Against a running server:
+    python tools/loadTest.py --url http://localhost:8000 --username admin --password admin
+Or start a server with a generated catalogue inside a temporary working directory:
+    python tools/loadTest.py --start --parts 20000 --workers 4
+
+Reports throughput, tail latency and error rates per endpoint, so worker counts and pool settings can be compared.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import subprocess
+from pathlib import Path
+from dataclasses import dataclass, field
+
+import httpx
+from PIL import Image
+
+from benchmarkSetup import appPath, createWorkDir, removeWorkDir
+
+
+@dataclass
+class Stats:
+    durations: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class Catalogue:
+    partIds: list[str]
+    locationIds: list[str]
+    codes: list[str]
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, duration: float) -> None:
+        self.client = client
+        self.end = time.perf_counter() + duration
+        self.stats: dict[str, Stats] = {}
+        self.headers: dict[str, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return time.perf_counter() < self.end
+
+    async def request(self, name: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        """
+        Send a request and record it under the endpoint name, failed connections count as errors.
+        """
+        stats = self.stats.setdefault(name, Stats())
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            stats.durations.append(time.perf_counter() - start)
+            stats.errors += 1
+            stats.statuses[type(e).__name__] = stats.statuses.get(type(e).__name__, 0) + 1
+            return None
+        stats.durations.append(time.perf_counter() - start)
+        stats.statuses[str(response.status_code)] = stats.statuses.get(str(response.status_code), 0) + 1
+        if response.status_code >= 400:
+            stats.errors += 1
+        return response
+
+    async def login(self, username: str, password: str) -> str:
+        response = await self.client.post("/user/login", data={"username": username, "password": password})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    async def prepare(self, codes: int) -> Catalogue:
+        """
+        Read part and location ids and register scan codes for some parts.
+        """
+        response = await self.client.get("/locations", headers=self.headers, timeout=300)
+        response.raise_for_status()
+        locations = response.json()
+        locationIds = list(locations)
+        partIds = list({partId for location in locations.values() for partId, _ in location["parts"]})
+        if not partIds or not locationIds:
+            raise RuntimeError("The server has no stored parts, fill it with python -m src.generator first")
+        catalogue = Catalogue(partIds=partIds, locationIds=locationIds, codes=[])
+        for partId in random.sample(partIds, min(codes, len(partIds))):
+            code = f"LOADTEST-{partId}"
+            response = await self.client.post("/codes", json={"code": code, "kind": "label", "partId": partId}, headers=self.headers)
+            # Codes of an earlier run already exist
+            if response.status_code in (200, 409):
+                catalogue.codes.append(code)
+        return catalogue
+
+    async def scanner(self, catalogue: Catalogue) -> None:
+        while self.running:
+            code = random.choice(catalogue.codes) if catalogue.codes else None
+            partId = random.choice(catalogue.partIds)
+            if code is not None:
+                response = await self.request("GET /codes/resolve", "GET", "/codes/resolve", params={"code": code}, headers=self.headers)
+                if response is not None and response.status_code == 200:
+                    partId = response.json()["id"]
+            await self.request("GET /parts/{id}", "GET", f"/parts/{partId}", headers=self.headers)
+            await self.request("GET /inventory?partId", "GET", "/inventory", params={"partId": partId}, headers=self.headers)
+
+    async def dashboard(self, catalogue: Catalogue, interval: float) -> None:
+        while self.running:
+            start = time.perf_counter()
+            await self.request("GET /parts/", "GET", "/parts/", headers=self.headers)
+            await self.request("GET /locations", "GET", "/locations", headers=self.headers)
+            await self.request("GET /stock/locations/{id}", "GET", f"/stock/locations/{random.choice(catalogue.locationIds)}", headers=self.headers)
+            await self.request("GET /movements", "GET", "/movements", params={"limit": 50}, headers=self.headers)
+            await asyncio.sleep(max(interval - (time.perf_counter() - start), 0))
+
+    async def uploader(self, catalogue: Catalogue, number: int, batchSize: int) -> None:
+        iteration = 0
+        while self.running:
+            iteration += 1
+            stream = io.BytesIO()
+            # A photo sized image, the server only verifies it on upload
+            Image.new("RGB", (1200, 900), tuple(random.randrange(256) for _ in range(3))).save(stream, format="JPEG")
+            name = f"loadtest-{os.getpid()}-{number}-{iteration}"
+            await self.request("POST /images/", "POST", "/images/", files={"image": (f"{name}.jpg", stream.getvalue(), "image/jpeg")}, headers=self.headers)
+            datasheet = b"%PDF-1.4\n" + os.urandom(200_000) + b"\n%%EOF\n"
+            await self.request("POST /datasheets/", "POST", "/datasheets/", files={"datasheet": (f"{name}.pdf", datasheet, "application/pdf")}, headers=self.headers)
+            movements = [
+                {"partId": random.choice(catalogue.partIds), "toLocation": random.choice(catalogue.locationIds), "delta": 1}
+                for _ in range(batchSize)
+            ]
+            await self.request("POST /movements", "POST", "/movements", json=movements, headers=self.headers)
+
+    async def loginBursts(self, username: str, password: str, burst: int, interval: float) -> None:
+        while self.running:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                self.request("POST /user/login", "POST", "/user/login", data={"username": username, "password": password})
+                for _ in range(burst)
+            ))
+            await asyncio.sleep(max(interval - (time.perf_counter() - start), 0))
+
+
+def percentile(durations: list[float], fraction: float) -> float:
+    return durations[min(int(len(durations) * fraction), len(durations) - 1)]
+
+
+def report(stats: dict[str, Stats], duration: float) -> list[dict]:
+    results = []
+    for name, endpoint in sorted(stats.items()):
+        durations = sorted(endpoint.durations)
+        if not durations:
+            continue
+        results.append({
+            "endpoint": name,
+            "requests": len(durations),
+            "errors": endpoint.errors,
+            "errorRate": endpoint.errors / len(durations),
+            "throughput": len(durations) / duration,
+            "p50": percentile(durations, 0.5) * 1000,
+            "p95": percentile(durations, 0.95) * 1000,
+            "p99": percentile(durations, 0.99) * 1000,
+            "max": durations[-1] * 1000,
+            "statuses": endpoint.statuses,
+        })
+    print(f"{'endpoint':26} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for result in results:
+        print(
+            f"{result['endpoint']:26} {result['requests']:8} {result['errorRate']:7.1%} {result['throughput']:8.1f}"
+            f" {result['p50']:9.1f} {result['p95']:9.1f} {result['p99']:9.1f} {result['max']:9.1f}"
+        )
+    total = sum(result["requests"] for result in results)
+    errors = sum(result["errors"] for result in results)
+    print(f"{'total':26} {total:8} {errors / max(total, 1):7.1%} {total / duration:8.1f}")
+    for result in results:
+        failed = {status: count for status, count in result["statuses"].items() if not status.startswith(("1", "2", "3"))}
+        if failed:
+            print(f"{result['endpoint']}: {failed}")
+    return results
+
+
+def startServer(args: argparse.Namespace) -> tuple[subprocess.Popen, str, Path]:
+    """
+    Generate a catalogue and start the server inside a temporary working directory, which is changed into.
+    """
+    workDir = createWorkDir()
+    serverConfig = {
+        "host": "127.0.0.1",
+        "port": args.port,
+        "workers": args.workers,
+        "dbPoolSize": args.poolSize,
+        # Login bursts measure the password hashing, not the rate limiter
+        "loginAttempts": 1000000,
+    }
+    (workDir / "data" / "config.json").write_text(json.dumps(serverConfig))
+    env = {**os.environ, "PYTHONPATH": str(appPath)}
+    print(f"Generating {args.parts} parts in {workDir}")
+    subprocess.run([sys.executable, "-m", "src.generator", "--parts", str(args.parts)], cwd=workDir, env=env, check=True, capture_output=True)
+    server = subprocess.Popen([sys.executable, str(appPath / "main.py")], cwd=workDir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{args.port}"
+    for _ in range(120):
+        try:
+            httpx.get(f"{url}/docs", timeout=1)
+            break
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    else:
+        server.terminate()
+        raise RuntimeError("The server did not start")
+    return server, url, workDir
+
+
+async def run(args: argparse.Namespace, url: str) -> list[dict]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        test = LoadTest(client, args.duration)
+        test.headers = {"Authorization": f"Bearer {await test.login(args.username, args.password)}"}
+        catalogue = await test.prepare(args.codes)
+        test.end = time.perf_counter() + args.duration
+        print(
+            f"Running {args.scanners} scanners, {args.dashboards} dashboards, {args.uploaders} uploaders"
+            f" and login bursts of {args.burst} for {args.duration:.0f} s against {url}"
+        )
+        tasks = [test.scanner(catalogue) for _ in range(args.scanners)]
+        tasks += [test.dashboard(catalogue, args.pollInterval) for _ in range(args.dashboards)]
+        tasks += [test.uploader(catalogue, number, args.movementBatch) for number in range(args.uploaders)]
+        if args.burst > 0:
+            tasks.append(test.loginBursts(args.username, args.password, args.burst, args.burstInterval))
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        return report(test.stats, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the server with concurrent clients")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run the scenarios")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds until a request counts as failed")
+    parser.add_argument("--scanners", type=int, default=20)
+    parser.add_argument("--dashboards", type=int, default=5)
+    parser.add_argument("--pollInterval", type=float, default=2)
+    parser.add_argument("--uploaders", type=int, default=2)
+    parser.add_argument("--movementBatch", type=int, default=100)
+    parser.add_argument("--burst", type=int, default=10, help="Concurrent logins per burst, 0 disables the login scenario")
+    parser.add_argument("--burstInterval", type=float, default=5)
+    parser.add_argument("--codes", type=int, default=200, help="Scan codes registered for the scanners")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--start", action="store_true", help="Start a server with a generated catalogue")
+    parser.add_argument("--parts", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--poolSize", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    output = Path(args.output).resolve() if args.output else None
+    server = None
+    url = args.url
+    if args.start:
+        server, url, workDir = startServer(args)
+    try:
+        results = asyncio.run(run(args, url))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=30)
+            # The generated database is large, it is not left behind in the temporary folder
+            removeWorkDir(workDir, cwd)
+    if output is not None:
+        output.write_text(json.dumps(results, indent=4) + "\n")
+
+
+if __name__ == "__main__":
+    main()